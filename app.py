@@ -8,10 +8,15 @@ load_dotenv()
 from config import Config
 from extensions import db, jwt, init_redis, mail
 from migrate_config import init_migrate
+from services.audit_queue import init_audit_queue
+from services.session_cache import init_session_activity
+from services.dashboard_cache import init_dashboard_cache
+from services.resume_processing import init_resume_sweeper
+from utils.responses import OrjsonProvider
 from utils.monitoring import request_logger_middleware, performance_monitor, error_tracker
 from routes.auth import auth_bp
 from routes.jobs import jobs_bp
-from routes.resumes import resumes_bp
+from routes.resumes import resumes_bp, requeue_stale_resumes
 from routes.candidates import candidates_bp
 from routes.interviews import interviews_bp
 from routes.ai_interviews import ai_interviews
@@ -21,6 +26,8 @@ from routes.dashboard import dashboard_bp
 from routes.notifications import notifications_bp
 from routes.chat import chat_bp
 from werkzeug.exceptions import HTTPException
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy.exc import SQLAlchemyError
 import threading
 import time
 import logging
@@ -51,6 +58,12 @@ class DatabaseError(Exception):
 def create_app(config_class=Config):
     app = Flask(__name__)
     app.config.from_object(config_class)
+    app.json = OrjsonProvider(app)  # jsonify()/get_json() through orjson
+    
+    # Take the client address from X-Forwarded-For set by our own proxies (nginx)
+    proxy_count = app.config.get('TRUSTED_PROXY_COUNT', 0)
+    if proxy_count:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxy_count, x_proto=proxy_count, x_host=proxy_count)
     
     # Enable debug logging
     logging.basicConfig(level=logging.INFO)
@@ -62,6 +75,10 @@ def create_app(config_class=Config):
     init_redis(app)  # Initialize Redis
     mail.init_app(app)  # Initialize Mail
     init_migrate(app)  # Initialize Flask-Migrate
+    init_audit_queue(app)  # Start background audit log writer
+    init_session_activity(app)  # Start batched session last_activity writer
+    init_dashboard_cache()  # Drop dashboard caches when jobs/resumes change
+    init_resume_sweeper(app, requeue_stale_resumes)  # Recover resumes whose processing task was lost
     
     # Dispose of any stale database connections on startup
     with app.app_context():
@@ -178,6 +195,12 @@ def create_app(config_class=Config):
             return {'error': 'Unexpected error', 'details': str(e), 'type': type(e).__name__}, 500
         return {'error': 'An unexpected error occurred'}, 500
     
+    @app.errorhandler(SQLAlchemyError)
+    def handle_sqlalchemy_error(e):
+        """Roll back the failed transaction, then report like any unexpected error"""
+        db.session.rollback()
+        return handle_unexpected_error(e)
+    
     # Monitoring endpoints
     @app.route('/api/monitoring/metrics')
     def get_metrics():
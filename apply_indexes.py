@@ -3,6 +3,7 @@ Apply performance indexes to database
 """
 from app import create_app
 from extensions import db
+from models.job import MAX_SKILL_LENGTH
 from sqlalchemy import text
 
 app = create_app()
@@ -11,18 +12,31 @@ with app.app_context():
     print("Applying performance indexes...")
     
     # Jobs table indexes
-    try:
-        db.session.execute(text("CREATE INDEX idx_user_status ON jobs(user_id, status)"))
-        print("✓ Created idx_user_status on jobs")
-    except Exception as e:
-        print(f"  idx_user_status: {str(e)[:50]}...")
-    
     try:
         db.session.execute(text("CREATE INDEX idx_status_created ON jobs(status, created_at)"))
         print("✓ Created idx_status_created on jobs")
     except Exception as e:
         print(f"  idx_status_created: {str(e)[:50]}...")
     
+    try:
+        db.session.execute(text("CREATE INDEX idx_user_created ON jobs(user_id, created_at)"))
+        print("✓ Created idx_user_created on jobs")
+    except Exception as e:
+        print(f"  idx_user_created: {str(e)[:50]}...")
+    
+    try:
+        db.session.execute(text("CREATE INDEX idx_user_status_created ON jobs(user_id, status, created_at, id)"))
+        print("✓ Created idx_user_status_created on jobs")
+    except Exception as e:
+        print(f"  idx_user_status_created: {str(e)[:50]}...")
+    
+    try:
+        # Superseded by idx_user_status_created, which has the same leading columns
+        db.session.execute(text("DROP INDEX idx_user_status ON jobs"))
+        print("✓ Dropped idx_user_status on jobs")
+    except Exception as e:
+        print(f"  idx_user_status: {str(e)[:50]}...")
+    
     try:
         db.session.execute(text("CREATE INDEX idx_location ON jobs(location)"))
         print("✓ Created idx_location on jobs")
@@ -35,6 +49,25 @@ with app.app_context():
     except Exception as e:
         print(f"  idx_job_type: {str(e)[:50]}...")
     
+    try:
+        # Multi-valued index over the skills JSON array (MySQL 8.0.17+), for MEMBER OF lookups
+        db.session.execute(text(
+            f"CREATE INDEX idx_skills_required ON jobs((CAST(skills_required AS CHAR({MAX_SKILL_LENGTH}) ARRAY)))"
+        ))
+        print("✓ Created idx_skills_required on jobs")
+    except Exception as e:
+        print(f"  idx_skills_required: {str(e)[:50]}...")
+    
+    # Resumes columns
+    try:
+        # Exact, non-null scores: a FLOAT never equals the cursor value read back from it,
+        # and NULLs fall out of keyset pages (indexes on ai_score are rebuilt by the ALTER)
+        db.session.execute(text("UPDATE resumes SET ai_score = 0 WHERE ai_score IS NULL"))
+        db.session.execute(text("ALTER TABLE resumes MODIFY ai_score DECIMAL(5,2) NOT NULL DEFAULT 0"))
+        print("✓ Converted resumes.ai_score to DECIMAL(5,2) NOT NULL")
+    except Exception as e:
+        print(f"  resumes.ai_score: {str(e)[:50]}...")
+    
     # Resumes table indexes
     try:
         db.session.execute(text("CREATE INDEX idx_email ON resumes(email)"))
@@ -43,16 +76,35 @@ with app.app_context():
         print(f"  idx_email: {str(e)[:50]}...")
     
     try:
-        db.session.execute(text("CREATE INDEX idx_job_status ON resumes(job_id, status)"))
-        print("✓ Created idx_job_status on resumes")
+        db.session.execute(text("CREATE INDEX idx_job_score ON resumes(job_id, ai_score)"))
+        print("✓ Created idx_job_score on resumes")
+    except Exception as e:
+        print(f"  idx_job_score: {str(e)[:50]}...")
+    
+    try:
+        db.session.execute(text("CREATE INDEX idx_job_status_score ON resumes(job_id, status, ai_score)"))
+        print("✓ Created idx_job_status_score on resumes")
+    except Exception as e:
+        print(f"  idx_job_status_score: {str(e)[:50]}...")
+    
+    try:
+        # Superseded by idx_job_status_score, which has the same leading columns
+        db.session.execute(text("DROP INDEX idx_job_status ON resumes"))
+        print("✓ Dropped idx_job_status on resumes")
     except Exception as e:
         print(f"  idx_job_status: {str(e)[:50]}...")
     
     try:
-        db.session.execute(text("CREATE INDEX idx_job_score ON resumes(job_id, ai_score)"))
-        print("✓ Created idx_job_score on resumes")
+        db.session.execute(text("CREATE INDEX idx_job_created ON resumes(job_id, created_at)"))
+        print("✓ Created idx_job_created on resumes")
     except Exception as e:
-        print(f"  idx_job_score: {str(e)[:50]}...")
+        print(f"  idx_job_created: {str(e)[:50]}...")
+    
+    try:
+        db.session.execute(text("CREATE INDEX idx_job_processing ON resumes(job_id, processing_status, processing_time_seconds)"))
+        print("✓ Created idx_job_processing on resumes")
+    except Exception as e:
+        print(f"  idx_job_processing: {str(e)[:50]}...")
     
     try:
         db.session.execute(text("CREATE INDEX idx_processing ON resumes(processing_status)"))
@@ -85,5 +137,25 @@ with app.app_context():
     except Exception as e:
         print(f"  idx_status_date: {str(e)[:50]}...")
     
+    # Notifications table indexes
+    try:
+        db.session.execute(text("CREATE INDEX idx_notif_user_read_created ON notifications(user_id, is_read, created_at)"))
+        print("✓ Created idx_notif_user_read_created on notifications")
+    except Exception as e:
+        print(f"  idx_notif_user_read_created: {str(e)[:50]}...")
+    
+    try:
+        db.session.execute(text("CREATE INDEX idx_notif_user_created ON notifications(user_id, created_at)"))
+        print("✓ Created idx_notif_user_created on notifications")
+    except Exception as e:
+        print(f"  idx_notif_user_created: {str(e)[:50]}...")
+    
+    try:
+        # Superseded by idx_notif_user_read_created, which has the same leading columns
+        db.session.execute(text("DROP INDEX idx_notif_user_read ON notifications"))
+        print("✓ Dropped idx_notif_user_read on notifications")
+    except Exception as e:
+        print(f"  idx_notif_user_read: {str(e)[:50]}...")
+    
     db.session.commit()
     print("\n✅ Index creation complete!")
@@ -13,6 +13,10 @@ class Config:
     SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///hirelens.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Optional read replica, used by views decorated with @use_bind('replica')
+    DATABASE_REPLICA_URL = os.getenv('DATABASE_REPLICA_URL', '')
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
+    
     # MySQL Connection Pool Settings (Fix "Lost connection" errors)
     SQLALCHEMY_ENGINE_OPTIONS = {
         'pool_size': 5,
@@ -33,6 +37,18 @@ class Config:
     REDIS_DB = int(os.getenv('REDIS_DB', 0))
     CACHE_TTL = 300  # 5 minutes default cache
     
+    # Audit logging (batched by a background writer when enabled)
+    AUDIT_LOG_ASYNC = os.getenv('AUDIT_LOG_ASYNC', 'True').lower() == 'true'
+    
+    # Emails/notifications sent from a background thread pool when enabled
+    BACKGROUND_TASKS_ASYNC = os.getenv('BACKGROUND_TASKS_ASYNC', 'True').lower() == 'true'
+    
+    # Rate Limiting (keyed on the client IP: set TRUSTED_PROXY_COUNT before enabling behind a proxy)
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'False').lower() == 'true'
+    
+    # Number of reverse proxies in front of the app whose X-Forwarded-* headers are trusted
+    TRUSTED_PROXY_COUNT = int(os.getenv('TRUSTED_PROXY_COUNT', 0))
+    
     # Email Configuration
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
@@ -64,10 +80,16 @@ class Config:
     JWT_CSRF_IN_COOKIES = False  # Don't use cookies for CSRF
     JWT_CSRF_CHECK_FORM = False  # Don't check form data for CSRF token
     
+    # Key for HMAC-hashing refresh tokens before they are stored
+    TOKEN_PEPPER = os.getenv('TOKEN_PEPPER', JWT_SECRET_KEY)
+    
     # File Upload
     UPLOAD_FOLDER = os.path.join(os.getcwd(), 'uploads')
     MAX_CONTENT_LENGTH = 16 * 1024 * 1024  # 16MB max file size
     ALLOWED_EXTENSIONS = {'pdf', 'docx', 'doc'}
+    # Internal nginx location aliased to UPLOAD_FOLDER (e.g. /_protected/); when set,
+    # resume downloads are handed to nginx via X-Accel-Redirect instead of streamed by Python
+    UPLOAD_ACCEL_REDIRECT_PREFIX = os.getenv('UPLOAD_ACCEL_REDIRECT_PREFIX', '')
     
     # AI Configuration
     AI_PROVIDER = os.getenv('AI_PROVIDER', 'gemini')  # gemini, openai, local
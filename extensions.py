@@ -1,14 +1,48 @@
+from functools import wraps
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_jwt_extended import JWTManager
 from flask_mail import Mail
 import redis
 import json
 from datetime import timedelta
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """Session that sends statements to the bind set by use_bind(), when one is configured"""
+    
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        bind_key = self.info.get('read_bind')
+        if bind is None and bind_key is not None and not self._flushing:
+            engine = self._db.engines.get(bind_key)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 jwt = JWTManager()
 mail = Mail()
 
+
+def use_bind(bind_key):
+    """
+    Run a read-only view against SQLALCHEMY_BINDS[bind_key] (e.g. a read replica)
+    
+    Falls back to the primary database when the bind isn't configured. Only
+    for views whose data may lag the primary by the replication delay.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            db.session.info['read_bind'] = bind_key
+            try:
+                return f(*args, **kwargs)
+            finally:
+                db.session.info.pop('read_bind', None)
+        return wrapper
+    return decorator
+
 # Redis client
 redis_client = None
 
@@ -32,11 +66,31 @@ def init_redis(app):
         print("  Application will continue without caching")
         redis_client = None
 
-def cache_set(key, value, expire=300):
-    """Set cache with JSON serialization"""
+# Tag sets outlive every key indexed in them, so a tag never expires before its members
+CACHE_TAG_TTL = 3600
+
+def _tag_key(tag):
+    return f"tag:{tag}"
+
+def cache_set(key, value, expire=300, tags=None):
+    """
+    Set cache with JSON serialization
+    
+    Keys written with tags are added to a Redis SET per tag so
+    cache_delete_tag() can drop them without scanning the keyspace.
+    """
     if redis_client:
         try:
-            redis_client.setex(key, expire, json.dumps(value))
+            if not tags:
+                redis_client.setex(key, expire, json.dumps(value))
+                return True
+            
+            pipe = redis_client.pipeline()
+            pipe.setex(key, expire, json.dumps(value))
+            for tag in tags:
+                pipe.sadd(_tag_key(tag), key)
+                pipe.expire(_tag_key(tag), max(expire, CACHE_TAG_TTL))
+            pipe.execute()
             return True
         except Exception as e:
             print(f"Cache set error: {e}")
@@ -52,6 +106,91 @@ def cache_get(key):
             print(f"Cache get error: {e}")
     return None
 
+def cache_set_raw(key, data, expire=300):
+    """Set an already-serialized value (str or bytes) as-is"""
+    if redis_client:
+        try:
+            redis_client.setex(key, expire, data)
+            return True
+        except Exception as e:
+            print(f"Cache set raw error: {e}")
+    return False
+
+def cache_get_raw(key):
+    """Get a value written by cache_set_raw() without deserializing it"""
+    if redis_client:
+        try:
+            return redis_client.get(key)
+        except Exception as e:
+            print(f"Cache get raw error: {e}")
+    return None
+
+def cache_mget(*keys):
+    """Get several keys in one MGET; misses (or no Redis) come back as None"""
+    if redis_client and keys:
+        try:
+            return [json.loads(data) if data else None for data in redis_client.mget(keys)]
+        except Exception as e:
+            print(f"Cache mget error: {e}")
+    return [None] * len(keys)
+
+def cache_set_many(mapping, expire=300):
+    """Set several keys with the same TTL in one pipelined round-trip"""
+    if redis_client and mapping:
+        try:
+            pipe = redis_client.pipeline()
+            for key, value in mapping.items():
+                pipe.setex(key, expire, json.dumps(value))
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache set many error: {e}")
+    return False
+
+def cache_lock(key, expire=5):
+    """
+    Try to take a short-lived lock (SET NX EX) so only one request rebuilds a cache entry
+    
+    Returns True when acquired, or when Redis is unavailable (no coordination possible)
+    """
+    if redis_client:
+        try:
+            return bool(redis_client.set(key, 1, nx=True, ex=expire))
+        except Exception as e:
+            print(f"Cache lock error: {e}")
+    return True
+
+# Version counters outlive every key that embeds them
+CACHE_VERSION_TTL = 86400
+
+def cache_get_version(key):
+    """
+    Read a version counter to embed in cache keys (0 when unset or Redis is down)
+    
+    Bumping the counter with cache_bump_version() orphans every key built
+    from the old value; they age out through their own TTL.
+    """
+    if redis_client:
+        try:
+            return int(redis_client.get(key) or 0)
+        except Exception as e:
+            print(f"Cache version get error: {e}")
+    return 0
+
+def cache_bump_version(*keys):
+    """Increment version counters in one round-trip"""
+    if redis_client and keys:
+        try:
+            pipe = redis_client.pipeline()
+            for key in keys:
+                pipe.incr(key)
+                pipe.expire(key, CACHE_VERSION_TTL)
+            pipe.execute()
+            return True
+        except Exception as e:
+            print(f"Cache version bump error: {e}")
+    return False
+
 def cache_delete(key):
     """Delete cache key"""
     if redis_client:
@@ -62,14 +201,63 @@ def cache_delete(key):
             print(f"Cache delete error: {e}")
     return False
 
-def cache_delete_pattern(pattern):
-    """Delete all keys matching pattern"""
-    if redis_client:
+def cache_delete_many(*keys):
+    """Delete several keys with a single variadic DEL"""
+    if redis_client and keys:
         try:
-            keys = redis_client.keys(pattern)
-            if keys:
-                redis_client.delete(*keys)
+            redis_client.delete(*keys)
+            return True
+        except Exception as e:
+            print(f"Cache delete many error: {e}")
+    return False
+
+# SCAN page size and keys per UNLINK when deleting by pattern. A large page keeps a
+# full-keyspace walk to a few round-trips; each SCAN call is still bounded work
+CACHE_SCAN_COUNT = 10000
+CACHE_UNLINK_BATCH = 512
+
+def cache_delete_pattern(*patterns, keys=()):
+    """
+    Delete all keys matching any of the patterns, plus any extra `keys`
+    
+    SCAN walks the keyspace incrementally instead of blocking Redis the way
+    KEYS does, and every UNLINK is sent in a single pipeline at the end.
+    UNLINK reclaims memory off Redis's main thread.
+    """
+    if redis_client and (patterns or keys):
+        try:
+            pipe = redis_client.pipeline(transaction=False)
+            batch = list(keys)
+            for pattern in patterns:
+                for key in redis_client.scan_iter(match=pattern, count=CACHE_SCAN_COUNT):
+                    batch.append(key)
+                    if len(batch) >= CACHE_UNLINK_BATCH:
+                        pipe.unlink(*batch)
+                        batch = []
+            if batch:
+                pipe.unlink(*batch)
+            pipe.execute()
             return True
         except Exception as e:
             print(f"Cache delete pattern error: {e}")
     return False
+
+def cache_delete_tag(*tags, keys=()):
+    """
+    Delete every key written with any of the given tags, plus the tag sets
+    
+    Extra `keys` are removed in the same DEL, so an invalidation is two
+    round-trips regardless of how many keys it covers.
+    """
+    if redis_client and tags:
+        try:
+            tag_keys = [_tag_key(tag) for tag in tags]
+            pipe = redis_client.pipeline()
+            for tag_key in tag_keys:
+                pipe.smembers(tag_key)
+            tagged = set().union(*pipe.execute())
+            redis_client.delete(*tagged, *keys, *tag_keys)
+            return True
+        except Exception as e:
+            print(f"Cache delete tag error: {e}")
+    return False
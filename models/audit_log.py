@@ -1,5 +1,7 @@
 from extensions import db
+from services import audit_queue
 from datetime import datetime
+import orjson
 
 class AuditLog(db.Model):
     __tablename__ = 'audit_logs'
@@ -35,7 +37,24 @@ class AuditLog(db.Model):
     
     @staticmethod
     def log_event(user_id, event_type, status, request, details=None):
-        """Helper method to quickly log an event"""
+        """Helper method to quickly log an event (details may be a dict or a JSON string)"""
+        if isinstance(details, dict):
+            details = orjson.dumps(details).decode()
+        
+        event = {
+            'user_id': user_id,
+            'event_type': event_type,
+            'ip_address': request.remote_addr,
+            'user_agent': request.headers.get('User-Agent', 'Unknown'),
+            'status': status,
+            'details': details,
+            'created_at': datetime.utcnow()
+        }
+        
+        # Written in batches by the background writer when it is running
+        if audit_queue.enqueue(event):
+            return
+        
         log = AuditLog(
             user_id=user_id,
             event_type=event_type,
@@ -1,13 +1,20 @@
 from extensions import db
 from datetime import datetime
 
+_NO_CANDIDATES = {'candidates_count': 0, 'shortlisted_count': 0, 'rejected_count': 0}
+
+# Longest skill idx_skills_required can hold (CHAR(n) ARRAY); longer ones would fail the INSERT
+MAX_SKILL_LENGTH = 64
+
 class Job(db.Model):
     __tablename__ = 'jobs'
     __table_args__ = (
-        db.Index('idx_user_status', 'user_id', 'status'),  # Composite index for user's jobs by status
         db.Index('idx_status_created', 'status', 'created_at'),  # For public job listings
+        db.Index('idx_user_created', 'user_id', 'created_at'),  # For a user's newest jobs (dashboard, job list)
+        db.Index('idx_user_status_created', 'user_id', 'status', 'created_at', 'id'),  # A user's jobs by status, keyset pages by date
         db.Index('idx_location', 'location'),  # For location-based searches
         db.Index('idx_job_type', 'job_type'),  # For filtering by job type
+        # idx_skills_required (multi-valued index over skills_required, MySQL only) is created by apply_indexes.py
     )
     
     id = db.Column(db.Integer, primary_key=True)
@@ -28,7 +35,59 @@ class Job(db.Model):
     # Relationships
     resumes = db.relationship('Resume', backref='job', lazy='dynamic', cascade='all, delete-orphan')
     
-    def to_dict(self, include_resumes=False, include_counts=True):
+    @staticmethod
+    def candidate_counts(job_ids):
+        """
+        Candidate, shortlisted and rejected counts for many jobs in one grouped query
+        
+        Returns:
+            Dict of job_id -> counts dict, in the shape to_dict(counts=...) takes
+        """
+        from models.resume import Resume
+        if not job_ids:
+            return {}
+        rows = db.session.query(
+            Resume.job_id,
+            db.func.count(Resume.id),
+            db.func.count(db.case((Resume.status == 'shortlisted', Resume.id))),
+            db.func.count(db.case((Resume.status == 'rejected', Resume.id)))
+        ).filter(Resume.job_id.in_(job_ids)).group_by(Resume.job_id).all()
+        counts = {job_id: dict(_NO_CANDIDATES) for job_id in job_ids}
+        for job_id, total, shortlisted, rejected in rows:
+            counts[job_id] = {
+                'candidates_count': total,
+                'shortlisted_count': shortlisted,
+                'rejected_count': rejected
+            }
+        return counts
+    
+    def to_public_dict(self):
+        """
+        Fields shown on the public careers pages (no owner, status or counts)
+        
+        created_at stays a datetime; the public routes encode with orjson,
+        which writes the same ISO 8601 string as isoformat().
+        """
+        return {
+            'id': self.id,
+            'title': self.title,
+            'description': self.description,
+            'department': self.department,
+            'location': self.location,
+            'job_type': self.job_type,
+            'experience_required': self.experience_required,
+            'skills_required': self.skills_required,
+            'education': self.education,
+            'salary_range': self.salary_range,
+            'created_at': self.created_at
+        }
+    
+    def to_dict(self, include_resumes=False, include_counts=True, counts=None):
+        """
+        Args:
+            counts: Precomputed entry from Job.candidate_counts(); skips the
+                per-job count query when serializing many jobs
+        """
         data = {
             'id': self.id,
             'user_id': self.user_id,
@@ -47,17 +106,13 @@ class Job(db.Model):
         
         # Add candidate counts only if requested and session is available
         if include_counts:
-            try:
-                from models.resume import Resume
-                all_candidates = Resume.query.filter_by(job_id=self.id).all()
-                data['candidates_count'] = len(all_candidates)
-                data['shortlisted_count'] = len([c for c in all_candidates if c.status == 'shortlisted'])
-                data['rejected_count'] = len([c for c in all_candidates if c.status == 'rejected'])
-            except Exception:
-                # If query fails (e.g., no session), set default counts
-                data['candidates_count'] = 0
-                data['shortlisted_count'] = 0
-                data['rejected_count'] = 0
+            if counts is None:
+                try:
+                    counts = Job.candidate_counts([self.id])[self.id]
+                except Exception:
+                    # If query fails (e.g., no session), fall back to default counts
+                    counts = None
+            data.update(counts or _NO_CANDIDATES)
         
         if include_resumes:
             from models.resume import Resume
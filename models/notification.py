@@ -3,6 +3,10 @@ from datetime import datetime
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('idx_notif_user_read_created', 'user_id', 'is_read', 'created_at'),  # Unread list, unread counts, mark-all-read
+        db.Index('idx_notif_user_created', 'user_id', 'created_at'),  # Full list, newest first
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
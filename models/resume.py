@@ -4,9 +4,11 @@ from datetime import datetime
 class Resume(db.Model):
     __tablename__ = 'resumes'
     __table_args__ = (
-        db.Index('idx_job_status', 'job_id', 'status'),  # For filtering candidates by status
         db.Index('idx_job_score', 'job_id', 'ai_score'),  # For sorting by AI score
+        db.Index('idx_job_status_score', 'job_id', 'status', 'ai_score'),  # Status filter (alone or with score sort) in one range scan
+        db.Index('idx_job_created', 'job_id', 'created_at'),  # For sorting/seeking by upload date
         db.Index('idx_email', 'email'),  # For searching by email
+        db.Index('idx_job_processing', 'job_id', 'processing_status', 'processing_time_seconds'),  # Covers dashboard avg processing time
         db.Index('idx_processing', 'processing_status'),  # For tracking processing
     )
     
@@ -23,7 +25,8 @@ class Resume(db.Model):
     parsed_data = db.Column(db.JSON)  # Full parsed resume data
     
     # AI Scoring
-    ai_score = db.Column(db.Float, default=0.0, index=True)  # 0-100
+    # 0-100; exact DECIMAL (read back as float) so keyset cursors compare equal to stored scores
+    ai_score = db.Column(db.Numeric(5, 2, asdecimal=False), default=0.0, nullable=False, index=True)
     matched_skills = db.Column(db.JSON)  # Skills that match JD
     missing_skills = db.Column(db.JSON)  # Skills missing from JD
     experience_years = db.Column(db.Float)
@@ -1,8 +1,21 @@
 from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from werkzeug.security import check_password_hash
+from argon2 import PasswordHasher
+from argon2.exceptions import InvalidHashError, VerificationError
+from datetime import datetime, timedelta
+from sqlalchemy import case, func, update
 import secrets
 
+# Argon2id tuned for interactive logins (~10ms per hash)
+password_hasher = PasswordHasher(time_cost=2, memory_cost=65536, parallelism=1)
+
+# Prefixes of hashes produced by werkzeug before the switch to Argon2
+_LEGACY_HASH_PREFIXES = ('pbkdf2:', 'scrypt:')
+
+# Hash of a throwaway password, checked when no user matches so that login
+# takes the same time whether or not the email exists
+_DUMMY_PASSWORD_HASH = password_hasher.hash(secrets.token_urlsafe(16))
+
 class User(db.Model):
     __tablename__ = 'users'
     
@@ -20,7 +33,7 @@ class User(db.Model):
     is_active = db.Column(db.Boolean, default=True)
     
     # Token and session fields
-    refresh_token = db.Column(db.String(500))  # For JWT refresh token (now hashed)
+    refresh_token = db.Column(db.String(500))  # HMAC-SHA256 of the latest JWT refresh token
     token_expires_at = db.Column(db.DateTime)
     last_login = db.Column(db.DateTime)
     last_login_ip = db.Column(db.String(50))
@@ -47,10 +60,37 @@ class User(db.Model):
     sessions = db.relationship('UserSession', backref='user', lazy='dynamic', cascade='all, delete-orphan')
     
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = password_hasher.hash(password)
     
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        """Verify password, upgrading legacy or outdated hashes in place"""
+        if not self.password_hash:
+            return False
+        
+        if self.password_hash.startswith(_LEGACY_HASH_PREFIXES):
+            if not check_password_hash(self.password_hash, password):
+                return False
+            # Re-hash with Argon2; persisted with the caller's next commit
+            self.set_password(password)
+            return True
+        
+        try:
+            password_hasher.verify(self.password_hash, password)
+        except (VerificationError, InvalidHashError):
+            return False
+        
+        if password_hasher.check_needs_rehash(self.password_hash):
+            self.set_password(password)
+        return True
+    
+    @staticmethod
+    def dummy_check_password(password):
+        """Run a full password check against a constant hash (always False)"""
+        try:
+            password_hasher.verify(_DUMMY_PASSWORD_HASH, password)
+        except (VerificationError, InvalidHashError):
+            pass
+        return False
     
     def generate_refresh_token(self):
         """Generate a secure refresh token"""
@@ -65,12 +105,30 @@ class User(db.Model):
     
     def increment_failed_login(self):
         """Increment failed login attempts and lock account if threshold reached"""
-        self.failed_login_attempts += 1
-        
         # Lock account after 5 failed attempts for 15 minutes
-        if self.failed_login_attempts >= 5:
-            from datetime import timedelta
-            self.locked_until = datetime.utcnow() + timedelta(minutes=15)
+        lock_until = datetime.utcnow() + timedelta(minutes=15)
+        
+        if self.id is None:
+            # Not persisted yet, nothing to race with
+            self.failed_login_attempts = (self.failed_login_attempts or 0) + 1
+            if self.failed_login_attempts >= 5:
+                self.locked_until = lock_until
+            return
+        
+        # Single atomic UPDATE so concurrent failures can't lose increments.
+        # locked_until is assigned first because MySQL evaluates SET clauses
+        # left to right against already-updated values.
+        attempts = func.coalesce(User.failed_login_attempts, 0) + 1
+        db.session.execute(
+            update(User)
+            .where(User.id == self.id)
+            .ordered_values(
+                (User.locked_until, case((attempts >= 5, lock_until), else_=User.locked_until)),
+                (User.failed_login_attempts, attempts)
+            )
+            .execution_options(synchronize_session=False)
+        )
+        db.session.expire(self, ['failed_login_attempts', 'locked_until'])
     
     def reset_failed_login(self):
         """Reset failed login attempts and unlock account"""
@@ -82,7 +140,9 @@ class User(db.Model):
             'id': self.id,
             'email': self.email,
             'name': self.name,
-            'company': self.company,            'phone': self.phone,            'profile_image': self.profile_image,
+            'company': self.company,
+            'phone': self.phone,
+            'profile_image': self.profile_image,
             'role': self.role,
             'plan': self.plan,
             'jobs_used': self.jobs_used,
@@ -90,6 +150,15 @@ class User(db.Model):
             'last_login': self.last_login.isoformat() if self.last_login else None,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+    
+    def to_dict_minimal(self):
+        """Lightweight serialization for hot auth paths (session validation)"""
+        return {
+            'id': self.id,
+            'email': self.email,
+            'name': self.name,
+            'plan': self.plan
+        }
 
 
 class UserSession(db.Model):
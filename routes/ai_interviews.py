@@ -485,7 +485,7 @@ def log_activity(interview_id):
         
         # Parse timestamp
         try:
-            log_timestamp = datetime.fromisoformat(timestamp_str.replace('Z', '+00:00')) if timestamp_str else datetime.utcnow()
+            log_timestamp = datetime.fromisoformat(timestamp_str) if timestamp_str else datetime.utcnow()
         except:
             log_timestamp = datetime.utcnow()
         
@@ -1,38 +1,98 @@
-from flask import Blueprint, request, jsonify, Request
+from flask import Blueprint, request, jsonify, Request, current_app
 from flask_jwt_extended import create_access_token, create_refresh_token, jwt_required, get_jwt_identity
 from models.user import User, UserSession
 from models.audit_log import AuditLog
-from extensions import db, cache_delete
+from extensions import db, cache_delete_many
 from utils.validators import validate_email, validate_password
+from utils.ratelimit import rate_limit
 from services.supabase_client import get_supabase_auth
 from services.email_service import EmailService
+from services.user_cache import load_user_cached, load_user_profile_json, invalidate_user_cache
+from services.background_tasks import submit_background
+from services.session_cache import (
+    get_cached_session, cache_session, is_cached_session_valid, record_session_activity,
+    invalidate_session, invalidate_user_sessions
+)
 from datetime import datetime, timedelta
-from werkzeug.security import generate_password_hash
+from sqlalchemy import select, update
+from sqlalchemy.orm import load_only
 import secrets
-import json
+import logging
+import hashlib
+import hmac
+import orjson
 
 auth_bp = Blueprint('auth', __name__)
+logger = logging.getLogger(__name__)
 
-# Rate limiter fallback
-try:
-    import sys
-    import os
-    # Add middleware to path
-    middleware_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), '..', 'Hirelens_monitoring')
-    if os.path.exists(middleware_path):
-        sys.path.insert(0, middleware_path)
-    from middleware.rate_limiter import rate_limit  # type: ignore
-except (ImportError, ModuleNotFoundError):
-    # Fallback: no-op decorator if rate_limiter not available
-    def rate_limit(limit=None, window=None):
-        def decorator(f):
-            return f
-        return decorator
+# Stateless (SMTP settings only), shared by request handlers and background workers
+_email_service = EmailService()
+
+# Columns used by the credential checks and User.to_dict() (skips SMTP settings and token hashes)
+_AUTH_USER_COLUMNS = (
+    User.id, User.email, User.password_hash, User.name, User.company, User.phone,
+    User.profile_image, User.role, User.plan, User.jobs_used, User.resumes_used,
+    User.is_active, User.failed_login_attempts, User.locked_until, User.last_login,
+    User.created_at
+)
+
+# Columns needed for UserSession.to_dict() and the validity check
+_SESSION_COLUMNS = (
+    UserSession.id, UserSession.user_id, UserSession.device_info, UserSession.ip_address,
+    UserSession.is_active, UserSession.expires_at, UserSession.last_activity,
+    UserSession.created_at
+)
 
 # Helper function to hash tokens before storing
 def hash_token(token):
-    """Hash token using werkzeug before storing in database"""
-    return generate_password_hash(token)
+    """
+    Hash token with HMAC-SHA256 before storing in database.
+    Tokens are already high-entropy, so a slow password hash adds nothing.
+    """
+    return hmac.new(
+        current_app.config['TOKEN_PEPPER'].encode(),
+        token.encode(),
+        hashlib.sha256
+    ).hexdigest()
+
+def revoke_excess_sessions(user_id, keep=4):
+    """Revoke all but the `keep` most recent active sessions in one UPDATE"""
+    # Ids are selected first: MySQL can't UPDATE a table from a LIMITed subquery on itself
+    stale_ids = db.session.scalars(
+        select(UserSession.id)
+        .where(UserSession.user_id == user_id, UserSession.is_active == True)
+        .order_by(UserSession.created_at.desc())
+        .offset(keep)
+    ).all()
+    if stale_ids:
+        db.session.execute(
+            update(UserSession)
+            .where(UserSession.id.in_(stale_ids))
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+        invalidate_user_sessions(user_id)
+
+def send_welcome(user_id, user_name, user_email, company_name, notification_message):
+    """Queue the welcome email and the welcome notification as separately retried background tasks"""
+    from routes.notifications import create_notification
+    
+    submit_background(
+        _email_service.send_welcome_email,
+        user_name=user_name,
+        user_email=user_email,
+        company_name=company_name
+    )
+    submit_background(
+        create_notification,
+        user_id=user_id,
+        notification_type='welcome',
+        title='Welcome to HireLens! 🎉',
+        message=notification_message,
+        related_type='user',
+        related_id=user_id,
+        action_url='/dashboard/jobs/create'
+    )
 
 @auth_bp.route('/signup', methods=['POST'])
 @rate_limit(limit=5, window=300)  # 5 signups per 5 minutes per IP
@@ -53,8 +113,8 @@ def signup():
         if not password or not validate_password(password):
             return jsonify({'error': 'Password must be at least 8 characters with uppercase, lowercase, digit, and special character'}), 400
         
-        # Check if user exists
-        if User.query.filter_by(email=email).first():
+        # Check if user exists (EXISTS query, no row hydration)
+        if db.session.query(db.exists().where(User.email == email)).scalar():
             return jsonify({'error': 'Email already registered'}), 409
         
         # Create user
@@ -67,7 +127,7 @@ def signup():
         user.set_password(password)
         
         db.session.add(user)
-        db.session.commit()
+        db.session.flush()  # Assign user.id; committed together with the session below
         
         # Create tokens (identity must be string)
         access_token = create_access_token(identity=str(user.id))
@@ -92,41 +152,16 @@ def signup():
         
         # Log successful signup
         AuditLog.log_event(user.id, 'signup', 'success', request, 
-                          json.dumps({'email': email, 'name': name}))
-        
-        # Send welcome email (async, don't block signup if it fails)
-        try:
-            import logging
-            logger = logging.getLogger(__name__)
-            logger.info(f"Sending welcome email to new signup: {email}")
-            
-            email_service = EmailService()
-            email_service.send_welcome_email(
-                user_name=name or email.split('@')[0],
-                user_email=email,
-                company_name=company
-            )
-            
-            logger.info(f"Welcome email sent successfully to {email}")
-            
-            # Create welcome notification
-            try:
-                from routes.notifications import create_notification
-                create_notification(
-                    user_id=user.id,
-                    notification_type='welcome',
-                    title='Welcome to HireLens! 🎉',
-                    message='Your account has been created successfully. Start by posting your first job!',
-                    related_type='user',
-                    related_id=user.id,
-                    action_url='/dashboard/jobs/create'
-                )
-            except Exception as notif_error:
-                logger.error(f"Failed to create welcome notification: {str(notif_error)}")
-                
-        except Exception as e:
-            # Log the error but don't fail the signup
-            logger.error(f"Failed to send welcome email to {email}: {str(e)}")
+                          {'email': email, 'name': name})
+        
+        # Send welcome email and notification in the background (don't block signup)
+        send_welcome(
+            user.id,
+            name or email.split('@')[0],
+            email,
+            company,
+            'Your account has been created successfully. Start by posting your first job!'
+        )
         
         return jsonify({
             'message': 'User created successfully',
@@ -141,7 +176,7 @@ def signup():
         db.session.rollback()
         # Log failed signup
         AuditLog.log_event(None, 'signup', 'failure', request, 
-                          json.dumps({'error': str(e)}))
+                          {'error': str(e)})
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/login', methods=['POST'])
@@ -156,10 +191,12 @@ def login():
         if not email or not password:
             return jsonify({'error': 'Email and password required'}), 400
         
-        user = User.query.filter_by(email=email).first()
+        user = User.query.options(load_only(*_AUTH_USER_COLUMNS)).filter_by(email=email).first()
         
-        # Check if account is locked
+        # Reject locked accounts before spending a password hash on them
         if user and user.is_locked():
+            AuditLog.log_event(user.id, 'login', 'failure', request, 
+                              {'reason': 'account_locked'})
             remaining_time = int((user.locked_until - datetime.utcnow()).total_seconds() / 60)
             return jsonify({
                 'error': f'Account locked due to multiple failed login attempts. Try again in {remaining_time} minutes.'
@@ -171,15 +208,18 @@ def login():
                 user.increment_failed_login()
                 db.session.commit()
                 AuditLog.log_event(user.id, 'login', 'failure', request, 
-                                  json.dumps({'reason': 'invalid_password'}))
+                                  {'reason': 'invalid_password'})
             else:
+                # Equalize timing with the wrong-password path
+                User.dummy_check_password(password)
                 AuditLog.log_event(None, 'login', 'failure', request, 
-                                  json.dumps({'reason': 'user_not_found', 'email': email}))
+                                  {'reason': 'user_not_found', 'email': email})
             return jsonify({'error': 'Invalid credentials'}), 401
         
+        # Only reveal account status to someone who knows the password
         if not user.is_active:
             AuditLog.log_event(user.id, 'login', 'failure', request, 
-                              json.dumps({'reason': 'account_inactive'}))
+                              {'reason': 'account_inactive'})
             return jsonify({'error': 'Account is inactive'}), 403
         
         # Reset failed login attempts on successful login
@@ -195,12 +235,8 @@ def login():
         user.last_login = datetime.utcnow()
         user.last_login_ip = request.remote_addr
         
-        # Revoke old sessions (optional: limit to 5 active sessions)
-        active_sessions = UserSession.query.filter_by(user_id=user.id, is_active=True).order_by(UserSession.created_at.desc()).all()
-        if len(active_sessions) >= 5:
-            # Keep only 4 most recent, revoke oldest
-            for old_session in active_sessions[4:]:
-                old_session.revoke()
+        # Revoke old sessions (limit to 5 active sessions: keep 4 most recent + new one)
+        revoke_excess_sessions(user.id)
         
         # Create new session
         device_info = request.headers.get('User-Agent', 'Unknown')
@@ -212,10 +248,11 @@ def login():
         )
         db.session.add(session)
         db.session.commit()
+        invalidate_user_cache(user.id)
         
         # Log successful login
         AuditLog.log_event(user.id, 'login', 'success', request, 
-                          json.dumps({'device': device_info}))
+                          {'device': device_info})
         
         return jsonify({
             'message': 'Login successful',
@@ -229,36 +266,28 @@ def login():
     except Exception as e:
         # Log exception
         AuditLog.log_event(None, 'login', 'error', request, 
-                          json.dumps({'error': str(e)}))
+                          {'error': str(e)})
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/me', methods=['GET'])
 @jwt_required()
 def get_current_user():
     try:
-        # Add detailed logging
-        from flask import current_app
-        current_app.logger.info('=== /me endpoint called ===')
-        current_app.logger.info(f'Headers: {dict(request.headers)}')
-        
         user_id = int(get_jwt_identity())  # Convert string back to int
-        current_app.logger.info(f'JWT Identity: {user_id}')
         
-        user = db.session.get(User, user_id)
+        profile_json = load_user_profile_json(user_id)
         
-        if not user:
-            current_app.logger.error(f'User not found for ID: {user_id}')
+        if not profile_json:
             return jsonify({'error': 'User not found'}), 404
         
-        current_app.logger.info(f'User found: {user.email}')
-        return jsonify({'user': user.to_dict()}), 200
+        # Splice the cached profile bytes into the envelope instead of re-encoding
+        return current_app.response_class(
+            b'{"user":' + profile_json + b'}',
+            mimetype='application/json'
+        ), 200
         
     except Exception as e:
-        from flask import current_app
-        current_app.logger.error(f'Error in /me endpoint: {str(e)}')
-        current_app.logger.error(f'Error type: {type(e).__name__}')
-        import traceback
-        current_app.logger.error(traceback.format_exc())
+        current_app.logger.exception(f'Error in /me endpoint: {str(e)}')
         return jsonify({'error': str(e)}), 500
 
 @auth_bp.route('/refresh', methods=['POST'])
@@ -279,20 +308,28 @@ def logout():
     try:
         user_id = int(get_jwt_identity())  # Convert string back to int
         
-        # Revoke all active sessions for the user
-        UserSession.query.filter_by(user_id=user_id, is_active=True).update({'is_active': False})
-        
-        # Clear refresh token
-        user = db.session.get(User, user_id)
-        if user:
-            user.refresh_token = None
-            user.token_expires_at = None
+        # Revoke all active sessions and clear the refresh token; nothing is loaded into the session
+        db.session.execute(
+            update(UserSession)
+            .where(UserSession.user_id == user_id, UserSession.is_active == True)
+            .values(is_active=False)
+            .execution_options(synchronize_session=False)
+        )
+        db.session.execute(
+            update(User)
+            .where(User.id == user_id)
+            .values(refresh_token=None, token_expires_at=None)
+            .execution_options(synchronize_session=False)
+        )
         
         db.session.commit()
-                # Invalidate all user caches
-        cache_delete(f"user_profile:{user_id}")
-        cache_delete(f"user_plan:{user_id}")
-                # Log logout
+        
+        # Invalidate all user caches
+        cache_delete_many(f"user_profile:{user_id}", f"user_plan:{user_id}")
+        invalidate_user_cache(user_id)
+        invalidate_user_sessions(user_id)
+        
+        # Log logout
         AuditLog.log_event(user_id, 'logout', 'success', request, None)
         
         return jsonify({'message': 'Logged out successfully'}), 200
@@ -307,11 +344,32 @@ def get_sessions():
     try:
         user_id = int(get_jwt_identity())  # Convert string back to int
         
-        sessions = UserSession.query.filter_by(user_id=user_id).order_by(UserSession.created_at.desc()).all()
-        
-        return jsonify({
-            'sessions': [session.to_dict() for session in sessions]
-        }), 200
+        # Keyset pagination, newest first: ?limit=50&before_id=<last id from previous page>
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 100)
+        before_id = request.args.get('before_id', type=int)
+        
+        query = select(UserSession).where(UserSession.user_id == user_id)
+        if before_id:
+            query = query.where(UserSession.id < before_id)
+        
+        # Fetch one extra row to know whether another page exists
+        sessions = db.session.execute(
+            query.order_by(UserSession.id.desc()).limit(limit + 1)
+        ).scalars().all()
+        has_more = len(sessions) > limit
+        sessions = sessions[:limit]
+        
+        return current_app.response_class(
+            orjson.dumps({
+                'sessions': [session.to_dict() for session in sessions],
+                'pagination': {
+                    'limit': limit,
+                    'has_more': has_more,
+                    'next_before_id': sessions[-1].id if has_more else None
+                }
+            }),
+            mimetype='application/json'
+        ), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -329,6 +387,7 @@ def revoke_session(session_id):
         
         session.revoke()
         db.session.commit()
+        invalidate_session(session.session_token)
         
         return jsonify({'message': 'Session revoked successfully'}), 200
         
@@ -350,29 +409,35 @@ def validate_token():
         if not session_token:
             return jsonify({'error': 'Session token required', 'valid': False}), 401
         
-        # Validate session in database
-        session = UserSession.query.filter_by(session_token=session_token).first()
+        # Validate session (Redis first, then database)
+        session = get_cached_session(session_token)
         
-        if not session:
-            return jsonify({'error': 'Invalid session', 'valid': False}), 401
+        if session is None:
+            db_session = UserSession.query.options(load_only(*_SESSION_COLUMNS)).filter_by(
+                session_token=session_token
+            ).first()
+            
+            if not db_session:
+                return jsonify({'error': 'Invalid session', 'valid': False}), 401
+            
+            session = cache_session(session_token, db_session)
         
-        if not session.is_valid():
+        if not is_cached_session_valid(session):
             return jsonify({'error': 'Session expired or revoked', 'valid': False}), 401
         
-        # Update last activity
-        session.last_activity = datetime.utcnow()
-        db.session.commit()
+        # Update last activity (written in batches)
+        record_session_activity(session['id'])
         
         # Get user info
-        user = db.session.get(User, session.user_id)
+        cached_user = load_user_cached(session['user_id'])
         
-        if not user or not user.is_active:
+        if not cached_user or not cached_user['is_active']:
             return jsonify({'error': 'User not found or inactive', 'valid': False}), 401
         
         return jsonify({
             'valid': True,
-            'user': user.to_dict(),
-            'session': session.to_dict()
+            'user': cached_user['minimal'],
+            'session': session['session']
         }), 200
         
     except Exception as e:
@@ -408,13 +473,11 @@ def oauth_callback():
             return jsonify({'error': 'Email not provided by OAuth provider'}), 400
         
         # Check if user exists
-        user = User.query.filter_by(email=email).first()
+        user = User.query.options(load_only(*_AUTH_USER_COLUMNS)).filter_by(email=email).first()
         
         is_new_user = False
         if not user:
             # Create new user from OAuth
-            import logging
-            logger = logging.getLogger(__name__)
             logger.info(f"Creating new user from {provider} OAuth: {email}")
             
             user = User(
@@ -427,7 +490,7 @@ def oauth_callback():
             user.set_password(secrets.token_urlsafe(32))
             
             db.session.add(user)
-            db.session.commit()
+            db.session.flush()  # Assign user.id; committed together with the session below
             is_new_user = True
             
             logger.info(f"New user created successfully: ID={user.id}, Email={email}")
@@ -443,10 +506,7 @@ def oauth_callback():
         user.last_login_ip = request.remote_addr
         
         # Revoke old sessions if limit exceeded
-        active_sessions = UserSession.query.filter_by(user_id=user.id, is_active=True).order_by(UserSession.created_at.desc()).all()
-        if len(active_sessions) >= 5:
-            for old_session in active_sessions[4:]:
-                old_session.revoke()
+        revoke_excess_sessions(user.id)
         
         # Create new session
         device_info = request.headers.get('User-Agent', 'Unknown')
@@ -458,40 +518,17 @@ def oauth_callback():
         )
         db.session.add(session)
         db.session.commit()
+        invalidate_user_cache(user.id)
         
         # Send welcome email and create notification for new OAuth users (first time only)
         if is_new_user:
-            try:
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.info(f"Sending welcome email to new {provider} user: {email}")
-                
-                email_service = EmailService()
-                email_service.send_welcome_email(
-                    user_name=user.name or email.split('@')[0],
-                    user_email=email,
-                    company_name=user.company
-                )
-                
-                logger.info(f"Welcome email sent successfully to {email}")
-                
-                # Create welcome notification
-                try:
-                    from routes.notifications import create_notification
-                    create_notification(
-                        user_id=user.id,
-                        notification_type='welcome',
-                        title=f'Welcome to HireLens! 🎉',
-                        message=f'Your account has been created successfully via {provider.capitalize()}. Start by posting your first job!',
-                        related_type='user',
-                        related_id=user.id,
-                        action_url='/dashboard/jobs/create'
-                    )
-                except Exception as notif_error:
-                    logger.error(f"Failed to create welcome notification: {str(notif_error)}")
-                    
-            except Exception as e:
-                logger.error(f"Failed to send welcome email to {email}: {str(e)}")
+            send_welcome(
+                user.id,
+                user.name or email.split('@')[0],
+                email,
+                user.company,
+                f'Your account has been created successfully via {provider.capitalize()}. Start by posting your first job!'
+            )
         
         return jsonify({
             'message': f'{provider.capitalize()} login successful',
@@ -1,17 +1,123 @@
-from flask import Blueprint, request, jsonify, send_file
+from flask import Blueprint, request, jsonify, send_file, current_app
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.job import Job
 from models.resume import Resume
-from models.user import User
-from extensions import db, cache_get, cache_set, cache_delete, cache_delete_pattern
+from extensions import (
+    db, cache_get, cache_set, cache_delete, cache_delete_many, cache_lock,
+    cache_get_version, cache_bump_version
+)
 from services.email_service import EmailService
+from services.background_tasks import submit_background
+from services.user_cache import load_user_cached
 from routes.notifications import create_notification
-from utils.pagination import paginate, paginate_response
+from utils.pagination import paginate_response, paginate_with_cursor
+from utils.responses import stream_json_response
+from sqlalchemy import or_
+from sqlalchemy.orm import load_only, contains_eager
 import logging
 import os
+import time
 
 candidates_bp = Blueprint('candidates', __name__)
 logger = logging.getLogger(__name__)
+_email_service = EmailService()
+
+# Columns read by Resume.to_dict(); skips parsed_data, ai_explanation, etc. on list endpoints
+_LIST_COLUMNS = (
+    Resume.id, Resume.job_id, Resume.filename, Resume.candidate_name, Resume.email,
+    Resume.phone, Resume.location, Resume.ai_score, Resume.matched_skills,
+    Resume.missing_skills, Resume.experience_years, Resume.education_level,
+    Resume.status, Resume.processing_status, Resume.created_at
+)
+
+def _candidate_row_to_dict(row):
+    """Same shape as Resume.to_dict(include_job=True), built from a column row"""
+    return {
+        'id': row.id,
+        'job_id': row.job_id,
+        'filename': row.filename,
+        'candidate_name': row.candidate_name,
+        'email': row.email,
+        'phone': row.phone,
+        'location': row.location,
+        'ai_score': round(row.ai_score, 2) if row.ai_score else 0,
+        'matched_skills': row.matched_skills or [],
+        'missing_skills': row.missing_skills or [],
+        'experience_years': row.experience_years,
+        'education_level': row.education_level,
+        'status': row.status,
+        'processing_status': row.processing_status,
+        'created_at': row.created_at.isoformat() if row.created_at else None,
+        'job_title': row.job_title,
+        'job_department': row.job_department,
+        'job_location': row.job_location
+    }
+
+def _candidates_response(result, cached):
+    return stream_json_response({**result, 'cached': cached}, 'candidates')
+
+def _get_owned_candidate(candidate_id, user_id):
+    """
+    Load a candidate and its job in one query, only if the job belongs to user_id
+    
+    Missing and foreign candidates both return None, so callers answer 404
+    either way and don't reveal which ids exist.
+    """
+    return Resume.query.join(Job, Resume.job_id == Job.id).options(
+        contains_eager(Resume.job)
+    ).filter(
+        Resume.id == candidate_id,
+        Job.user_id == user_id
+    ).first()
+
+def _invalidate_candidate_caches(user_id, job_id, candidate_id):
+    """Orphan the user's versioned list caches and drop the detail entries"""
+    cache_bump_version(f"user_ver:{user_id}")
+    # Dashboard entries are dropped on commit by services.dashboard_cache
+    cache_delete_many(f"candidate_detail:{user_id}:{candidate_id}", f"job_detail:{user_id}:{job_id}")
+
+def send_status_change_email(user_id, candidate_name, candidate_email, job_title, old_status, new_status):
+    """Send the candidate's status email (background task; False when the send fails)"""
+    # Company comes from the cached profile (invalidated on profile update)
+    user_data = load_user_cached(user_id)
+    company_name = (user_data and user_data['profile']['company']) or 'HireLens'
+    
+    return _email_service.send_status_change_email(
+        candidate_name=candidate_name,
+        candidate_email=candidate_email,
+        job_title=job_title,
+        old_status=old_status,
+        new_status=new_status,
+        company_name=company_name
+    )
+
+def notify_status_change(user_id, candidate_id, candidate_name, candidate_email, job_title, old_status, new_status):
+    """Queue the candidate's status email and the owner's notification as separately retried background tasks"""
+    # Send email notification if status changed to shortlisted, rejected, or hired
+    if new_status in ['shortlisted', 'rejected', 'hired']:
+        submit_background(
+            send_status_change_email,
+            user_id, candidate_name, candidate_email, job_title, old_status, new_status
+        )
+    
+    # Create notification for status change
+    status_messages = {
+        'shortlisted': f'{candidate_name} has been shortlisted',
+        'rejected': f'{candidate_name} has been rejected',
+        'hired': f'{candidate_name} has been hired! 🎉',
+        'new': f'{candidate_name} status changed to new'
+    }
+    
+    submit_background(
+        create_notification,
+        user_id=user_id,
+        notification_type='status_changed',
+        title='Candidate Status Updated',
+        message=status_messages.get(new_status, f'{candidate_name} status updated'),
+        related_type='candidate',
+        related_id=candidate_id,
+        action_url=f'/dashboard/candidates/{candidate_id}'
+    )
 
 @candidates_bp.route('/job/<int:job_id>', methods=['GET'])
 @jwt_required()
@@ -26,14 +132,14 @@ def get_candidates(job_id):
         sort_by = request.args.get('sort_by', 'score')  # score, date
         page = request.args.get('page', 1, type=int)
         per_page = request.args.get('per_page', 50, type=int)
+        cursor = request.args.get('cursor')  # next_cursor from the previous page
         
-        # Verify job ownership
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        if not job:
+        # Verify job ownership (id-only probe, no Job row hydrated)
+        if not db.session.query(Job.id).filter_by(id=job_id, user_id=user_id).first():
             return jsonify({'error': 'Job not found'}), 404
         
         # Build query with optimizations
-        query = Resume.query.filter_by(job_id=job_id)
+        query = Resume.query.options(load_only(*_LIST_COLUMNS)).filter_by(job_id=job_id)
         
         if status:
             query = query.filter_by(status=status)
@@ -41,14 +147,12 @@ def get_candidates(job_id):
         if min_score:
             query = query.filter(Resume.ai_score >= min_score)
         
-        # Sort
-        if sort_by == 'score':
-            query = query.order_by(Resume.ai_score.desc())
-        else:
-            query = query.order_by(Resume.created_at.desc())
+        # Sort (id breaks ties so keyset cursors are unambiguous)
+        sort_columns = (Resume.ai_score, Resume.id) if sort_by == 'score' else (Resume.created_at, Resume.id)
         
-        # Paginate
-        paginated = paginate(query, page=page, per_page=per_page, max_per_page=100)
+        paginated = paginate_with_cursor(query, sort_columns, cursor, page, per_page, max_per_page=200)
+        if paginated is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
         response_data = paginate_response(paginated)
         
         # Restructure response to match frontend expectations (candidates instead of data)
@@ -71,44 +175,58 @@ def get_all_candidates():
         
         # Query parameters
         status = request.args.get('status')
-        search = request.args.get('search', '').lower()
+        search = request.args.get('search', '').strip().lower()
+        page = max(request.args.get('page', 1, type=int), 1)
+        per_page = min(request.args.get('per_page', 50, type=int), 200)
+        cursor = request.args.get('cursor')  # next_cursor from the previous page
         
-        # Create cache key
-        cache_key = f"candidates_all:{user_id}:{status or 'all'}:{search or 'none'}"
+        # Create cache key (one entry per page); bumping user_ver orphans every page at once
+        version = cache_get_version(f"user_ver:{user_id}")
+        position = f"c{cursor}" if cursor else f"p{page}"
+        cache_key = f"candidates_all:{user_id}:v{version}:{status or 'all'}:{search or 'none'}:{position}:pp{per_page}"
         
         # Try to get from cache
         cached_data = cache_get(cache_key)
         if cached_data:
-            return jsonify({
-                'candidates': cached_data,
-                'cached': True
-            }), 200
+            return _candidates_response(cached_data, cached=True), 200
         
-        # Get all candidates across all user's jobs
-        query = Resume.query.join(Job).filter(Job.user_id == user_id)
+        # Plain column rows (no ORM objects) joined to the job fields the list shows
+        query = db.session.query(
+            *_LIST_COLUMNS,
+            Job.title.label('job_title'),
+            Job.department.label('job_department'),
+            Job.location.label('job_location')
+        ).join(Job, Resume.job_id == Job.id).filter(Job.user_id == user_id)
         
         if status:
             query = query.filter(Resume.status == status)
         
-        candidates = query.order_by(Resume.ai_score.desc()).all()
-        candidates_data = [c.to_dict(include_job=True) for c in candidates]
-        
-        # Apply search filter
+        # Search must run in SQL so pagination counts stay correct
         if search:
-            candidates_data = [
-                c for c in candidates_data 
-                if search in c.get('name', '').lower() or 
-                   search in c.get('email', '').lower() or
-                   search in c.get('job_title', '').lower()
-            ]
+            # Escape LIKE wildcards so user input is matched literally
+            escaped = search.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+            pattern = f"%{escaped}%"
+            query = query.filter(or_(
+                Resume.candidate_name.ilike(pattern, escape='\\'),
+                Resume.email.ilike(pattern, escape='\\'),
+                Job.title.ilike(pattern, escape='\\')
+            ))
+        
+        sort_columns = (Resume.ai_score, Resume.id)
+        paginated = paginate_with_cursor(query, sort_columns, cursor, page, per_page, max_per_page=200)
+        if paginated is None:
+            return jsonify({'error': 'Invalid cursor'}), 400
+        response_data = paginate_response(paginated, serializer=_candidate_row_to_dict)
+        
+        result = {
+            'candidates': response_data['data'],
+            'pagination': response_data['pagination']
+        }
         
         # Cache for 2 minutes
-        cache_set(cache_key, candidates_data, expire=120)
+        cache_set(cache_key, result, expire=120)
         
-        return jsonify({
-            'candidates': candidates_data,
-            'cached': False
-        }), 200
+        return _candidates_response(result, cached=False), 200
         
     except Exception as e:
         logger.error(f"Get all candidates error: {str(e)}")
@@ -120,31 +238,44 @@ def get_candidate(candidate_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int to ensure consistency
         
-        # Cache key for single candidate
+        # Cache key for single candidate (False marks a cached "not found")
         cache_key = f"candidate_detail:{user_id}:{candidate_id}"
         
+        lock_key = f"lock:{cache_key}"
+        locked = False
+        
         # Try to get from cache
         cached_data = cache_get(cache_key)
+        if cached_data is None:
+            # Single-flight: one request rebuilds the entry, others briefly wait for it
+            locked = cache_lock(lock_key, expire=5)
+            if not locked:
+                time.sleep(0.05)
+                cached_data = cache_get(cache_key)
+        
+        if cached_data is False:
+            return jsonify({'error': 'Candidate not found'}), 404
         if cached_data:
             return jsonify({
                 'candidate': cached_data,
                 'cached': True
             }), 200
         
-        # First, check if candidate exists at all
-        candidate = Resume.query.get(candidate_id)
-        if not candidate:
-            return jsonify({'error': 'Candidate not found'}), 404
-        
-        # Then check if it belongs to user's job
-        job = Job.query.filter_by(id=candidate.job_id, user_id=user_id).first()
-        if not job:
-            return jsonify({'error': 'Unauthorized access to this candidate'}), 403
-        
-        candidate_data = candidate.to_dict(include_job=True)
-        
-        # Cache for 5 minutes
-        cache_set(cache_key, candidate_data, expire=300)
+        try:
+            # Candidate and ownership check in one query
+            candidate = _get_owned_candidate(candidate_id, user_id)
+            if not candidate:
+                # Short negative TTL so repeated bad ids don't reach the database
+                cache_set(cache_key, False, expire=30)
+                return jsonify({'error': 'Candidate not found'}), 404
+            
+            candidate_data = candidate.to_dict(include_job=True)
+            
+            # Cache for 5 minutes
+            cache_set(cache_key, candidate_data, expire=300)
+        finally:
+            if locked:
+                cache_delete(lock_key)
         
         return jsonify({
             'candidate': candidate_data,
@@ -161,15 +292,11 @@ def update_candidate_status(candidate_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Get candidate first
-        candidate = Resume.query.get(candidate_id)
+        # Candidate and ownership check in one query
+        candidate = _get_owned_candidate(candidate_id, user_id)
         if not candidate:
             return jsonify({'error': 'Candidate not found'}), 404
-        
-        # Check if job belongs to user
-        job = Job.query.filter_by(id=candidate.job_id, user_id=user_id).first()
-        if not job:
-            return jsonify({'error': 'Unauthorized access'}), 403
+        job = candidate.job
         
         data = request.get_json()
         new_status = data.get('status')
@@ -178,57 +305,29 @@ def update_candidate_status(candidate_id):
             return jsonify({'error': 'Invalid status'}), 400
         
         old_status = candidate.status
+        if new_status == old_status:
+            # Nothing changed: no write, no cache invalidation, no email
+            return jsonify({
+                'message': 'Status updated successfully',
+                'candidate': candidate.to_dict()
+            }), 200
+        
         candidate.status = new_status
         db.session.commit()
         
-        # Send email notification if status changed to shortlisted, rejected, or hired
-        if new_status in ['shortlisted', 'rejected', 'hired'] and old_status != new_status:
-            try:
-                user = User.query.get(job.user_id)
-                company_name = user.company or 'HireLens'
-                
-                email_service = EmailService()
-                email_service.send_status_change_email(
-                    candidate_name=candidate.candidate_name,
-                    candidate_email=candidate.email,
-                    job_title=job.title,
-                    old_status=old_status,
-                    new_status=new_status,
-                    company_name=company_name
-                )
-                logger.info(f"Status change email sent to {candidate.email} for status: {new_status}")
-            except Exception as e:
-                logger.error(f"Failed to send status change email: {str(e)}")
-                # Don't fail the status update if email fails
-        
-        # Invalidate cache
-        cache_delete(f"candidate_detail:{user_id}:{candidate_id}")
-        cache_delete_pattern(f"candidates_job:{user_id}:{candidate.job_id}:*")
-        cache_delete_pattern(f"candidates_all:{user_id}:*")
-        cache_delete_pattern(f"dashboard_*:{user_id}")
-        cache_delete(f"job_detail:{user_id}:{candidate.job_id}")
-        
-        # Create notification for status change
-        if new_status != old_status:
-            status_messages = {
-                'shortlisted': f'{candidate.candidate_name} has been shortlisted',
-                'rejected': f'{candidate.candidate_name} has been rejected',
-                'hired': f'{candidate.candidate_name} has been hired! 🎉',
-                'new': f'{candidate.candidate_name} status changed to new'
-            }
-            
-            try:
-                create_notification(
-                    user_id=user_id,
-                    notification_type='status_changed',
-                    title='Candidate Status Updated',
-                    message=status_messages.get(new_status, f'{candidate.candidate_name} status updated'),
-                    related_type='candidate',
-                    related_id=candidate_id,
-                    action_url=f'/dashboard/candidates/{candidate_id}'
-                )
-            except Exception as e:
-                logger.error(f"Failed to create notification: {str(e)}")
+        # Invalidate cache before responding so the next read sees the new status
+        _invalidate_candidate_caches(user_id, candidate.job_id, candidate_id)
+        
+        # Email and notification don't block the response
+        notify_status_change(
+            user_id,
+            candidate_id,
+            candidate.candidate_name,
+            candidate.email,
+            job.title,
+            old_status,
+            new_status
+        )
         
         return jsonify({
             'message': 'Status updated successfully',
@@ -246,10 +345,7 @@ def delete_candidate(candidate_id):
     try:
         user_id = get_jwt_identity()
         
-        candidate = Resume.query.join(Job).filter(
-            Resume.id == candidate_id,
-            Job.user_id == user_id
-        ).first()
+        candidate = _get_owned_candidate(candidate_id, user_id)
         
         if not candidate:
             return jsonify({'error': 'Candidate not found'}), 404
@@ -261,11 +357,7 @@ def delete_candidate(candidate_id):
         db.session.commit()
         
         # Invalidate cache
-        cache_delete(f"candidate_detail:{user_id}:{candidate_id}")
-        cache_delete_pattern(f"candidates_job:{user_id}:{job_id}:*")
-        cache_delete_pattern(f"candidates_all:{user_id}:*")
-        cache_delete_pattern(f"dashboard_*:{user_id}")
-        cache_delete(f"job_detail:{user_id}:{job_id}")
+        _invalidate_candidate_caches(user_id, job_id, candidate_id)
         
         return jsonify({'message': 'Candidate deleted successfully'}), 200
         
@@ -280,24 +372,37 @@ def download_resume(candidate_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Get candidate first
-        candidate = Resume.query.get(candidate_id)
+        # Candidate and ownership check in one query
+        candidate = _get_owned_candidate(candidate_id, user_id)
         if not candidate:
             return jsonify({'error': 'Candidate not found'}), 404
         
-        # Check if job belongs to user
-        job = Job.query.filter_by(id=candidate.job_id, user_id=user_id).first()
-        if not job:
-            return jsonify({'error': 'Unauthorized access'}), 403
-        
-        if not os.path.exists(candidate.file_path):
+        # Let nginx serve the bytes so slow clients don't hold a worker
+        accel_prefix = current_app.config.get('UPLOAD_ACCEL_REDIRECT_PREFIX')
+        if accel_prefix:
+            relative_path = os.path.relpath(candidate.file_path, current_app.config['UPLOAD_FOLDER'])
+            if not relative_path.startswith('..'):
+                response = current_app.response_class(mimetype='application/pdf')
+                response.headers['X-Accel-Redirect'] = f"{accel_prefix.rstrip('/')}/{relative_path.replace(os.sep, '/')}"
+                return response
+        
+        # send_file stats the file itself; a missing file raises instead of a separate exists() check
+        try:
+            response = send_file(
+                candidate.file_path,
+                as_attachment=False,  # Open in browser instead of downloading
+                mimetype='application/pdf',
+                conditional=True,  # Honour If-Modified-Since / Range
+                max_age=3600
+            )
+        except (FileNotFoundError, TypeError):
+            # TypeError: no file_path recorded for this candidate
             return jsonify({'error': 'Resume file not found'}), 404
         
-        return send_file(
-            candidate.file_path,
-            as_attachment=False,  # Open in browser instead of downloading
-            mimetype='application/pdf'
-        )
+        # Browser may reuse it for an hour, shared caches must not store it
+        response.cache_control.public = False
+        response.cache_control.private = True
+        return response
         
     except Exception as e:
         logger.error(f"Download resume error: {str(e)}")
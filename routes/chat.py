@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 import google.generativeai as genai
 import os
+import re
+import time
 import logging
 
 chat_bp = Blueprint('chat', __name__)
@@ -34,7 +36,104 @@ HOW TO RESPOND:
 ✅ Keep answers conversational, friendly, under 100 words
 ✅ For unknown details: "I don't have information about [topic], but our team can help! Contact sales@hirelens.ai or support@hirelens.ai"
 ✅ Never make up information
-✅ Vary your responses - don't repeat yourself"""
+✅ Vary your responses - don't repeat yourself
+
+Answer the user's latest question directly. If you don't know something specific (like employee names, CEO, internal details), be honest and say you don't have that information, then offer to connect them with the right team. Be conversational and helpful. Keep it under 100 words."""
+
+# Models in order of preference, built once with the system context attached
+# so each request only sends the conversation turns
+MODEL_NAMES = ('gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-2.0-flash-exp')
+_MODELS = [
+    (model_name, genai.GenerativeModel(model_name, system_instruction=SYSTEM_CONTEXT))
+    for model_name in MODEL_NAMES
+]
+
+_GENERATION_CONFIG = genai.types.GenerationConfig(
+    temperature=0.7,  # More creative but still focused
+    top_p=0.95,
+    top_k=40,
+    max_output_tokens=200,  # Concise responses
+)
+
+MODEL_TIMEOUT = 8  # seconds per model call
+MODEL_DEADLINE = 12  # seconds across all models before the canned fallback answers
+
+MAX_CHAT_REQUEST_BYTES = 32 * 1024  # Public endpoint: message plus a few turns of history
+MAX_HISTORY_MESSAGES = 6
+
+
+def _bounded_history(conversation_history):
+    """Last MAX_HISTORY_MESSAGES well-formed turns; anything else in the client payload is ignored"""
+    if not isinstance(conversation_history, list):
+        return []
+    return [
+        msg for msg in conversation_history[-MAX_HISTORY_MESSAGES:]
+        if isinstance(msg, dict) and isinstance(msg.get('sender'), str) and isinstance(msg.get('text'), str)
+    ]
+
+
+def _build_contents(conversation_history, user_message):
+    """Convert the (already bounded) chat widget history plus the new message into Gemini turns"""
+    contents = []
+    for msg in conversation_history:
+        role = 'user' if msg['sender'] == 'user' else 'model'
+        text = msg['text']
+        if not contents and role == 'model':
+            continue  # Conversations must start with a user turn (skip the greeting)
+        if contents and contents[-1]['role'] == role:
+            contents[-1]['parts'].append(text)
+        else:
+            contents.append({'role': role, 'parts': [text]})
+    
+    if contents and contents[-1]['role'] == 'user':
+        contents[-1]['parts'].append(user_message)
+    else:
+        contents.append({'role': 'user', 'parts': [user_message]})
+    return contents
+
+
+def _generate(model, contents, timeout):
+    response = model.generate_content(
+        contents,
+        generation_config=_GENERATION_CONFIG,
+        request_options={'timeout': timeout}
+    )
+    return response.text.strip()
+
+
+def _generate_with_fallback(contents):
+    """
+    Get a reply from the first model that answers, one call at a time.
+    
+    Each call is capped at MODEL_TIMEOUT and the fallbacks only get what is
+    left of MODEL_DEADLINE, so a degraded model costs one timeout rather
+    than one per model.
+    """
+    last_error = None
+    deadline = time.monotonic() + MODEL_DEADLINE
+    
+    for model_name, model in _MODELS:
+        remaining = deadline - time.monotonic()
+        if remaining < 1:
+            last_error = TimeoutError(f"No model answered within {MODEL_DEADLINE}s")
+            break
+        try:
+            response_text = _generate(model, contents, min(MODEL_TIMEOUT, remaining))
+            if response_text:
+                logger.info(f"Successfully used model: {model_name}")
+                return response_text
+        except Exception as model_error:
+            last_error = model_error
+            logger.warning(f"Model {model_name} failed: {str(model_error)[:100]}")
+    
+    raise Exception(f"All models failed. Last error: {last_error}")
+
+@chat_bp.before_request
+def limit_request_size():
+    """Reject oversized bodies before they are read or JSON-decoded"""
+    if request.content_length is not None and request.content_length > MAX_CHAT_REQUEST_BYTES:
+        return jsonify({'error': 'Request too large'}), 413
+
 
 @chat_bp.route('/chat', methods=['POST'])
 def chat():
@@ -42,7 +141,7 @@ def chat():
     try:
         data = request.get_json()
         user_message = data.get('message', '').strip()
-        conversation_history = data.get('history', [])  # Get conversation history
+        conversation_history = _bounded_history(data.get('history'))  # Last few turns for context
         
         if not user_message:
             return jsonify({'error': 'Message is required'}), 400
@@ -55,56 +154,8 @@ def chat():
             }), 200
         
         try:
-            # Try multiple Gemini models in order of preference
-            models_to_try = ['gemini-1.5-flash', 'gemini-1.5-pro', 'gemini-2.0-flash-exp']
-            
-            response_text = None
-            last_error = None
-            
-            # Build conversation context from history
-            conversation_text = ""
-            if conversation_history:
-                for msg in conversation_history[-6:]:  # Last 6 messages for context
-                    role = "User" if msg.get('sender') == 'user' else "Assistant"
-                    conversation_text += f"{role}: {msg.get('text', '')}\n"
-            
-            # Create contextual prompt
-            prompt = f"""{SYSTEM_CONTEXT}
-
-Previous conversation:
-{conversation_text if conversation_text else 'No previous context'}
-
-User's current question: {user_message}
-
-Instructions: Answer this question directly. If you don't know something specific (like employee names, CEO, internal details), be honest and say you don't have that information, then offer to connect them with the right team. Be conversational and helpful. Keep it under 100 words."""
-            
-            # Try each model until one succeeds
-            for model_name in models_to_try:
-                try:
-                    model = genai.GenerativeModel(model_name)
-                    
-                    # Generate response with settings for better quality
-                    response = model.generate_content(
-                        prompt,
-                        generation_config=genai.types.GenerationConfig(
-                            temperature=0.7,  # More creative but still focused
-                            top_p=0.95,
-                            top_k=40,
-                            max_output_tokens=200,  # Concise responses
-                        )
-                    )
-                    
-                    response_text = response.text.strip()
-                    logger.info(f"Successfully used model: {model_name}")
-                    break  # Success, exit the loop
-                except Exception as model_error:
-                    last_error = model_error
-                    logger.warning(f"Model {model_name} failed: {str(model_error)[:100]}")
-                    continue  # Try next model
-            
-            if not response_text:
-                # All models failed, use fallback
-                raise Exception(f"All models failed. Last error: {last_error}")
+            contents = _build_contents(conversation_history, user_message)
+            response_text = _generate_with_fallback(contents)
             
             bot_response = response_text
             
@@ -128,45 +179,39 @@ Instructions: Answer this question directly. If you don't know something specifi
         return jsonify({'error': 'Failed to process message'}), 500
 
 
-def get_fallback_response(message):
-    """Generate smart fallback responses when AI is unavailable"""
-    message_lower = message.lower()
-    
+# Fallback topics in priority order: (name, keywords, response)
+_FALLBACK_TOPICS = (
     # CEO / Team questions
-    if any(word in message_lower for word in ['ceo', 'founder', 'owner', 'who run', 'who made', 'who created', 'who built', 'nikhil']):
-        return """**Nikhil Sangale** is the Founder, Owner, and CEO of HireLens! 🚀
+    ('ceo', ['ceo', 'founder', 'owner', 'who run', 'who made', 'who created', 'who built', 'nikhil'], """**Nikhil Sangale** is the Founder, Owner, and CEO of HireLens! 🚀
 
 He built HireLens to revolutionize recruitment with AI-powered hiring solutions.
 
 Want to connect with the team?
 📧 support@hirelens.ai | sales@hirelens.ai
-📞 +91 9075910683"""
+📞 +91 9075910683"""),
 
     # Pricing questions
-    if any(word in message_lower for word in ['price', 'pricing', 'cost', 'plan', 'subscription', 'pay', 'money', '$']):
-        return """💰 **Our Pricing:**
+    ('pricing', ['price', 'pricing', 'cost', 'plan', 'subscription', 'pay', 'money', '$'], """💰 **Our Pricing:**
 
 • **Starter** - $19.99/mo: 3 jobs, 500 resumes
 • **Pro** - $49.99/mo: 10 jobs, 2000 resumes  
 • **Enterprise** - Custom: Unlimited everything
 
 14-day free trial available! Want to chat with sales? 
-📧 sales@hirelens.ai"""
+📧 sales@hirelens.ai"""),
 
     # How it works
-    elif any(word in message_lower for word in ['work', 'how', 'what', 'feature', 'do', 'does']):
-        return """🚀 **HireLens in 4 steps:**
+    ('how_it_works', ['work', 'how', 'what', 'feature', 'do', 'does'], """🚀 **HireLens in 4 steps:**
 
 1. Post your job with requirements
 2. Upload resumes (or connect ATS)
 3. AI screens & ranks candidates automatically
 4. Review top matches with detailed insights
 
-We save you 80% of screening time! Want a demo?"""
+We save you 80% of screening time! Want a demo?"""),
 
     # AI/Interview features
-    elif any(word in message_lower for word in ['ai', 'interview', 'video', 'automation', 'smart', 'intelligent']):
-        return """🤖 **AI Features:**
+    ('ai_features', ['ai', 'interview', 'video', 'automation', 'smart', 'intelligent'], """🤖 **AI Features:**
 
 ✅ Smart resume parsing & analysis
 ✅ Automated candidate ranking
@@ -174,33 +219,30 @@ We save you 80% of screening time! Want a demo?"""
 ✅ Skills matching & gap analysis
 ✅ Real-time insights & reports
 
-The AI learns from your hiring patterns. Interested in a demo?"""
+The AI learns from your hiring patterns. Interested in a demo?"""),
 
     # Contact/Support
-    elif any(word in message_lower for word in ['contact', 'support', 'help', 'talk', 'human', 'call', 'speak', 'email']):
-        return """📞 **Get in touch:**
+    ('contact', ['contact', 'support', 'help', 'talk', 'human', 'call', 'speak', 'email'], """📞 **Get in touch:**
 
 • **Email**: support@hirelens.ai (fastest!)
 • **Sales**: sales@hirelens.ai
 • **Phone**: +91 9075910683
 • **Hours**: Mon-Fri, 9am-6pm IST
 
-We typically respond within 2 hours. What do you need help with?"""
+We typically respond within 2 hours. What do you need help with?"""),
 
     # Getting started
-    elif any(word in message_lower for word in ['start', 'begin', 'sign up', 'register', 'trial', 'demo', 'try']):
-        return """🎯 **Get Started:**
+    ('getting_started', ['start', 'begin', 'sign up', 'register', 'trial', 'demo', 'try'], """🎯 **Get Started:**
 
 1. Sign up at hirelens.ai (free trial)
 2. Create your first job
 3. Upload resumes
 4. Watch AI work its magic!
 
-No credit card needed for trial. Want me to connect you with our team for a personalized demo?"""
+No credit card needed for trial. Want me to connect you with our team for a personalized demo?"""),
 
     # Resume/screening
-    elif any(word in message_lower for word in ['resume', 'cv', 'screen', 'candidate', 'applicant']):
-        return """📄 **Resume Screening:**
+    ('resume_screening', ['resume', 'cv', 'screen', 'candidate', 'applicant'], """📄 **Resume Screening:**
 
 Our AI reads resumes like a human recruiter:
 • Extracts skills, experience, education
@@ -208,11 +250,10 @@ Our AI reads resumes like a human recruiter:
 • Scores candidates objectively
 • Finds hidden gems you might miss
 
-Handles PDFs, Word docs, and more. Want to see it in action?"""
+Handles PDFs, Word docs, and more. Want to see it in action?"""),
 
     # Integration
-    elif any(word in message_lower for word in ['integrat', 'ats', 'api', 'connect', 'sync']):
-        return """🔗 **Integrations:**
+    ('integrations', ['integrat', 'ats', 'api', 'connect', 'sync'], """🔗 **Integrations:**
 
 We integrate with popular ATS platforms and offer:
 • REST API for custom integrations
@@ -220,11 +261,10 @@ We integrate with popular ATS platforms and offer:
 • CSV import/export
 • Email forwarding for auto-parsing
 
-Need specific integration? Email sales@hirelens.ai"""
+Need specific integration? Email sales@hirelens.ai"""),
 
     # Benefits/why
-    elif any(word in message_lower for word in ['why', 'benefit', 'better', 'advantage', 'save']):
-        return """✨ **Why HireLens?**
+    ('benefits', ['why', 'benefit', 'better', 'advantage', 'save'], """✨ **Why HireLens?**
 
 ⚡ Save 80% of screening time
 🎯 Reduce bias with objective AI scoring
@@ -232,11 +272,10 @@ Need specific integration? Email sales@hirelens.ai"""
 📊 Data-driven hiring decisions
 🚀 Faster time-to-hire
 
-Try free for 14 days and see the difference!"""
+Try free for 14 days and see the difference!"""),
+)
 
-    # Default response
-    else:
-        return """👋 I'm here to help! I can answer questions about:
+_FALLBACK_DEFAULT = """👋 I'm here to help! I can answer questions about:
 
 • 💰 Pricing & plans
 • 🎯 How HireLens works
@@ -246,6 +285,35 @@ Try free for 14 days and see the difference!"""
 
 What would you like to know?"""
 
+_FALLBACK_PRIORITY = {name: i for i, (name, _, _) in enumerate(_FALLBACK_TOPICS)}
+_FALLBACK_RESPONSES = {name: response for name, _, response in _FALLBACK_TOPICS}
+
+# One alternation per topic inside a lookahead, so a single pass over the message
+# reports the highest-priority topic starting at each position (substring match,
+# same as the previous `word in message.lower()` checks)
+_FALLBACK_RE = re.compile(
+    '(?=' + '|'.join(
+        f"(?P<{name}>{'|'.join(re.escape(word) for word in keywords)})"
+        for name, keywords, _ in _FALLBACK_TOPICS
+    ) + ')',
+    re.IGNORECASE
+)
+
+
+def get_fallback_response(message):
+    """Generate smart fallback responses when AI is unavailable"""
+    best = None
+    for match in _FALLBACK_RE.finditer(message):
+        priority = _FALLBACK_PRIORITY[match.lastgroup]
+        if best is None or priority < best:
+            best = priority
+            if best == 0:
+                break
+    
+    if best is None:
+        return _FALLBACK_DEFAULT
+    return _FALLBACK_TOPICS[best][2]
+
 
 @chat_bp.route('/chat/health', methods=['GET'])
 def chat_health():
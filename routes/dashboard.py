@@ -1,96 +1,238 @@
-from flask import Blueprint, jsonify
+from flask import Blueprint, jsonify, request, make_response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.job import Job
 from models.resume import Resume
 from models.user import User
-from extensions import db, cache_get, cache_set
-from sqlalchemy import func, desc
+from extensions import db, cache_get, cache_set, cache_mget, cache_set_many
+from utils.responses import json_response
+from services.dashboard_cache import DASHBOARD_CACHE_TTL, STATS_CACHE_TTL, dashboard_cache_keys, dashboard_etag
+from sqlalchemy import func, desc, case, distinct, select, union_all, literal, null
+from sqlalchemy.orm import load_only
 from datetime import datetime, timedelta
+from functools import wraps
 import logging
+import time
 
 dashboard_bp = Blueprint('dashboard', __name__)
 logger = logging.getLogger(__name__)
 
+ACTIVITY_LIMIT = 8
+
+# 304s are only given within one bucket, so relative times ('12 sec ago') can't go stale
+# on the client for longer than this
+ETAG_BUCKET_SECONDS = 60
+
+_EPOCH = datetime(1970, 1, 1)
+
+# Activity feed entries by event kind: (action, color)
+_ACTIVITY_KINDS = {
+    'resume_processed': ('Resume processed', '#FF6B35'),
+    'candidate_shortlisted': ('Candidate shortlisted', '#06A77D'),
+    'job_created': ('Job created', '#004E89')
+}
+
+def _ago(secs):
+    """Activity-feed age: '12 sec ago', '5 min ago', '3 hours ago', '2 days ago'"""
+    if secs < 60:
+        return f"{int(secs)} sec ago"
+    if secs < 3600:
+        return f"{int(secs // 60)} min ago"
+    if secs < 86400:
+        return f"{int(secs // 3600)} hours ago"
+    return f"{int(secs // 86400)} days ago"
+
+def _days_ago(secs):
+    """Job age at day granularity: 'Today', '1 day ago', '3 days ago', '1 week ago', '2 weeks ago'"""
+    days = int(secs // 86400)
+    if days == 0:
+        return "Today"
+    if days == 1:
+        return "1 day ago"
+    if days < 7:
+        return f"{days} days ago"
+    if days < 14:
+        return "1 week ago"
+    return f"{days // 7} weeks ago"
+
+def _timestamp(dt):
+    """Naive UTC datetime as epoch seconds, for caching alongside the payload"""
+    return (dt - _EPOCH).total_seconds()
+
+def _render_recent_jobs(jobs_data, now_ts):
+    """Cached recent jobs with created_at as a job age relative to now"""
+    return [{**job, 'created_at': _days_ago(now_ts - job['created_at'])} for job in jobs_data]
+
+def _render_activity(activities, now_ts):
+    """Cached activity with time as an age relative to now"""
+    return [{**activity, 'time': _ago(now_ts - activity['time'])} for activity in activities]
+
+def _newest(events):
+    """Newest ACTIVITY_LIMIT rows of one event source, so each UNION branch stops early"""
+    return select(events.order_by(desc('ts')).limit(ACTIVITY_LIMIT).subquery())
+
+def _resume_events(user_id, kind, condition):
+    """Activity rows (kind, ts, candidate_name, job_title) for the user's resumes matching condition"""
+    return _newest(select(
+        literal(kind).label('kind'),
+        Resume.created_at.label('ts'),
+        Resume.candidate_name.label('candidate_name'),
+        Job.title.label('job_title')
+    ).join(Job, Resume.job_id == Job.id).where(Job.user_id == user_id, condition))
+
+def _build_stats(user_id, now):
+    """Payload for /stats"""
+    # All six figures in one pass over the user's jobs and their resumes
+    week_ago = now - timedelta(days=7)
+    month_ago = now - timedelta(days=30)
+    
+    row = db.session.query(
+        func.count(distinct(case((Job.status == 'active', Job.id)))).label('active_jobs'),
+        func.count(Resume.id).label('total_candidates'),
+        func.count(case((Resume.status == 'shortlisted', Resume.id))).label('shortlisted'),
+        func.avg(case((Resume.processing_status == 'completed', Resume.processing_time_seconds))).label('avg_processing'),
+        func.count(distinct(case((Job.created_at >= week_ago, Job.id)))).label('jobs_this_week'),
+        func.count(case((Resume.created_at >= month_ago, Resume.id))).label('candidates_this_month')
+    ).select_from(Job)\
+        .outerjoin(Resume, Resume.job_id == Job.id)\
+        .filter(Job.user_id == user_id)\
+        .one()
+    
+    active_jobs = row.active_jobs
+    total_candidates = row.total_candidates
+    shortlisted = row.shortlisted
+    avg_processing = row.avg_processing or 0
+    jobs_this_week = row.jobs_this_week
+    candidates_this_month = row.candidates_this_month
+    
+    # Shortlist rate
+    shortlist_rate = (shortlisted / total_candidates * 100) if total_candidates > 0 else 0
+    
+    return {
+        'active_jobs': {
+            'value': active_jobs,
+            'change': f'+{jobs_this_week} this week'
+        },
+        'total_candidates': {
+            'value': total_candidates,
+            'change': f'+{candidates_this_month} this month'
+        },
+        'shortlisted': {
+            'value': shortlisted,
+            'change': f'{shortlist_rate:.1f}% rate'
+        },
+        'avg_processing_time': {
+            'value': f'{avg_processing:.1f}s',
+            'change': '70% faster'  # This would need historical data to calculate
+        }
+    }
+
+def _build_recent_jobs(user_id, now):
+    """Cacheable payload for /recent-jobs (created_at as a timestamp; see _render_recent_jobs)"""
+    # Get recent 5 jobs with their candidate and shortlisted counts in one query
+    rows = db.session.query(
+        Job,
+        func.count(Resume.id).label('candidates_count'),
+        func.count(case((Resume.status == 'shortlisted', Resume.id))).label('shortlisted_count')
+    ).options(load_only(Job.id, Job.title, Job.department, Job.status, Job.created_at))\
+        .outerjoin(Resume, Resume.job_id == Job.id)\
+        .filter(Job.user_id == user_id)\
+        .group_by(Job.id)\
+        .order_by(desc(Job.created_at))\
+        .limit(5)\
+        .all()
+    
+    jobs_data = []
+    for job, candidates_count, shortlisted_count in rows:
+        jobs_data.append({
+            'id': job.id,
+            'title': job.title,
+            'department': job.department or 'General',
+            'candidates': candidates_count,
+            'shortlisted': shortlisted_count,
+            'status': job.status.capitalize(),
+            'created_at': _timestamp(job.created_at)
+        })
+    return jobs_data
+
+def _build_activity(user_id, now):
+    """Cacheable payload for /activity (time as a timestamp; see _render_activity)"""
+    # Every event source in one UNION ALL, newest first by the real timestamp
+    events = union_all(
+        _resume_events(user_id, 'resume_processed', Resume.processing_status == 'completed'),
+        _resume_events(user_id, 'candidate_shortlisted', Resume.status == 'shortlisted'),
+        _newest(select(
+            literal('job_created').label('kind'),
+            Job.created_at.label('ts'),
+            null().label('candidate_name'),
+            Job.title.label('job_title')
+        ).where(Job.user_id == user_id))
+    ).order_by(desc('ts')).limit(ACTIVITY_LIMIT)
+    
+    activities = []
+    for kind, ts, candidate_name, job_title in db.session.execute(events):
+        action, color = _ACTIVITY_KINDS[kind]
+        activities.append({
+            'action': action,
+            'detail': job_title if kind == 'job_created' else f"{candidate_name or 'Unknown'} - {job_title}",
+            'time': _timestamp(ts),
+            'color': color
+        })
+    return activities
+
+def _conditional(section):
+    """
+    Answer If-None-Match with 304 while the user's dashboard is unchanged
+    
+    The ETag comes from services.dashboard_cache, which rotates it on every
+    job/resume write, so a match skips the cache read and serialization.
+    It also changes every ETAG_BUCKET_SECONDS so relative times are redrawn.
+    Without Redis no ETag is sent and the view always runs.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            token = dashboard_etag(get_jwt_identity())
+            bucket = int(time.time() // ETAG_BUCKET_SECONDS)
+            etag = f"{section}-{token}-{bucket}" if token else None
+            if etag and request.if_none_match.contains(etag):
+                response = make_response('', 304)
+            else:
+                response = make_response(view(*args, **kwargs))
+                if not etag or response.status_code != 200:
+                    return response
+            response.set_etag(etag)
+            response.cache_control.private = True
+            response.cache_control.no_cache = True  # Revalidate every time
+            return response
+        return wrapper
+    return decorator
+
 @dashboard_bp.route('/stats', methods=['GET'])
 @jwt_required()
+@_conditional('stats')
 def get_dashboard_stats():
     """Get dashboard statistics with Redis caching"""
     try:
         user_id = get_jwt_identity()
-        cache_key = f"dashboard_stats:{user_id}"
+        cache_key = dashboard_cache_keys(user_id)[0]
         
         # Try to get from cache
         cached_data = cache_get(cache_key)
         if cached_data:
-            return jsonify({
+            return json_response({
                 'stats': cached_data,
                 'cached': True
-            }), 200
-        
-        # Calculate stats
-        # Active jobs count
-        active_jobs = Job.query.filter_by(user_id=user_id, status='active').count()
-        
-        # Total candidates (resumes) count
-        total_candidates = db.session.query(func.count(Resume.id))\
-            .join(Job)\
-            .filter(Job.user_id == user_id)\
-            .scalar() or 0
-        
-        # Shortlisted candidates count
-        shortlisted = db.session.query(func.count(Resume.id))\
-            .join(Job)\
-            .filter(Job.user_id == user_id, Resume.status == 'shortlisted')\
-            .scalar() or 0
-        
-        # Average processing time
-        avg_processing = db.session.query(func.avg(Resume.processing_time_seconds))\
-            .join(Job)\
-            .filter(Job.user_id == user_id, Resume.processing_status == 'completed')\
-            .scalar() or 0
-        
-        # Calculate changes (week over week)
-        week_ago = datetime.utcnow() - timedelta(days=7)
-        jobs_this_week = Job.query.filter(
-            Job.user_id == user_id, 
-            Job.created_at >= week_ago
-        ).count()
-        
-        month_ago = datetime.utcnow() - timedelta(days=30)
-        candidates_this_month = db.session.query(func.count(Resume.id))\
-            .join(Job)\
-            .filter(Job.user_id == user_id, Resume.created_at >= month_ago)\
-            .scalar() or 0
-        
-        # Shortlist rate
-        shortlist_rate = (shortlisted / total_candidates * 100) if total_candidates > 0 else 0
+            })
         
-        stats = {
-            'active_jobs': {
-                'value': active_jobs,
-                'change': f'+{jobs_this_week} this week'
-            },
-            'total_candidates': {
-                'value': total_candidates,
-                'change': f'+{candidates_this_month} this month'
-            },
-            'shortlisted': {
-                'value': shortlisted,
-                'change': f'{shortlist_rate:.1f}% rate'
-            },
-            'avg_processing_time': {
-                'value': f'{avg_processing:.1f}s',
-                'change': '70% faster'  # This would need historical data to calculate
-            }
-        }
+        stats = _build_stats(user_id, datetime.utcnow())
         
-        # Cache for 5 minutes
-        cache_set(cache_key, stats, expire=300)
+        # Dropped on the next job/resume write; the short TTL keeps the weekly/monthly windows current
+        cache_set(cache_key, stats, expire=STATS_CACHE_TTL)
         
-        return jsonify({
+        return json_response({
             'stats': stats,
             'cached': False
-        }), 200
+        })
         
     except Exception as e:
         logger.error(f"Dashboard stats error: {str(e)}")
@@ -99,62 +241,31 @@ def get_dashboard_stats():
 
 @dashboard_bp.route('/recent-jobs', methods=['GET'])
 @jwt_required()
+@_conditional('recent-jobs')
 def get_recent_jobs():
     """Get recent jobs with Redis caching"""
     try:
         user_id = get_jwt_identity()
-        cache_key = f"dashboard_recent_jobs:{user_id}"
+        cache_key = dashboard_cache_keys(user_id)[1]
         
         # Try to get from cache
+        now = datetime.utcnow()
         cached_data = cache_get(cache_key)
-        if cached_data:
-            return jsonify({
-                'jobs': cached_data,
+        if cached_data is not None:
+            return json_response({
+                'jobs': _render_recent_jobs(cached_data, _timestamp(now)),
                 'cached': True
-            }), 200
-        
-        # Get recent 5 jobs
-        jobs = Job.query.filter_by(user_id=user_id)\
-            .order_by(desc(Job.created_at))\
-            .limit(5)\
-            .all()
-        
-        jobs_data = []
-        for job in jobs:
-            # Get candidates and shortlisted count
-            candidates_count = Resume.query.filter_by(job_id=job.id).count()
-            shortlisted_count = Resume.query.filter_by(job_id=job.id, status='shortlisted').count()
-            
-            # Calculate time ago
-            time_diff = datetime.utcnow() - job.created_at
-            if time_diff.days == 0:
-                created_ago = "Today"
-            elif time_diff.days == 1:
-                created_ago = "1 day ago"
-            elif time_diff.days < 7:
-                created_ago = f"{time_diff.days} days ago"
-            elif time_diff.days < 14:
-                created_ago = "1 week ago"
-            else:
-                created_ago = f"{time_diff.days // 7} weeks ago"
-            
-            jobs_data.append({
-                'id': job.id,
-                'title': job.title,
-                'department': job.department or 'General',
-                'candidates': candidates_count,
-                'shortlisted': shortlisted_count,
-                'status': job.status.capitalize(),
-                'created_at': created_ago
             })
         
-        # Cache for 2 minutes
-        cache_set(cache_key, jobs_data, expire=120)
+        jobs_data = _build_recent_jobs(user_id, now)
+        
+        # Cache until the next job/resume write (see services.dashboard_cache)
+        cache_set(cache_key, jobs_data, expire=DASHBOARD_CACHE_TTL)
         
-        return jsonify({
-            'jobs': jobs_data,
+        return json_response({
+            'jobs': _render_recent_jobs(jobs_data, _timestamp(now)),
             'cached': False
-        }), 200
+        })
         
     except Exception as e:
         logger.error(f"Recent jobs error: {str(e)}")
@@ -163,97 +274,71 @@ def get_recent_jobs():
 
 @dashboard_bp.route('/activity', methods=['GET'])
 @jwt_required()
+@_conditional('activity')
 def get_recent_activity():
     """Get recent activity logs with Redis caching"""
     try:
         user_id = get_jwt_identity()
-        cache_key = f"dashboard_activity:{user_id}"
+        cache_key = dashboard_cache_keys(user_id)[2]
         
         # Try to get from cache
+        now = datetime.utcnow()
         cached_data = cache_get(cache_key)
-        if cached_data:
-            return jsonify({
-                'activity': cached_data,
+        if cached_data is not None:
+            return json_response({
+                'activity': _render_activity(cached_data, _timestamp(now)),
                 'cached': True
-            }), 200
-        
-        # Get recent resumes (resume processed activities)
-        recent_resumes = db.session.query(Resume, Job)\
-            .join(Job)\
-            .filter(Job.user_id == user_id)\
-            .order_by(desc(Resume.created_at))\
-            .limit(10)\
-            .all()
-        
-        activities = []
-        
-        for resume, job in recent_resumes:
-            time_diff = datetime.utcnow() - resume.created_at
-            
-            if time_diff.total_seconds() < 60:
-                time_ago = f"{int(time_diff.total_seconds())} sec ago"
-            elif time_diff.total_seconds() < 3600:
-                time_ago = f"{int(time_diff.total_seconds() / 60)} min ago"
-            elif time_diff.total_seconds() < 86400:
-                time_ago = f"{int(time_diff.total_seconds() / 3600)} hour ago"
-            else:
-                time_ago = f"{time_diff.days} days ago"
-            
-            # Resume processed activity
-            if resume.processing_status == 'completed':
-                activities.append({
-                    'action': 'Resume processed',
-                    'detail': f"{resume.candidate_name or 'Unknown'} - {job.title}",
-                    'time': time_ago,
-                    'color': '#FF6B35'
-                })
-            
-            # Shortlisted activity
-            if resume.status == 'shortlisted':
-                activities.append({
-                    'action': 'Candidate shortlisted',
-                    'detail': f"{resume.candidate_name or 'Unknown'} - {job.title}",
-                    'time': time_ago,
-                    'color': '#06A77D'
-                })
-        
-        # Get recent jobs (job created activities)
-        recent_jobs = Job.query.filter_by(user_id=user_id)\
-            .order_by(desc(Job.created_at))\
-            .limit(5)\
-            .all()
-        
-        for job in recent_jobs:
-            time_diff = datetime.utcnow() - job.created_at
-            
-            if time_diff.total_seconds() < 60:
-                time_ago = f"{int(time_diff.total_seconds())} sec ago"
-            elif time_diff.total_seconds() < 3600:
-                time_ago = f"{int(time_diff.total_seconds() / 60)} min ago"
-            elif time_diff.total_seconds() < 86400:
-                time_ago = f"{int(time_diff.total_seconds() / 3600)} hours ago"
-            else:
-                time_ago = f"{time_diff.days} days ago"
-            
-            activities.append({
-                'action': 'Job created',
-                'detail': job.title,
-                'time': time_ago,
-                'color': '#004E89'
             })
         
-        # Sort by most recent and limit to 8
-        activities.sort(key=lambda x: x['time'])
-        activities = activities[:8]
+        activities = _build_activity(user_id, now)
         
-        # Cache for 1 minute
-        cache_set(cache_key, activities, expire=60)
+        # Cache until the next job/resume write (see services.dashboard_cache)
+        cache_set(cache_key, activities, expire=DASHBOARD_CACHE_TTL)
         
-        return jsonify({
-            'activity': activities,
+        return json_response({
+            'activity': _render_activity(activities, _timestamp(now)),
             'cached': False
-        }), 200
+        })
         
     except Exception as e:
         logger.error(f"Recent activity error: {str(e)}")
         return jsonify({'error': 'Failed to load recent activity'}), 500
+
+
+@dashboard_bp.route('/bundle', methods=['GET'])
+@jwt_required()
+@_conditional('bundle')
+def get_dashboard_bundle():
+    """Stats, recent jobs and activity in one response: one MGET, and only the misses are rebuilt"""
+    try:
+        user_id = get_jwt_identity()
+        keys = dashboard_cache_keys(user_id)
+        builders = (_build_stats, _build_recent_jobs, _build_activity)
+        
+        now = datetime.utcnow()
+        sections = []
+        rebuilt = {}
+        for key, cached_data, build in zip(keys, cache_mget(*keys), builders):
+            if cached_data is None:
+                cached_data = rebuilt[key] = build(user_id, now)
+            sections.append(cached_data)
+        
+        # Write back the rebuilt sections (stats keeps its shorter TTL)
+        cached = not rebuilt
+        stats_key = keys[0]
+        if stats_key in rebuilt:
+            cache_set(stats_key, rebuilt.pop(stats_key), expire=STATS_CACHE_TTL)
+        cache_set_many(rebuilt, expire=DASHBOARD_CACHE_TTL)
+        
+        stats, jobs_data, activities = sections
+        now_ts = _timestamp(now)
+        return json_response({
+            'stats': stats,
+            'jobs': _render_recent_jobs(jobs_data, now_ts),
+            'activity': _render_activity(activities, now_ts),
+            'cached': cached
+        })
+        
+    except Exception as e:
+        logger.error(f"Dashboard bundle error: {str(e)}")
+        return jsonify({'error': 'Failed to load dashboard'}), 500
@@ -3,19 +3,89 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.job import Job
 from models.resume import Resume
 from models.interview import Interview
-from models.user import User
-from extensions import db, cache_delete_pattern, cache_get, cache_set, redis_client
+import extensions
+from extensions import db, cache_delete_tag, cache_get, cache_set
 from services.email_service import EmailService
 from routes.notifications import create_notification
+from services.background_tasks import submit_background
+from services.user_cache import load_user_cached
+from utils.responses import json_response, stream_json_response
 from config import Config
 from datetime import datetime
 import logging
 import random
 import string
-import json
 
 interviews_bp = Blueprint('interviews', __name__)
 logger = logging.getLogger(__name__)
+_email_service = EmailService()
+
+def _invalidate_interview_caches(resume_id, job_id):
+    """Drop every cached interview list for the candidate and the job via their tag sets"""
+    cache_delete_tag(f"interviews_candidate:{resume_id}", f"interviews_job:{job_id}")
+
+def _get_owned_interview(interview_id, user_id):
+    """Load an interview only if its job belongs to user_id (None otherwise)"""
+    return Interview.query.join(Job, Interview.job_id == Job.id).filter(
+        Interview.id == interview_id,
+        Job.user_id == user_id
+    ).first()
+
+def _load_interview_details(interview_id):
+    """Interview with the candidate's name/email and the job title in one query (None if gone)"""
+    return db.session.query(Interview, Resume.candidate_name, Resume.email, Job.title)\
+        .join(Resume, Resume.id == Interview.resume_id)\
+        .join(Job, Job.id == Interview.job_id)\
+        .filter(Interview.id == interview_id)\
+        .first()
+
+def send_interview_invitation(user_id, interview_id):
+    """Send the candidate's invitation (background task; False when the send fails)"""
+    row = _load_interview_details(interview_id)
+    if not row:
+        return
+    interview, candidate_name, candidate_email, job_title = row
+    
+    user_data = load_user_cached(user_id)
+    company_name = (user_data and user_data['profile']['company']) or 'HireLens'
+    
+    # Generate AI interview link if it's an AI interview
+    ai_interview_link = None
+    if interview.interview_mode == 'ai':
+        ai_interview_link = f"{Config.FRONTEND_URL}/interview/{interview.id}/login"
+    
+    sent = _email_service.send_interview_invitation(
+        candidate_name=candidate_name,
+        candidate_email=candidate_email,
+        job_title=job_title,
+        interview_date=interview.scheduled_date.strftime('%B %d, %Y at %I:%M %p'),
+        interview_type=interview.interview_type.capitalize(),
+        meeting_link=interview.meeting_link,
+        duration_minutes=interview.duration_minutes,
+        company_name=company_name,
+        ai_interview_link=ai_interview_link,
+        access_code=interview.access_code
+    )
+    if sent:
+        logger.info(f"Interview invitation sent to {candidate_email}")
+    return sent
+
+def notify_interview_recruiter(user_id, interview_id):
+    """Create the recruiter's interview notification (background task)"""
+    row = _load_interview_details(interview_id)
+    if not row:
+        return
+    interview, candidate_name, _, job_title = row
+    
+    return create_notification(
+        user_id=user_id,
+        notification_type='interview_scheduled',
+        title='Interview Scheduled',
+        message=f'Interview scheduled with {candidate_name} for {job_title}',
+        related_type='interview',
+        related_id=interview.id,
+        action_url=f'/dashboard/candidates/{interview.resume_id}'
+    )
 
 @interviews_bp.route('/', methods=['POST'])
 @jwt_required()
@@ -26,7 +96,8 @@ def schedule_interview():
         
         # Rate limiting: Max 10 interviews per hour per user
         rate_limit_key = f"interview_schedule_limit:{user_id}"
-        scheduled_count = redis_client.get(rate_limit_key)
+        redis_client = extensions.redis_client
+        scheduled_count = redis_client.get(rate_limit_key) if redis_client else None
         if scheduled_count and int(scheduled_count) >= 10:
             return jsonify({
                 'error': 'Rate limit exceeded. Maximum 10 interviews per hour. Please try again later.'
@@ -50,20 +121,18 @@ def schedule_interview():
         if not resume_id or not job_id or not scheduled_date:
             return jsonify({'error': 'resume_id, job_id, and scheduled_date are required'}), 400
         
-        # Verify job belongs to user
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        if not job:
+        # Verify job belongs to user (id-only probe, no Job row hydrated)
+        if not db.session.query(Job.id).filter_by(id=job_id, user_id=user_id).first():
             return jsonify({'error': 'Job not found'}), 404
         
         # Verify candidate exists
-        candidate = Resume.query.filter_by(id=resume_id, job_id=job_id).first()
-        if not candidate:
+        if not db.session.query(Resume.id).filter_by(id=resume_id, job_id=job_id).first():
             return jsonify({'error': 'Candidate not found'}), 404
         
         # Parse date
         try:
-            interview_date = datetime.fromisoformat(scheduled_date.replace('Z', '+00:00'))
-        except ValueError:
+            interview_date = datetime.fromisoformat(scheduled_date)
+        except (ValueError, TypeError):
             return jsonify({'error': 'Invalid date format. Use ISO format'}), 400
         
         # Generate 6-character access code for AI interviews
@@ -91,58 +160,19 @@ def schedule_interview():
         db.session.add(interview)
         db.session.commit()
         
-        # Send email invitation
-        try:
-            user = User.query.get(user_id)
-            company_name = user.company or 'HireLens'
-            
-            # Generate AI interview link if it's an AI interview
-            ai_interview_link = None
-            if interview_mode == 'ai':
-                ai_interview_link = f"{Config.FRONTEND_URL}/interview/{interview.id}/login"
-            
-            email_service = EmailService()
-            email_service.send_interview_invitation(
-                candidate_name=candidate.candidate_name,
-                candidate_email=candidate.email,
-                job_title=job.title,
-                interview_date=interview_date.strftime('%B %d, %Y at %I:%M %p'),
-                interview_type=interview_type.capitalize(),
-                meeting_link=meeting_link,
-                duration_minutes=duration_minutes,
-                company_name=company_name,
-                ai_interview_link=ai_interview_link,
-                access_code=access_code
-            )
-            logger.info(f"Interview invitation sent to {candidate.email}")
-        except Exception as e:
-            logger.error(f"Failed to send interview invitation: {str(e)}")
-        
         # Increment rate limit counter (1 hour TTL)
-        current_count = redis_client.get(rate_limit_key)
-        if current_count:
-            redis_client.incr(rate_limit_key)
-        else:
-            redis_client.setex(rate_limit_key, 3600, 1)  # 1 hour TTL
+        if redis_client:
+            if scheduled_count:
+                redis_client.incr(rate_limit_key)
+            else:
+                redis_client.setex(rate_limit_key, 3600, 1)  # 1 hour TTL
         
         # Invalidate caches
-        cache_delete_pattern(f"interviews:candidate:{resume_id}")
-        cache_delete_pattern(f"interviews:job:{job_id}")
-        cache_delete_pattern(f"interviews:user:{user_id}")
+        _invalidate_interview_caches(resume_id, job_id)
         
-        # Create notification for recruiter
-        try:
-            create_notification(
-                user_id=user_id,
-                notification_type='interview_scheduled',
-                title='Interview Scheduled',
-                message=f'Interview scheduled with {candidate.candidate_name} for {job.title}',
-                related_type='interview',
-                related_id=interview.id,
-                action_url=f'/dashboard/candidates/{resume_id}'
-            )
-        except Exception as e:
-            logger.error(f"Failed to create notification: {str(e)}")
+        # Invitation email and recruiter notification don't block the response (retried separately)
+        submit_background(send_interview_invitation, user_id, interview.id)
+        submit_background(notify_interview_recruiter, user_id, interview.id)
         
         return jsonify({
             'message': 'Interview scheduled successfully',
@@ -161,25 +191,19 @@ def get_candidate_interviews(resume_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Try to get from cache first
-        cache_key = f"interviews:candidate:{resume_id}"
+        # Try to get from cache first (keyed per user: the hit skips the ownership check)
+        cache_key = f"interviews:candidate:{user_id}:{resume_id}"
         cached_data = cache_get(cache_key)
         if cached_data:
-            return jsonify(json.loads(cached_data)), 200
-        
-        # Get the candidate first
-        candidate = Resume.query.get(resume_id)
-        if not candidate:
-            # Return empty list if candidate not found
-            return jsonify({
-                'interviews': [],
-                'total': 0
-            }), 200
-        
-        # Check if candidate's job belongs to user
-        job = Job.query.filter_by(id=candidate.job_id, user_id=user_id).first()
-        if not job:
-            # Return empty list if not authorized
+            return json_response(cached_data)
+        
+        # Candidate exists and its job belongs to the user, in one query
+        owned = db.session.query(Resume.id)\
+            .join(Job, Resume.job_id == Job.id)\
+            .filter(Resume.id == resume_id, Job.user_id == user_id)\
+            .first()
+        if not owned:
+            # Return empty list if candidate not found or not authorized
             return jsonify({
                 'interviews': [],
                 'total': 0
@@ -194,9 +218,9 @@ def get_candidate_interviews(resume_id):
         }
         
         # Cache for 5 minutes
-        cache_set(cache_key, json.dumps(result), 300)
+        cache_set(cache_key, result, 300, tags=[f"interviews_candidate:{resume_id}"])
         
-        return jsonify(result), 200
+        return json_response(result)
         
     except Exception as e:
         logger.error(f"Get candidate interviews error: {str(e)}")
@@ -210,27 +234,31 @@ def get_job_interviews(job_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Try to get from cache first
-        cache_key = f"interviews:job:{job_id}"
+        # Try to get from cache first (keyed per user: the hit skips the ownership check)
+        cache_key = f"interviews:job:{user_id}:{job_id}"
         cached_data = cache_get(cache_key)
         if cached_data:
-            return jsonify(json.loads(cached_data)), 200
+            return stream_json_response(cached_data, 'interviews')
         
-        # Verify job belongs to user
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        if not job:
+        # Verify job belongs to user (id-only probe, no Job row hydrated)
+        if not db.session.query(Job.id).filter_by(id=job_id, user_id=user_id).first():
             return jsonify({'error': 'Job not found'}), 404
         
-        interviews = Interview.query.filter_by(job_id=job_id).order_by(Interview.scheduled_date.desc()).all()
+        # Candidate name/email come from the same query instead of one lookup per interview;
+        # rows are fetched 200 at a time so ORM objects never pile up for large jobs
+        rows = db.session.query(Interview, Resume.id, Resume.candidate_name, Resume.email)\
+            .outerjoin(Resume, Resume.id == Interview.resume_id)\
+            .filter(Interview.job_id == job_id)\
+            .order_by(Interview.scheduled_date.desc())\
+            .yield_per(200)
         
         # Include candidate details
         interviews_data = []
-        for interview in interviews:
+        for interview, candidate_id, candidate_name, candidate_email in rows:
             interview_dict = interview.to_dict()
-            candidate = Resume.query.get(interview.resume_id)
-            if candidate:
-                interview_dict['candidate_name'] = candidate.candidate_name
-                interview_dict['candidate_email'] = candidate.email
+            if candidate_id is not None:
+                interview_dict['candidate_name'] = candidate_name
+                interview_dict['candidate_email'] = candidate_email
             interviews_data.append(interview_dict)
         
         result = {
@@ -239,9 +267,9 @@ def get_job_interviews(job_id):
         }
         
         # Cache for 5 minutes
-        cache_set(cache_key, json.dumps(result), 300)
+        cache_set(cache_key, result, 300, tags=[f"interviews_job:{job_id}"])
         
-        return jsonify(result), 200
+        return stream_json_response(result, 'interviews')
         
     except Exception as e:
         logger.error(f"Get job interviews error: {str(e)}")
@@ -254,16 +282,11 @@ def update_interview(interview_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Get interview first
-        interview = Interview.query.get(interview_id)
+        # Interview and ownership check in one query
+        interview = _get_owned_interview(interview_id, user_id)
         if not interview:
             return jsonify({'error': 'Interview not found'}), 404
         
-        # Check if job belongs to user
-        job = Job.query.filter_by(id=interview.job_id, user_id=user_id).first()
-        if not job:
-            return jsonify({'error': 'Unauthorized access'}), 403
-        
         data = request.get_json()
         
         # Update allowed fields
@@ -275,8 +298,8 @@ def update_interview(interview_id):
             interview.notes = data['notes']
         if 'scheduled_date' in data:
             try:
-                interview.scheduled_date = datetime.fromisoformat(data['scheduled_date'].replace('Z', '+00:00'))
-            except ValueError:
+                interview.scheduled_date = datetime.fromisoformat(data['scheduled_date'])
+            except (ValueError, TypeError):
                 return jsonify({'error': 'Invalid date format'}), 400
         if 'meeting_link' in data:
             interview.meeting_link = data['meeting_link']
@@ -286,8 +309,7 @@ def update_interview(interview_id):
         db.session.commit()
         
         # Invalidate caches
-        cache_delete_pattern(f"interviews:candidate:{interview.resume_id}")
-        cache_delete_pattern(f"interviews:job:{interview.job_id}")
+        _invalidate_interview_caches(interview.resume_id, interview.job_id)
         
         return jsonify({
             'message': 'Interview updated successfully',
@@ -306,16 +328,11 @@ def delete_interview(interview_id):
     try:
         user_id = int(get_jwt_identity())  # Convert to int for DB queries
         
-        # Get interview first
-        interview = Interview.query.get(interview_id)
+        # Interview and ownership check in one query
+        interview = _get_owned_interview(interview_id, user_id)
         if not interview:
             return jsonify({'error': 'Interview not found'}), 404
         
-        # Check if job belongs to user
-        job = Job.query.filter_by(id=interview.job_id, user_id=user_id).first()
-        if not job:
-            return jsonify({'error': 'Unauthorized access'}), 403
-        
         resume_id = interview.resume_id
         job_id = interview.job_id
         
@@ -323,8 +340,7 @@ def delete_interview(interview_id):
         db.session.commit()
         
         # Invalidate caches
-        cache_delete_pattern(f"interviews:candidate:{resume_id}")
-        cache_delete_pattern(f"interviews:job:{job_id}")
+        _invalidate_interview_caches(resume_id, job_id)
         
         return jsonify({'message': 'Interview cancelled successfully'}), 200
         
@@ -1,337 +1,346 @@
-from flask import Blueprint, request, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask import Blueprint, request, jsonify, g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from models.user import User
-from models.job import Job
+from models.job import Job, MAX_SKILL_LENGTH
 from models.resume import Resume
-from extensions import db, cache_get, cache_set, cache_delete, cache_delete_pattern
+from extensions import (
+    db, use_bind, cache_get, cache_set, cache_get_raw, cache_set_raw, cache_delete, cache_delete_many,
+    cache_get_version, cache_bump_version, cache_lock
+)
 from routes.notifications import create_notification
-from config import Config
-from utils.pagination import paginate, paginate_response
+from services.user_cache import invalidate_user_cache, get_plan_limits
+from utils.pagination import paginate_with_cursor, paginate_response
+from utils.responses import stream_json_response, cached_json_response
+from sqlalchemy import func, update, text
+from sqlalchemy.orm import load_only
 import logging
+import time
+import orjson
 
 jobs_bp = Blueprint('jobs', __name__)
 logger = logging.getLogger(__name__)
 
+# Careers-page listing, dropped on every job write and rebuilt by the next request
+PUBLIC_JOBS_CACHE_KEY = 'jobs_public_active'
+PUBLIC_JOBS_CACHE_TTL = 300  # seconds
+
+# Columns read by Job.to_public_dict()
+_PUBLIC_COLUMNS = (
+    Job.id, Job.title, Job.description, Job.department, Job.location, Job.job_type,
+    Job.experience_required, Job.skills_required, Job.education, Job.salary_range, Job.created_at
+)
+
+def _jobs_version_key(user_id):
+    return f"ver:jobs:{user_id}"
+
+def _invalidate_job_caches(user_id, job_id=None):
+    """Orphan every cached job list page of the user and drop the public listing and the job's details"""
+    cache_bump_version(_jobs_version_key(user_id))
+    keys = [PUBLIC_JOBS_CACHE_KEY]
+    if job_id is not None:
+        keys += [f"job_detail:{user_id}:{job_id}", f"job_public_detail:{job_id}"]
+    cache_delete_many(*keys)
+
+# The form MySQL can answer from the multi-valued idx_skills_required
+_SKILL_MEMBER_OF = text(":skill MEMBER OF(jobs.skills_required)")
+
+def _build_public_jobs(skill=None):
+    # Query only active jobs, loading just the columns to_public_dict() reads
+    query = Job.query.options(load_only(*_PUBLIC_COLUMNS)).filter_by(status='active')
+    filter_in_python = False
+    if skill:
+        if db.session.get_bind().dialect.name == 'mysql':
+            query = query.filter(_SKILL_MEMBER_OF.bindparams(skill=skill))
+        else:
+            filter_in_python = True  # No portable JSON array test (e.g. the SQLite fallback)
+    jobs = query.order_by(Job.created_at.desc()).all()
+    if filter_in_python:
+        jobs = [job for job in jobs if skill in (job.skills_required or ())]
+    
+    # Return basic job info (no sensitive data)
+    jobs_data = [job.to_public_dict() for job in jobs]
+    
+    # 'cached' leads so hits can flip it in place (see cached_json_response)
+    return orjson.dumps({
+        'cached': False,
+        'jobs': jobs_data,
+        'total': len(jobs_data)
+    })
+
+def warm_public_jobs():
+    """
+    Rebuild the cached careers-page listing
+    
+    The encoded JSON is cached, so hits skip serialization entirely.
+    """
+    body = _build_public_jobs()
+    cache_set_raw(PUBLIC_JOBS_CACHE_KEY, body, expire=PUBLIC_JOBS_CACHE_TTL)
+    return body
+
+# Fields a client may set on create/update; everything else in the body is ignored
+_JOB_FIELDS = frozenset({
+    'title', 'description', 'department', 'location', 'job_type',
+    'experience_required', 'skills_required', 'education', 'salary_range', 'status'
+})
+
+def _skills_error(data):
+    """Error message if skills_required isn't a list of strings idx_skills_required can index"""
+    skills = data.get('skills_required')
+    if skills is None:
+        return None
+    if not isinstance(skills, list) or not all(isinstance(skill, str) for skill in skills):
+        return 'skills_required must be a list of strings'
+    if any(len(skill) > MAX_SKILL_LENGTH for skill in skills):
+        return f'Skills must be at most {MAX_SKILL_LENGTH} characters'
+    return None
+
+# Endpoints served without authentication (careers page)
+_PUBLIC_ENDPOINTS = frozenset({'jobs.get_public_jobs', 'jobs.get_public_job'})
+
+@jobs_bp.before_request
+def load_user_id():
+    """Verify the JWT once per request and keep its identity on g.user_id"""
+    if request.endpoint is None or request.endpoint in _PUBLIC_ENDPOINTS:
+        return
+    # Returns None for exempt methods (CORS preflight)
+    if verify_jwt_in_request():
+        g.user_id = int(get_jwt_identity())
+
 # Public endpoint for careers page (no authentication required)
 @jobs_bp.route('/public', methods=['GET'])
+@use_bind('replica')
 def get_public_jobs():
     """Get all active jobs for public careers page (no auth required)"""
+    # ?skill= narrows the listing in SQL; only the unfiltered listing is cached
+    skill = request.args.get('skill', '').strip()
+    if skill:
+        return cached_json_response(_build_public_jobs(skill), cached=False)
+    
+    # Check cache first
+    cached_body = cache_get_raw(PUBLIC_JOBS_CACHE_KEY)
+    locked = False
+    if not cached_body:
+        # Single-flight: after a job write one request rebuilds the listing, others briefly wait for it
+        lock_key = f"lock:{PUBLIC_JOBS_CACHE_KEY}"
+        locked = cache_lock(lock_key, expire=5)
+        if not locked:
+            time.sleep(0.05)
+            cached_body = cache_get_raw(PUBLIC_JOBS_CACHE_KEY)
+    
+    if cached_body:
+        logger.info("Returning cached public jobs")
+        return cached_json_response(cached_body)
+    
+    # Cold cache (job write, TTL expiry or Redis restart)
     try:
-        # Check cache first
-        cache_key = 'jobs_public_active'
-        cached_data = cache_get(cache_key)
-        if cached_data:
-            logger.info("Returning cached public jobs")
-            return jsonify({**cached_data, 'cached': True}), 200
-        
-        # Query only active jobs
-        jobs = Job.query.filter_by(status='active').order_by(Job.created_at.desc()).all()
-        
-        # Return basic job info (no sensitive data)
-        jobs_data = [{
-            'id': job.id,
-            'title': job.title,
-            'description': job.description,
-            'department': job.department,
-            'location': job.location,
-            'job_type': job.job_type,
-            'experience_required': job.experience_required,
-            'skills_required': job.skills_required,
-            'education': job.education,
-            'salary_range': job.salary_range,
-            'created_at': job.created_at.isoformat() if job.created_at else None
-        } for job in jobs]
-        
-        response_data = {
-            'jobs': jobs_data,
-            'total': len(jobs_data),
-            'cached': False
-        }
-        
-        # Cache for 5 minutes
-        cache_set(cache_key, response_data, expire=300)
-        
-        return jsonify(response_data), 200
-        
-    except Exception as e:
-        logger.error(f"Error fetching public jobs: {str(e)}")
-        return jsonify({'error': 'Failed to load jobs'}), 500
+        return cached_json_response(warm_public_jobs(), cached=False)
+    finally:
+        if locked:
+            cache_delete(lock_key)
 
 # Public endpoint for single job detail (no authentication required)
 @jobs_bp.route('/public/<int:job_id>', methods=['GET'])
+@use_bind('replica')
 def get_public_job(job_id):
     """Get single active job details for public view (no auth required)"""
-    try:
-        # Check cache first
-        cache_key = f'job_public_detail:{job_id}'
-        cached_data = cache_get(cache_key)
-        if cached_data:
-            logger.info(f"Returning cached public job {job_id}")
-            return jsonify({**cached_data, 'cached': True}), 200
-        
-        # Only allow fetching active jobs publicly
-        job = Job.query.filter_by(id=job_id, status='active').first()
-        
-        if not job:
-            return jsonify({'error': 'Job not found or not available'}), 404
-        
-        # Return basic job info (no sensitive data like user_id)
-        job_data = {
-            'id': job.id,
-            'title': job.title,
-            'description': job.description,
-            'department': job.department,
-            'location': job.location,
-            'job_type': job.job_type,
-            'experience_required': job.experience_required,
-            'skills_required': job.skills_required,
-            'education': job.education,
-            'salary_range': job.salary_range,
-            'created_at': job.created_at.isoformat() if job.created_at else None
-        }
-        
-        response_data = {'job': job_data, 'cached': False}
-        
-        # Cache for 5 minutes
-        cache_set(cache_key, response_data, expire=300)
-        
-        return jsonify(response_data), 200
-        
-    except Exception as e:
-        logger.error(f"Error fetching public job {job_id}: {str(e)}")
-        return jsonify({'error': 'Failed to load job details'}), 500
+    # Check cache first
+    cache_key = f'job_public_detail:{job_id}'
+    cached_body = cache_get_raw(cache_key)
+    if cached_body:
+        logger.info(f"Returning cached public job {job_id}")
+        return cached_json_response(cached_body)
+    
+    # Only allow fetching active jobs publicly
+    job = Job.query.options(load_only(*_PUBLIC_COLUMNS)).filter_by(id=job_id, status='active').first()
+    
+    if not job:
+        return jsonify({'error': 'Job not found or not available'}), 404
+    
+    # Return basic job info (no sensitive data like user_id)
+    body = orjson.dumps({'cached': False, 'job': job.to_public_dict()})
+    
+    # Cache the encoded body for 5 minutes
+    cache_set_raw(cache_key, body, expire=300)
+    
+    return cached_json_response(body, cached=False)
 
 @jobs_bp.route('/', methods=['POST'])
-@jwt_required()
 def create_job():
+    user_id = g.user_id
+    data = request.get_json()
+    
+    skills_error = _skills_error(data)
+    if skills_error:
+        return jsonify({'error': skills_error}), 400
+    
+    plan_limits = get_plan_limits(user_id)
+    
+    if not plan_limits:
+        return jsonify({'error': 'User not found'}), 404
+    
+    # Check plan limits
+    plan, plan_config = plan_limits
+    jobs_limit = plan_config['jobs_limit']
+    
+    # Check and consume a job slot in one conditional UPDATE (no read-modify-write race)
+    jobs_used = func.coalesce(User.jobs_used, 0)
+    consume_slot = update(User).where(User.id == user_id).values(jobs_used=jobs_used + 1)
+    if jobs_limit != -1:
+        consume_slot = consume_slot.where(jobs_used < jobs_limit)
+    result = db.session.execute(consume_slot.execution_options(synchronize_session=False))
+    if result.rowcount == 0:
+        db.session.rollback()
+        return jsonify({'error': f'Job limit reached for {plan} plan'}), 403
+    
+    fields = {key: data[key] for key in _JOB_FIELDS if key in data}
+    fields.setdefault('job_type', 'Full-time')
+    fields.setdefault('skills_required', [])
+    fields['status'] = 'active'  # New jobs always start active
+    job = Job(user_id=user_id, **fields)
+    
+    db.session.add(job)
+    db.session.commit()  # Job insert and jobs_used increment land together
+    
+    # Invalidate cache
+    _invalidate_job_caches(user_id)
+    invalidate_user_cache(user_id)
+    
+    # Create notification for job creation
     try:
-        # Get user from JWT
-        user_id = int(get_jwt_identity())  # Convert to int for DB queries
-        user = User.query.get(user_id)
-        
-        if not user:
-            return jsonify({'error': 'User not found'}), 404
-        
-        # Check plan limits
-        plan_config = Config.PLANS.get(user.plan, Config.PLANS['starter'])
-        jobs_limit = plan_config['jobs_limit']
-        
-        if jobs_limit != -1 and user.jobs_used >= jobs_limit:
-            return jsonify({'error': f'Job limit reached for {user.plan} plan'}), 403
-        
-        data = request.get_json()
-        
-        job = Job(
+        create_notification(
             user_id=user_id,
-            title=data.get('title'),
-            description=data.get('description'),
-            department=data.get('department'),
-            location=data.get('location'),
-            job_type=data.get('job_type', 'Full-time'),
-            experience_required=data.get('experience_required'),
-            skills_required=data.get('skills_required', []),
-            education=data.get('education'),
-            salary_range=data.get('salary_range'),
-            status='active'
+            notification_type='job_created',
+            title='New Job Posted',
+            message=f'Successfully posted job: {job.title}',
+            related_type='job',
+            related_id=job.id,
+            action_url=f'/dashboard/jobs/{job.id}'
         )
-        
-        db.session.add(job)
-        user.jobs_used += 1
-        db.session.commit()
-        
-        # Invalidate cache
-        cache_delete(f"jobs_list:{user_id}")
-        cache_delete_pattern(f"dashboard_*:{user_id}")
-        cache_delete(f"user_plan:{user_id}")
-        # Invalidate public cache when new job is created
-        cache_delete('jobs_public_active')
-        
-        # Create notification for job creation
-        try:
-            create_notification(
-                user_id=user_id,
-                notification_type='job_created',
-                title='New Job Posted',
-                message=f'Successfully posted job: {job.title}',
-                related_type='job',
-                related_id=job.id,
-                action_url=f'/dashboard/jobs/{job.id}'
-            )
-        except Exception as e:
-            logger.error(f"Failed to create notification: {str(e)}")
-        
-        return jsonify({
-            'message': 'Job created successfully',
-            'job': job.to_dict()
-        }), 201
-        
     except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+        logger.error(f"Failed to create notification: {str(e)}")
+    
+    return jsonify({
+        'message': 'Job created successfully',
+        'job': job.to_dict()
+    }), 201
 
 @jobs_bp.route('/', methods=['GET'])
-@jwt_required()
 def get_jobs():
     """Get paginated list of user's jobs"""
-    try:
-        user_id = int(get_jwt_identity())
-        status = request.args.get('status')
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        # Create cache key based on filters
-        cache_key = f"jobs_list:{user_id}:{status or 'all'}:p{page}:pp{per_page}"
-        
-        # Try to get from cache
-        cached_data = cache_get(cache_key)
-        if cached_data:
-            return jsonify({**cached_data, 'cached': True}), 200
-        
-        # Build query
-        query = Job.query.filter_by(user_id=user_id)
-        
-        if status:
-            query = query.filter_by(status=status)
-        
-        query = query.order_by(Job.created_at.desc())
-        
-        # Paginate
-        paginated = paginate(query, page=page, per_page=per_page)
-        response_data = paginate_response(paginated)
-        
-        # Restructure response to match frontend expectations (jobs instead of data)
-        frontend_response = {
-            'jobs': response_data['data'],
-            'pagination': response_data['pagination'],
-            'cached': False
-        }
-        
-        # Cache for 3 minutes (cache without the 'cached' flag)
-        cache_set(cache_key, {
-            'jobs': response_data['data'],
-            'pagination': response_data['pagination']
-        }, expire=180)
-        
-        return jsonify(frontend_response), 200
-        
-    except Exception as e:
-        logger.error(f"Get jobs error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    user_id = g.user_id
+    status = request.args.get('status')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    cursor = request.args.get('cursor')  # next_cursor from the previous page
+    
+    # Create cache key based on filters; job writes bump the version instead of deleting pages
+    version = cache_get_version(_jobs_version_key(user_id))
+    position = f"c{cursor}" if cursor else f"p{page}"
+    cache_key = f"jobs_list:{user_id}:v{version}:{status or 'all'}:{position}:pp{per_page}"
+    
+    # Try to get from cache
+    cached_data = cache_get(cache_key)
+    if cached_data:
+        return stream_json_response({**cached_data, 'cached': True}, 'jobs')
+    
+    # Build query
+    query = Job.query.filter_by(user_id=user_id)
+    
+    if status:
+        query = query.filter_by(status=status)
+    
+    # Newest first (id breaks ties so keyset cursors are unambiguous)
+    paginated = paginate_with_cursor(query, (Job.created_at, Job.id), cursor, page, per_page)
+    if paginated is None:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    # Candidate counts for the whole page in one grouped query instead of one per job
+    counts = Job.candidate_counts([job.id for job in paginated['items']])
+    response_data = paginate_response(paginated, serializer=lambda job: job.to_dict(counts=counts[job.id]))
+    
+    # Restructure response to match frontend expectations (jobs instead of data)
+    result = {
+        'jobs': response_data['data'],
+        'pagination': response_data['pagination']
+    }
+    
+    # Cache for 3 minutes (cache without the 'cached' flag)
+    cache_set(cache_key, result, expire=180)
+    
+    return stream_json_response({**result, 'cached': False}, 'jobs')
 
 @jobs_bp.route('/<int:job_id>', methods=['GET'])
-@jwt_required()
 def get_job(job_id):
-    try:
-        user_id = int(get_jwt_identity())  # Convert to int for DB queries
-        
-        # Cache key for individual job
-        cache_key = f"job_detail:{user_id}:{job_id}"
-        
-        # Try to get from cache
-        cached_data = cache_get(cache_key)
-        if cached_data:
-            return jsonify({
-                'job': cached_data,
-                'cached': True
-            }), 200
-        
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        
-        if not job:
-            return jsonify({'error': 'Job not found'}), 404
-        
-        # to_dict will calculate counts internally
-        job_data = job.to_dict(include_resumes=False, include_counts=True)
-        
-        # Cache for 2 minutes
-        cache_set(cache_key, job_data, expire=120)
-        
+    user_id = g.user_id
+    
+    # Cache key for individual job
+    cache_key = f"job_detail:{user_id}:{job_id}"
+    
+    # Try to get from cache
+    cached_data = cache_get(cache_key)
+    if cached_data:
         return jsonify({
-            'job': job_data,
-            'cached': False
+            'job': cached_data,
+            'cached': True
         }), 200
-        
-    except Exception as e:
-        logger.error(f"Get job error: {str(e)}")
-        return jsonify({'error': str(e)}), 500
+    
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    # to_dict will calculate counts internally
+    job_data = job.to_dict(include_resumes=False, include_counts=True)
+    
+    # Cache for 2 minutes
+    cache_set(cache_key, job_data, expire=120)
+    
+    return jsonify({
+        'job': job_data,
+        'cached': False
+    }), 200
 
 @jobs_bp.route('/<int:job_id>', methods=['PUT'])
-@jwt_required()
 def update_job(job_id):
-    try:
-        user_id = int(get_jwt_identity())  # Convert to int for DB queries
-        
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        
-        if not job:
-            return jsonify({'error': 'Job not found'}), 404
-        
-        data = request.get_json()
-        
-        if 'title' in data:
-            job.title = data['title']
-        if 'description' in data:
-            job.description = data['description']
-        if 'department' in data:
-            job.department = data['department']
-        if 'location' in data:
-            job.location = data['location']
-        if 'job_type' in data:
-            job.job_type = data['job_type']
-        if 'experience_required' in data:
-            job.experience_required = data['experience_required']
-        if 'skills_required' in data:
-            job.skills_required = data['skills_required']
-        if 'education' in data:
-            job.education = data['education']
-        if 'salary_range' in data:
-            job.salary_range = data['salary_range']
-        if 'status' in data:
-            job.status = data['status']
-        
-        db.session.commit()
-        
-        # Invalidate cache
-        cache_delete(f"job_detail:{user_id}:{job_id}")
-        cache_delete_pattern(f"jobs_list:{user_id}:*")
-        cache_delete_pattern(f"dashboard_*:{user_id}")
-        # Invalidate public cache when job is updated
-        cache_delete('jobs_public_active')
-        cache_delete(f'job_public_detail:{job_id}')
-        
-        return jsonify({
-            'message': 'Job updated successfully',
-            'job': job.to_dict()
-        }), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    user_id = g.user_id
+    
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    data = request.get_json()
+    
+    skills_error = _skills_error(data)
+    if skills_error:
+        return jsonify({'error': skills_error}), 400
+    
+    for key, value in data.items():
+        if key in _JOB_FIELDS:
+            setattr(job, key, value)
+    
+    db.session.commit()
+    
+    # Invalidate cache
+    _invalidate_job_caches(user_id, job_id)
+    
+    return jsonify({
+        'message': 'Job updated successfully',
+        'job': job.to_dict()
+    }), 200
 
 @jobs_bp.route('/<int:job_id>', methods=['DELETE'])
-@jwt_required()
 def delete_job(job_id):
-    try:
-        user_id = int(get_jwt_identity())  # Convert to int for DB queries
-        
-        job = Job.query.filter_by(id=job_id, user_id=user_id).first()
-        
-        if not job:
-            return jsonify({'error': 'Job not found'}), 404
-        
-        db.session.delete(job)
-        db.session.commit()
-        
-        # Invalidate cache
-        cache_delete(f"job_detail:{user_id}:{job_id}")
-        cache_delete_pattern(f"jobs_list:{user_id}:*")
-        cache_delete_pattern(f"dashboard_*:{user_id}")
-        # Invalidate public cache when job is deleted
-        cache_delete('jobs_public_active')
-        cache_delete(f'job_public_detail:{job_id}')
-        
-        return jsonify({'message': 'Job deleted successfully'}), 200
-        
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({'error': str(e)}), 500
+    user_id = g.user_id
+    
+    job = Job.query.filter_by(id=job_id, user_id=user_id).first()
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    db.session.delete(job)
+    db.session.commit()
+    
+    # Invalidate cache
+    _invalidate_job_caches(user_id, job_id)
+    
+    return jsonify({'message': 'Job deleted successfully'}), 200
@@ -1,13 +1,71 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from models.notification import Notification
-from extensions import db, cache_get, cache_set, cache_delete, cache_delete_pattern
+import extensions
+from extensions import db, cache_get, cache_set, cache_get_version, cache_bump_version
+from sqlalchemy import func, insert, update, delete
 from datetime import datetime
 import logging
 
 notifications_bp = Blueprint('notifications', __name__)
 logger = logging.getLogger(__name__)
 
+# Unread counts for every user live in one Redis hash (field = user_id), adjusted by every
+# write path. The hash is expired as a whole, which bounds drift from any missed update
+UNREAD_COUNTS_KEY = 'unread_counts'
+UNREAD_COUNTS_TTL = 3600
+
+# Adjust a count only if present: a missing one is rebuilt from the database on read
+_ADJUST_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then return redis.call('HINCRBY', KEYS[1], ARGV[1], ARGV[2]) end
+return nil
+"""
+
+# HSET (or HSETNX when ARGV[4] == '1') and start the hash's TTL if it has none
+_SET_SCRIPT = """
+redis.call(ARGV[4] == '1' and 'HSETNX' or 'HSET', KEYS[1], ARGV[1], ARGV[2])
+if redis.call('TTL', KEYS[1]) < 0 then redis.call('EXPIRE', KEYS[1], ARGV[3]) end
+"""
+
+def _notifications_version_key(user_id):
+    return f"ver:notif:{user_id}"
+
+def get_unread_count_for(user_id):
+    """Unread notification count from the Redis hash (one HGET), rebuilt with one COUNT(*) on a miss"""
+    redis_client = extensions.redis_client
+    if redis_client:
+        try:
+            count = redis_client.hget(UNREAD_COUNTS_KEY, user_id)
+            if count is not None:
+                return max(int(count), 0)
+        except Exception as e:
+            logger.error(f"Unread counter read error: {e}")
+    
+    count = db.session.query(func.count(Notification.id))\
+        .filter(Notification.user_id == user_id, Notification.is_read == False)\
+        .scalar()
+    _set_unread_count(user_id, count, only_if_missing=True)
+    return count
+
+def _set_unread_count(user_id, count, only_if_missing=False):
+    if extensions.redis_client:
+        try:
+            extensions.redis_client.eval(
+                _SET_SCRIPT, 1, UNREAD_COUNTS_KEY, user_id, count, UNREAD_COUNTS_TTL, int(only_if_missing)
+            )
+        except Exception as e:
+            logger.error(f"Unread counter write error: {e}")
+
+def _adjust_unread_count(user_id, delta):
+    if extensions.redis_client:
+        try:
+            extensions.redis_client.eval(_ADJUST_SCRIPT, 1, UNREAD_COUNTS_KEY, user_id, delta)
+        except Exception as e:
+            logger.error(f"Unread counter update error: {e}")
+
+def _reset_unread_count(user_id):
+    _set_unread_count(user_id, 0)
+
 @notifications_bp.route('/', methods=['GET'])
 @jwt_required()
 def get_notifications():
@@ -20,18 +78,14 @@ def get_notifications():
         limit = request.args.get('limit', 50, type=int)
         offset = request.args.get('offset', 0, type=int)
         
-        # Cache key
-        cache_key = f"notifications:{user_id}:{'unread' if unread_only else 'all'}:{limit}:{offset}"
+        # Cache key; notification writes bump the version instead of deleting pages
+        version = cache_get_version(_notifications_version_key(user_id))
+        cache_key = f"notifications:{user_id}:v{version}:{'unread' if unread_only else 'all'}:{limit}:{offset}"
         
         # Try cache
         cached_data = cache_get(cache_key)
         if cached_data:
-            return jsonify({
-                'notifications': cached_data['notifications'],
-                'total': cached_data['total'],
-                'unread_count': cached_data['unread_count'],
-                'cached': True
-            }), 200
+            return jsonify({**cached_data, 'cached': True}), 200
         
         # Get notifications
         query = Notification.query.filter_by(user_id=user_id)
@@ -39,16 +93,16 @@ def get_notifications():
         if unread_only:
             query = query.filter_by(is_read=False)
         
-        notifications = query.order_by(Notification.created_at.desc()).limit(limit).offset(offset).all()
-        
-        # Get unread count in separate query
-        unread_notifications = Notification.query.filter_by(user_id=user_id, is_read=False).all()
-        unread_count = len(unread_notifications)
+        # Fetch one extra row to know whether another page exists
+        notifications = query.order_by(Notification.created_at.desc()).limit(limit + 1).offset(offset).all()
+        has_more = len(notifications) > limit
+        notifications = notifications[:limit]
         
         result = {
             'notifications': [n.to_dict() for n in notifications],
             'total': len(notifications),
-            'unread_count': unread_count
+            'has_more': has_more,
+            'unread_count': get_unread_count_for(user_id)
         }
         
         # Cache for 30 seconds
@@ -70,27 +124,8 @@ def get_unread_count():
     try:
         user_id = int(get_jwt_identity())
         
-        # Cache key
-        cache_key = f"notifications:unread_count:{user_id}"
-        
-        # Try cache
-        cached_count = cache_get(cache_key)
-        if cached_count is not None:
-            return jsonify({
-                'unread_count': cached_count,
-                'cached': True
-            }), 200
-        
-        # Get all unread and count
-        unread_notifications = Notification.query.filter_by(user_id=user_id, is_read=False).all()
-        unread_count = len(unread_notifications)
-        
-        # Cache for 10 seconds
-        cache_set(cache_key, unread_count, expire=10)
-        
         return jsonify({
-            'unread_count': unread_count,
-            'cached': False
+            'unread_count': get_unread_count_for(user_id)
         }), 200
         
     except Exception as e:
@@ -106,22 +141,31 @@ def mark_as_read(notification_id):
         user_id = int(get_jwt_identity())
         logger.info(f"User ID: {user_id}")
         
+        # Flip is_read in one conditional UPDATE; only the request that flips it adjusts the counter
+        result = db.session.execute(
+            update(Notification)
+            .where(
+                Notification.id == notification_id,
+                Notification.user_id == user_id,
+                Notification.is_read == False
+            )
+            .values(is_read=True, read_at=datetime.utcnow())
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            db.session.commit()
+            logger.info(f"Notification {notification_id} marked as read")
+            
+            # Invalidate cache
+            cache_bump_version(_notifications_version_key(user_id))
+            _adjust_unread_count(user_id, -1)
+        
         notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
         
         if not notification:
             logger.warning(f"Notification {notification_id} not found for user {user_id}")
             return jsonify({'error': 'Notification not found'}), 404
         
-        if not notification.is_read:
-            notification.is_read = True
-            notification.read_at = datetime.utcnow()
-            db.session.commit()
-            logger.info(f"Notification {notification_id} marked as read")
-            
-            # Invalidate cache
-            cache_delete_pattern(f"notifications:{user_id}:*")
-            cache_delete(f"notifications:unread_count:{user_id}")
-        
         return jsonify({
             'message': 'Notification marked as read',
             'notification': notification.to_dict()
@@ -139,16 +183,17 @@ def mark_all_as_read():
     try:
         user_id = int(get_jwt_identity())
         
+        # No identity-map pass: nothing in this session holds these rows
         Notification.query.filter_by(user_id=user_id, is_read=False).update({
             'is_read': True,
             'read_at': datetime.utcnow()
-        })
+        }, synchronize_session=False)
         
         db.session.commit()
         
         # Invalidate cache
-        cache_delete_pattern(f"notifications:{user_id}:*")
-        cache_delete(f"notifications:unread_count:{user_id}")
+        cache_bump_version(_notifications_version_key(user_id))
+        _reset_unread_count(user_id)
         
         return jsonify({'message': 'All notifications marked as read'}), 200
         
@@ -164,17 +209,26 @@ def delete_notification(notification_id):
     try:
         user_id = int(get_jwt_identity())
         
-        notification = Notification.query.filter_by(id=notification_id, user_id=user_id).first()
-        
-        if not notification:
-            return jsonify({'error': 'Notification not found'}), 404
-        
-        db.session.delete(notification)
+        owned = (Notification.id == notification_id, Notification.user_id == user_id)
+        
+        # Unread rows first, so the counter is only adjusted when an unread one is really gone
+        was_unread = db.session.execute(
+            delete(Notification).where(*owned, Notification.is_read == False)
+            .execution_options(synchronize_session=False)
+        ).rowcount > 0
+        if not was_unread:
+            deleted = db.session.execute(
+                delete(Notification).where(*owned).execution_options(synchronize_session=False)
+            ).rowcount
+            if not deleted:
+                db.session.rollback()
+                return jsonify({'error': 'Notification not found'}), 404
         db.session.commit()
         
         # Invalidate cache
-        cache_delete_pattern(f"notifications:{user_id}:*")
-        cache_delete(f"notifications:unread_count:{user_id}")
+        cache_bump_version(_notifications_version_key(user_id))
+        if was_unread:
+            _adjust_unread_count(user_id, -1)
         
         return jsonify({'message': 'Notification deleted'}), 200
         
@@ -190,12 +244,12 @@ def clear_all_notifications():
     try:
         user_id = int(get_jwt_identity())
         
-        Notification.query.filter_by(user_id=user_id).delete()
+        Notification.query.filter_by(user_id=user_id).delete(synchronize_session=False)
         db.session.commit()
         
         # Invalidate cache
-        cache_delete_pattern(f"notifications:{user_id}:*")
-        cache_delete(f"notifications:unread_count:{user_id}")
+        cache_bump_version(_notifications_version_key(user_id))
+        _reset_unread_count(user_id)
         
         return jsonify({'message': 'All notifications cleared'}), 200
         
@@ -206,6 +260,35 @@ def clear_all_notifications():
 
 
 # Helper function to create notifications (can be called from other routes)
+def create_notifications_bulk(user_id, items):
+    """
+    Create several notifications for one user with a single batched INSERT
+    
+    Each item holds Notification columns: type, title, message and optionally
+    related_type, related_id and action_url. The list cache and unread count
+    are updated once for the whole batch.
+    
+    Returns:
+        Number of notifications created (0 if the insert failed)
+    """
+    if not items:
+        return 0
+    
+    try:
+        db.session.execute(insert(Notification), [{**item, 'user_id': user_id} for item in items])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Create notifications error: {str(e)}")
+        return 0
+    
+    # Invalidate cache
+    cache_bump_version(_notifications_version_key(user_id))
+    _adjust_unread_count(user_id, len(items))
+    
+    logger.info(f"{len(items)} notification(s) created for user {user_id}")
+    return len(items)
+
 def create_notification(user_id, notification_type, title, message, related_type=None, related_id=None, action_url=None):
     """
     Helper function to create a notification
@@ -218,29 +301,15 @@ def create_notification(user_id, notification_type, title, message, related_type
     - resume_uploaded: New resume uploaded
     - job_created: New job posted
     - job_expired: Job posting expired
+    
+    Returns:
+        True if the notification was created
     """
-    try:
-        notification = Notification(
-            user_id=user_id,
-            type=notification_type,
-            title=title,
-            message=message,
-            related_type=related_type,
-            related_id=related_id,
-            action_url=action_url
-        )
-        
-        db.session.add(notification)
-        db.session.commit()
-        
-        # Invalidate cache
-        cache_delete_pattern(f"notifications:{user_id}:*")
-        cache_delete(f"notifications:unread_count:{user_id}")
-        
-        logger.info(f"Notification created for user {user_id}: {title}")
-        return notification
-        
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Create notification error: {str(e)}")
-        return None
+    return create_notifications_bulk(user_id, [{
+        'type': notification_type,
+        'title': title,
+        'message': message,
+        'related_type': related_type,
+        'related_id': related_id,
+        'action_url': action_url
+    }]) == 1
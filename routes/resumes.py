@@ -5,27 +5,57 @@ from models.user import User
 from models.job import Job
 from models.resume import Resume
 from routes.notifications import create_notification
-from extensions import db, cache_delete_pattern
+from services.user_cache import invalidate_user_cache, get_plan_limits
+from services.resume_processing import submit_processing
+from extensions import db, cache_bump_version
 from config import Config
 from services.resume_parser import ResumeParser
 from services.ai_scorer import AIScorer
+from sqlalchemy import func, update
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
 import os
+import shutil
 import logging
 
 resumes_bp = Blueprint('resumes', __name__)
 logger = logging.getLogger(__name__)
 
+# Copy uploads in 1 MB chunks (FileStorage.save() uses 16 KB)
+UPLOAD_COPY_BUFFER = 1024 * 1024
+
+# Resumes stuck 'pending'/'processing' this long lost their task; past the give-up age they fail
+PROCESSING_STALE_AFTER = timedelta(minutes=15)
+PROCESSING_GIVE_UP_AFTER = timedelta(hours=2)
+SWEEP_BATCH_SIZE = 100
+
+# Parsing only reads the file, so it runs here while the caller does its database work
+_parse_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='resume-parse')
+
+def _start_parse(file_path):
+    """Start ResumeParser.parse() on the parse pool and return its future"""
+    return _parse_executor.submit(ResumeParser().parse, file_path)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in Config.ALLOWED_EXTENSIONS
 
+def _invalidate_candidate_lists(user_id):
+    """Orphan the owner's versioned candidate list caches (one INCR, no keyspace scan)"""
+    cache_bump_version(f"user_ver:{user_id}")
+
+def save_upload(file, file_path):
+    """Write an uploaded file to disk with large reads/writes to cut syscalls on multi-MB resumes"""
+    with open(file_path, 'wb') as out:
+        shutil.copyfileobj(file.stream, out, UPLOAD_COPY_BUFFER)
+
 # Public endpoint for candidate applications (no authentication required)
 @resumes_bp.route('/<int:job_id>/upload', methods=['POST'])
 def public_upload_resume(job_id):
     """Public endpoint for candidates to apply to jobs"""
     try:
-        # Check if job exists and is active
-        job = Job.query.filter_by(id=job_id, status='active').first()
-        if not job:
+        # Check if job exists and is active (owner-only probe, no Job row hydrated)
+        job_row = db.session.query(Job.user_id).filter_by(id=job_id, status='active').first()
+        if not job_row:
             return jsonify({'error': 'Job not found or not accepting applications'}), 404
         
         # Check if file is present
@@ -62,7 +92,7 @@ def public_upload_resume(job_id):
         import time
         unique_filename = f"{int(time.time())}_{filename}"
         file_path = os.path.join(upload_path, unique_filename)
-        file.save(file_path)
+        save_upload(file, file_path)
         
         # Create resume record
         resume = Resume(
@@ -74,51 +104,53 @@ def public_upload_resume(job_id):
             phone=phone,
             location=location,
             status='new',
-            processing_status='pending'
+            processing_status='pending',
+            # Stored up front so a requeued task still has it; parsing merges into it
+            parsed_data={
+                'linkedin': linkedin,
+                'portfolio': portfolio,
+                'cover_letter': cover_letter
+            }
         )
         
         db.session.add(resume)
         db.session.commit()
         
-        # Process resume (parse and AI score)
-        try:
-            process_resume_public(resume.id, job_id, {
-                'linkedin': linkedin,
-                'portfolio': portfolio,
-                'cover_letter': cover_letter
-            })
-        except Exception as e:
-            logger.error(f"Error processing resume: {e}")
+        # Parse and AI score off the request; processing_status tracks progress
+        submit_processing(process_resume_public, resume.id, job_id)
         
-        # Invalidate candidate caches
-        cache_delete_pattern(f"candidates_job:*:{job_id}:*")
-        cache_delete_pattern(f"candidates_all:*")
+        # Invalidate the job owner's candidate caches
+        _invalidate_candidate_lists(job_row.user_id)
         
         return jsonify({
             'message': 'Application submitted successfully! We will review your resume and get back to you soon.',
             'resume_id': resume.id
-        }), 201
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         logger.error(f"Error uploading public resume: {str(e)}")
         return jsonify({'error': 'Failed to submit application. Please try again.'}), 500
 
-def process_resume_public(resume_id, job_id, additional_info):
-    """Process public resume - parse and score"""
+def process_resume_public(resume_id, job_id):
+    """Process public resume - parse and score (runs on the processing pool)"""
+    resume = job = None
     try:
         resume = Resume.query.get(resume_id)
-        job = Job.query.get(job_id)
+        if not resume:
+            return
         
-        if not resume or not job:
+        # Parse while the job is loaded and the status write commits
+        parse_future = _start_parse(resume.file_path)
+        job = Job.query.get(job_id)
+        if not job:
+            parse_future.cancel()
             return
         
         resume.processing_status = 'processing'
         db.session.commit()
         
-        # Parse resume
-        parser = ResumeParser()
-        parsed_data = parser.parse(resume.file_path)
+        parsed_data = parse_future.result()
         
         print(f"\n{'='*60}")
         print(f"RESUME PARSING RESULTS for Resume #{resume_id}")
@@ -142,7 +174,7 @@ def process_resume_public(resume_id, job_id, additional_info):
             
         resume.experience_years = parsed_data.get('experience_years', 0)
         resume.education_level = parsed_data.get('education_level')
-        resume.parsed_data = {**parsed_data, **additional_info}
+        resume.parsed_data = {**parsed_data, **(resume.parsed_data or {})}
         
         # Score resume with AI
         scorer = AIScorer()
@@ -164,33 +196,34 @@ def process_resume_public(resume_id, job_id, additional_info):
         
         resume.processing_status = 'completed'
         db.session.commit()
+        _invalidate_candidate_lists(job.user_id)
         
         logger.info(f"Resume {resume_id} processed successfully with AI score: {resume.ai_score}")
         
     except Exception as e:
         logger.error(f"Error processing public resume {resume_id}: {e}")
+        db.session.rollback()
         if resume:
             resume.processing_status = 'failed'
             db.session.commit()
+            if job:
+                _invalidate_candidate_lists(job.user_id)
 
 # Admin endpoint for manual resume upload (requires authentication)
 @resumes_bp.route('/admin/upload/<int:job_id>', methods=['POST'])
 @jwt_required()
 def admin_upload_resume(job_id):
     try:
-        user_id = get_jwt_identity()
-        user = User.query.get(user_id)
+        user_id = int(get_jwt_identity())
+        plan_limits = get_plan_limits(user_id)
         
-        if not user:
+        if not plan_limits:
             return jsonify({'error': 'User not found'}), 404
         
         # Check plan limits
-        plan_config = Config.PLANS.get(user.plan, Config.PLANS['starter'])
+        plan, plan_config = plan_limits
         resumes_limit = plan_config['resumes_limit']
         
-        if resumes_limit != -1 and user.resumes_used >= resumes_limit:
-            return jsonify({'error': f'Resume limit reached for {user.plan} plan'}), 403
-        
         # Check job exists
         job = Job.query.filter_by(id=job_id, user_id=user_id).first()
         if not job:
@@ -208,13 +241,23 @@ def admin_upload_resume(job_id):
         if not allowed_file(file.filename):
             return jsonify({'error': 'File type not allowed. Use PDF or DOCX'}), 400
         
+        # Check and consume a resume slot in one conditional UPDATE (no read-modify-write race)
+        resumes_used = func.coalesce(User.resumes_used, 0)
+        consume_slot = update(User).where(User.id == user_id).values(resumes_used=resumes_used + 1)
+        if resumes_limit != -1:
+            consume_slot = consume_slot.where(resumes_used < resumes_limit)
+        result = db.session.execute(consume_slot.execution_options(synchronize_session=False))
+        if result.rowcount == 0:
+            db.session.rollback()
+            return jsonify({'error': f'Resume limit reached for {plan} plan'}), 403
+        
         # Save file
         filename = secure_filename(file.filename)
         upload_path = os.path.join(Config.UPLOAD_FOLDER, str(user_id), str(job_id))
         os.makedirs(upload_path, exist_ok=True)
         
         file_path = os.path.join(upload_path, filename)
-        file.save(file_path)
+        save_upload(file, file_path)
         
         # Create resume record
         resume = Resume(
@@ -225,8 +268,9 @@ def admin_upload_resume(job_id):
         )
         
         db.session.add(resume)
-        user.resumes_used += 1
-        db.session.commit()
+        db.session.commit()  # Resume insert and resumes_used increment land together
+        invalidate_user_cache(user_id)
+        _invalidate_candidate_lists(user_id)
         
         # Create notification for job owner
         create_notification(
@@ -239,36 +283,39 @@ def admin_upload_resume(job_id):
             action_url=f'/dashboard/candidates/{resume.id}'
         )
         
-        # Start async processing (in production, use Celery or background task)
-        try:
-            process_resume(resume.id, job_id)
-        except Exception as e:
-            print(f"Error processing resume: {e}")
+        resume_data = resume.to_dict()
+        
+        # Parse and score off the request; clients poll GET /resumes/<id> for processing_status
+        submit_processing(process_resume, resume.id, job_id)
         
         return jsonify({
             'message': 'Resume uploaded successfully',
-            'resume': resume.to_dict()
-        }), 201
+            'resume': resume_data
+        }), 202
         
     except Exception as e:
         db.session.rollback()
         return jsonify({'error': str(e)}), 500
 
 def process_resume(resume_id, job_id):
-    """Process resume - parse and score"""
+    """Process resume - parse and score (runs on the processing pool)"""
+    resume = job = None
     try:
         resume = Resume.query.get(resume_id)
-        job = Job.query.get(job_id)
+        if not resume:
+            return
         
-        if not resume or not job:
+        # Parse while the job is loaded and the status write commits
+        parse_future = _start_parse(resume.file_path)
+        job = Job.query.get(job_id)
+        if not job:
+            parse_future.cancel()
             return
         
         resume.processing_status = 'processing'
         db.session.commit()
         
-        # Parse resume
-        parser = ResumeParser()
-        parsed_data = parser.parse(resume.file_path)
+        parsed_data = parse_future.result()
         
         # Update resume with parsed data
         resume.candidate_name = parsed_data.get('name')
@@ -290,12 +337,57 @@ def process_resume(resume_id, job_id):
         
         resume.processing_status = 'completed'
         db.session.commit()
+        _invalidate_candidate_lists(job.user_id)
         
     except Exception as e:
         print(f"Error processing resume {resume_id}: {e}")
+        db.session.rollback()
         if resume:
             resume.processing_status = 'failed'
             db.session.commit()
+            if job:
+                _invalidate_candidate_lists(job.user_id)
+
+def requeue_stale_resumes(now=None):
+    """
+    Requeue resumes whose processing task was lost (worker restart, full queue)
+    
+    Runs from the resume sweeper; rows past PROCESSING_GIVE_UP_AFTER are
+    marked failed instead so a file that kills its worker isn't retried forever.
+    """
+    now = now or datetime.utcnow()
+    stale = db.session.query(
+        Resume.id, Resume.job_id, Resume.processing_status, Resume.updated_at,
+        Resume.created_at, Resume.parsed_data, Job.user_id
+    ).join(Job, Job.id == Resume.job_id).filter(
+        Resume.processing_status.in_(('pending', 'processing')),
+        Resume.updated_at < now - PROCESSING_STALE_AFTER
+    ).limit(SWEEP_BATCH_SIZE).all()
+    
+    for row in stale:
+        give_up = row.created_at < now - PROCESSING_GIVE_UP_AFTER
+        # Claim the row only if no other worker has touched it since it was read
+        claim = update(Resume).where(
+            Resume.id == row.id,
+            Resume.processing_status == row.processing_status,
+            Resume.updated_at == row.updated_at
+        ).values(
+            processing_status='failed' if give_up else 'pending',
+            updated_at=now
+        ).execution_options(synchronize_session=False)
+        if db.session.execute(claim).rowcount == 0:
+            continue
+        db.session.commit()
+        
+        if give_up:
+            logger.error(f"Resume {row.id} stuck in {row.processing_status}, marked failed")
+            _invalidate_candidate_lists(row.user_id)
+            continue
+        
+        # Public applications carry the candidate's extra fields in parsed_data from upload
+        process = process_resume_public if row.parsed_data is not None else process_resume
+        logger.warning(f"Requeueing resume {row.id} stuck in {row.processing_status}")
+        submit_processing(process, row.id, row.job_id)
 
 @resumes_bp.route('/<int:resume_id>', methods=['GET'])
 @jwt_required()
@@ -322,6 +414,13 @@ def update_resume_status(resume_id):
     try:
         user_id = get_jwt_identity()
         
+        # Reject bad input before touching the database
+        data = request.get_json()
+        status = data.get('status')
+        
+        if status not in ['new', 'shortlisted', 'rejected']:
+            return jsonify({'error': 'Invalid status'}), 400
+        
         resume = Resume.query.join(Job).filter(
             Resume.id == resume_id,
             Job.user_id == user_id
@@ -330,12 +429,6 @@ def update_resume_status(resume_id):
         if not resume:
             return jsonify({'error': 'Resume not found'}), 404
         
-        data = request.get_json()
-        status = data.get('status')
-        
-        if status not in ['new', 'shortlisted', 'rejected']:
-            return jsonify({'error': 'Invalid status'}), 400
-        
         resume.status = status
         db.session.commit()
         
@@ -4,7 +4,8 @@ from werkzeug.utils import secure_filename
 from PIL import Image
 import io
 from models.user import User
-from extensions import db, cache_get, cache_set, cache_delete
+from extensions import db, cache_get, cache_set, cache_delete, cache_delete_many
+from services.user_cache import invalidate_user_cache
 from datetime import datetime
 import os
 import uuid
@@ -146,8 +147,8 @@ def update_profile():
         db.session.commit()
         
         # Invalidate cache
-        cache_delete(f"user_profile:{user_id}")
-        cache_delete(f"user_plan:{user_id}")
+        cache_delete_many(f"user_profile:{user_id}", f"user_plan:{user_id}")
+        invalidate_user_cache(user_id)
         
         return jsonify({
             'message': 'Profile updated successfully',
@@ -200,6 +201,7 @@ def change_password():
         user.set_password(new_password)
         user.updated_at = datetime.utcnow()
         db.session.commit()
+        invalidate_user_cache(user_id)
         
         return jsonify({'message': 'Password changed successfully'}), 200
         
@@ -376,6 +378,7 @@ def update_email_config():
         
         # Invalidate cache
         cache_delete(f"user_profile:{user_id}")
+        invalidate_user_cache(user_id)
         
         return jsonify({
             'message': 'Email configuration updated successfully'
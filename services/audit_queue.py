@@ -0,0 +1,129 @@
+"""
+Background writer for audit log events.
+
+Request handlers enqueue plain dicts and return immediately; a daemon thread
+drains the queue and writes events in batches with a single bulk INSERT.
+Each process starts its own writer on first use, since gunicorn --preload
+forks workers after create_app() and threads don't survive fork().
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+from typing import Any, Dict, List
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 100
+FLUSH_INTERVAL = 1.0  # seconds
+
+audit_queue = queue.Queue(maxsize=10000)
+
+_app = None
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def init_audit_queue(app):
+    """Enable the background writer (no-op when AUDIT_LOG_ASYNC is disabled)"""
+    global _app
+    if not app.config.get('AUDIT_LOG_ASYNC', True):
+        return
+
+    if _app is None:
+        atexit.register(flush)
+    _app = app
+    _ensure_worker()
+
+
+def _ensure_worker() -> bool:
+    """Start this process's writer thread if it isn't running; False if it can't be started"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return True
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            try:
+                worker = threading.Thread(target=_run, name='audit-log-writer', daemon=True)
+                worker.start()
+            except RuntimeError as e:
+                logger.error(f"Audit log writer failed to start: {e}")
+                return False
+            _worker = worker
+    return True
+
+
+def _reset_after_fork() -> None:
+    """Give a forked child an empty queue; its writer starts on the first enqueue"""
+    global audit_queue, _worker, _worker_lock
+    audit_queue = queue.Queue(maxsize=10000)  # The parent still writes what it had queued
+    _worker = None
+    _worker_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def enqueue(event: Dict[str, Any]) -> bool:
+    """
+    Queue an audit event for the background writer.
+
+    Returns:
+        False if the writer is not running or the queue is full, in which
+        case the caller should write the event inline
+    """
+    if _app is None or not _ensure_worker():
+        return False
+    try:
+        audit_queue.put_nowait(event)
+        return True
+    except queue.Full:
+        return False
+
+
+def _drain(max_items: int, timeout: float) -> List[Dict[str, Any]]:
+    """Block up to `timeout` for the first event, then take what is ready"""
+    batch = []
+    try:
+        batch.append(audit_queue.get(timeout=timeout) if timeout else audit_queue.get_nowait())
+    except queue.Empty:
+        return batch
+
+    while len(batch) < max_items:
+        try:
+            batch.append(audit_queue.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def _write(batch: List[Dict[str, Any]]) -> None:
+    from models.audit_log import AuditLog
+
+    with _app.app_context():
+        try:
+            db.session.bulk_insert_mappings(AuditLog, batch)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Audit log batch of {len(batch)} failed: {e}")
+
+
+def _run():
+    while True:
+        batch = _drain(BATCH_SIZE, FLUSH_INTERVAL)
+        if batch:
+            _write(batch)
+
+
+def flush():
+    """Write any events still in the queue (called at interpreter exit)"""
+    if _app is None:
+        return
+    while True:
+        batch = _drain(BATCH_SIZE, 0)
+        if not batch:
+            break
+        _write(batch)
@@ -0,0 +1,89 @@
+"""
+Fire-and-forget background tasks.
+
+Work that the HTTP client doesn't wait on (emails, notifications) is handed
+to a small thread pool so the response returns as soon as the request's own
+database work is committed. A task that raises or returns False is retried
+with backoff; after the last attempt it is recorded as a failed
+'background_task' audit event with its arguments so the send can be replayed.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+import orjson
+from extensions import db
+
+logger = logging.getLogger(__name__)
+
+# Seconds to wait before each retry; a task runs len(TASK_RETRY_DELAYS) + 1 times at most
+TASK_RETRY_DELAYS = (5, 30, 120)
+
+_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix='background-task')
+
+
+def submit_background(func, *args, **kwargs):
+    """
+    Run func(*args, **kwargs) on the background pool inside an app context.
+
+    Runs inline, without retry delays, when BACKGROUND_TASKS_ASYNC is disabled
+    (e.g. in tests). Pass ids and plain values, not ORM objects bound to the
+    request session. Tasks are retried, so each should do one send or write.
+    """
+    app = current_app._get_current_object()
+    run_async = app.config.get('BACKGROUND_TASKS_ASYNC', True)
+
+    def run(attempt=0):
+        with app.app_context():
+            try:
+                ok = func(*args, **kwargs) is not False
+                error = None if ok else 'returned False'
+            except Exception as e:
+                db.session.rollback()
+                ok, error = False, str(e)
+            if ok:
+                return
+
+            if attempt < len(TASK_RETRY_DELAYS):
+                logger.warning(f"Background task {func.__name__} failed ({error}), retry {attempt + 1}")
+                if not run_async:
+                    return run(attempt + 1)
+                # Wait off the pool so a failing SMTP server doesn't hold its threads
+                retry = threading.Timer(TASK_RETRY_DELAYS[attempt], _executor.submit, (run, attempt + 1))
+                retry.daemon = True
+                retry.start()
+                return
+
+            logger.error(f"Background task {func.__name__} failed after {attempt + 1} attempts: {error}")
+            _record_failure(func, args, kwargs, error)
+
+    if not run_async:
+        run()
+        return None
+
+    return _executor.submit(run)
+
+
+def _record_failure(func, args, kwargs, error):
+    """Persist a task that exhausted its retries as a failed audit event"""
+    from models.audit_log import AuditLog
+
+    details = orjson.dumps({
+        'task': f"{func.__module__}.{func.__qualname__}",
+        'args': args,
+        'kwargs': kwargs,
+        'error': error
+    }, default=str).decode()
+    try:
+        db.session.add(AuditLog(
+            user_id=None,
+            event_type='background_task',
+            ip_address=None,
+            user_agent=None,
+            status='failure',
+            details=details
+        ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        logger.error(f"Recording failed task {func.__name__} failed: {e} ({details})")
@@ -0,0 +1,122 @@
+"""
+Dashboard cache keys and write-driven invalidation.
+
+Job and Resume writes record the owning user while the session flushes;
+once the transaction commits, those users' dashboard entries are dropped.
+Because every write invalidates, recent jobs and activity can live for an
+hour (they cache timestamps; ages are formatted per response). Stats keep
+a short TTL since their weekly/monthly windows move with the clock. The
+same invalidation drops the user's ETag token, so conditional GETs see a
+new one after any write.
+"""
+import logging
+import uuid
+from itertools import chain
+from sqlalchemy import event, select
+import extensions
+from extensions import db, cache_delete_many
+from models.job import Job
+from models.resume import Resume
+
+logger = logging.getLogger(__name__)
+
+DASHBOARD_CACHE_TTL = 3600  # seconds
+STATS_CACHE_TTL = 300  # seconds
+
+_PENDING_KEY = 'dashboard_invalidate_user_ids'
+
+_registered = False
+
+
+def dashboard_cache_keys(user_id):
+    """Keys for /stats, /recent-jobs and /activity (ts: entries hold timestamps, not age strings)"""
+    return (
+        f"dashboard_stats:{user_id}",
+        f"dashboard_recent_jobs:ts:{user_id}",
+        f"dashboard_activity:ts:{user_id}"
+    )
+
+
+def _etag_key(user_id):
+    return f"dashboard_etag:{user_id}"
+
+
+def dashboard_etag(user_id):
+    """
+    Opaque token for the user's current dashboard data, or None without Redis
+
+    A fresh random token is minted after every invalidation, so a client
+    holding an old one never matches again.
+    """
+    redis_client = extensions.redis_client
+    if not redis_client:
+        return None
+    key = _etag_key(user_id)
+    try:
+        token = redis_client.get(key)
+        if token is None:
+            redis_client.set(key, uuid.uuid4().hex, nx=True, ex=DASHBOARD_CACHE_TTL)
+            token = redis_client.get(key)
+        return token
+    except Exception as e:
+        logger.error(f"Dashboard ETag lookup failed: {e}")
+        return None
+
+
+def invalidate_dashboard(*user_ids):
+    """Drop the cached dashboard and ETag token of each user in one DEL"""
+    keys = [
+        key for user_id in user_ids
+        for key in (*dashboard_cache_keys(user_id), _etag_key(user_id))
+    ]
+    cache_delete_many(*keys)
+
+
+def _after_flush(session, flush_context):
+    user_ids = set()
+    job_ids = set()
+    modified = (obj for obj in session.dirty if session.is_modified(obj, include_collections=False))
+    for obj in chain(session.new, modified, session.deleted):
+        if isinstance(obj, Job):
+            user_ids.add(obj.user_id)
+        elif isinstance(obj, Resume):
+            job = obj.__dict__.get('job')  # Already loaded: no lookup needed
+            if job is not None:
+                user_ids.add(job.user_id)
+            else:
+                job_ids.add(obj.job_id)
+
+    job_ids.discard(None)
+    if job_ids:
+        # Plain connection query: the ORM must not autoflush mid-flush
+        user_ids.update(session.connection().execute(
+            select(Job.user_id).where(Job.id.in_(job_ids))
+        ).scalars())
+
+    user_ids.discard(None)
+    if user_ids:
+        session.info.setdefault(_PENDING_KEY, set()).update(user_ids)
+
+
+def _after_commit(session):
+    user_ids = session.info.pop(_PENDING_KEY, None)
+    if user_ids:
+        try:
+            invalidate_dashboard(*user_ids)
+        except Exception as e:
+            logger.error(f"Dashboard cache invalidation failed: {e}")
+
+
+def _after_rollback(session, previous_transaction):
+    session.info.pop(_PENDING_KEY, None)
+
+
+def init_dashboard_cache():
+    """Register the session listeners that invalidate dashboards on commit"""
+    global _registered
+    if _registered:
+        return
+    event.listen(db.session, 'after_flush', _after_flush)
+    event.listen(db.session, 'after_commit', _after_commit)
+    event.listen(db.session, 'after_soft_rollback', _after_rollback)
+    _registered = True
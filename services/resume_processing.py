@@ -0,0 +1,119 @@
+"""
+Resume parsing/scoring pool and recovery of lost processing tasks.
+
+Processing runs on its own bounded pool so a burst of applications can't
+hold up the emails and notifications on services.background_tasks. Queued
+tasks only live in process memory, so a sweeper thread periodically hands
+resumes left 'pending' or 'processing' (worker restart, full queue) back to
+the registered sweep function. Each process starts its sweeper on its first
+request, since gunicorn --preload forks workers after create_app() and
+threads don't survive fork().
+"""
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+from extensions import cache_lock
+
+logger = logging.getLogger(__name__)
+
+PROCESSING_WORKERS = 2
+PROCESSING_QUEUE_LIMIT = 50  # queued + running tasks per process; the rest wait for the sweep
+SWEEP_INTERVAL = 300  # seconds
+
+_executor = ThreadPoolExecutor(max_workers=PROCESSING_WORKERS, thread_name_prefix='resume-processing')
+_slots = threading.BoundedSemaphore(PROCESSING_QUEUE_LIMIT)
+
+_app = None
+_sweep = None
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def submit_processing(func, *args) -> bool:
+    """
+    Run func(*args) on the processing pool inside an app context.
+
+    Runs inline when BACKGROUND_TASKS_ASYNC is disabled (e.g. in tests).
+
+    Returns:
+        False if the pool's queue is full; the resume stays 'pending' and
+        the sweep picks it up later
+    """
+    app = current_app._get_current_object()
+
+    def run():
+        with app.app_context():
+            try:
+                func(*args)
+            except Exception as e:
+                logger.error(f"Resume processing task {func.__name__} failed: {str(e)}")
+
+    if not app.config.get('BACKGROUND_TASKS_ASYNC', True):
+        run()
+        return True
+
+    if not _slots.acquire(blocking=False):
+        logger.warning(f"Resume processing queue full, leaving {func.__name__}{args} to the sweep")
+        return False
+
+    def run_and_release():
+        try:
+            run()
+        finally:
+            _slots.release()
+
+    _executor.submit(run_and_release)
+    return True
+
+
+def init_resume_sweeper(app, sweep):
+    """Run sweep() every SWEEP_INTERVAL (no-op when BACKGROUND_TASKS_ASYNC is disabled)"""
+    global _app, _sweep
+    if not app.config.get('BACKGROUND_TASKS_ASYNC', True):
+        return
+
+    _app = app
+    _sweep = sweep
+    app.before_request(_ensure_worker)
+
+
+def _ensure_worker() -> None:
+    """Start this process's sweeper thread if it isn't running"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            try:
+                worker = threading.Thread(target=_run, name='resume-sweeper', daemon=True)
+                worker.start()
+            except RuntimeError as e:
+                logger.error(f"Resume sweeper failed to start: {e}")
+                return
+            _worker = worker
+
+
+def _reset_after_fork() -> None:
+    global _worker, _worker_lock, _slots
+    _worker = None
+    _worker_lock = threading.Lock()
+    _slots = threading.BoundedSemaphore(PROCESSING_QUEUE_LIMIT)
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def _run():
+    while True:
+        time.sleep(SWEEP_INTERVAL)
+        with _app.app_context():
+            # One sweep per interval across workers when Redis is up
+            if not cache_lock('lock:resume_sweep', expire=SWEEP_INTERVAL - 1):
+                continue
+            try:
+                _sweep()
+            except Exception as e:
+                logger.error(f"Resume sweep failed: {e}")
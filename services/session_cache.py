@@ -0,0 +1,175 @@
+"""
+Session token validation cache and coalesced last_activity writes.
+
+Validated sessions are cached in Redis under a hash of the token so repeat
+/validate calls skip the database. last_activity timestamps are collected in
+process memory and written by a background thread in one UPDATE per interval.
+Each process starts its own flusher on first use, since gunicorn --preload
+forks workers after create_app() and threads don't survive fork().
+"""
+import atexit
+import hashlib
+import logging
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Optional, Dict, Any
+from sqlalchemy import case, update
+import extensions
+from extensions import db, cache_get, cache_set, cache_delete
+from models.user import UserSession
+
+logger = logging.getLogger(__name__)
+
+SESSION_CACHE_TTL = 60  # seconds
+ACTIVITY_FLUSH_INTERVAL = 10  # seconds
+
+_pending_activity = {}
+_pending_lock = threading.Lock()
+_app = None
+_worker = None
+_worker_lock = threading.Lock()
+
+
+def _cache_key(session_token: str) -> str:
+    return f"session:{hashlib.sha256(session_token.encode()).hexdigest()[:32]}"
+
+
+def _index_key(user_id: int) -> str:
+    return f"session_index:{user_id}"
+
+
+def get_cached_session(session_token: str) -> Optional[Dict[str, Any]]:
+    """Get the cached validation payload for a session token"""
+    return cache_get(_cache_key(session_token))
+
+
+def cache_session(session_token: str, session: UserSession) -> Dict[str, Any]:
+    """Cache the fields needed to validate a session and return them"""
+    data = {
+        'id': session.id,
+        'user_id': session.user_id,
+        'is_active': session.is_active,
+        'expires_at': session.expires_at.isoformat() if session.expires_at else None,
+        'session': session.to_dict()
+    }
+    key = _cache_key(session_token)
+    if cache_set(key, data, expire=SESSION_CACHE_TTL):
+        # Track keys per user so logout can drop them without knowing the tokens
+        try:
+            index_key = _index_key(session.user_id)
+            pipe = extensions.redis_client.pipeline()
+            pipe.sadd(index_key, key)
+            pipe.expire(index_key, SESSION_CACHE_TTL)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Session index update failed: {e}")
+    return data
+
+
+def is_cached_session_valid(data: Dict[str, Any]) -> bool:
+    """Same check as UserSession.is_valid() on the cached payload"""
+    if not data['is_active'] or not data['expires_at']:
+        return False
+    return datetime.fromisoformat(data['expires_at']) > datetime.utcnow()
+
+
+def invalidate_session(session_token: str) -> None:
+    cache_delete(_cache_key(session_token))
+
+
+def invalidate_user_sessions(user_id: int) -> None:
+    """Drop every cached session for a user (logout, bulk revocation)"""
+    if not extensions.redis_client:
+        return
+    try:
+        index_key = _index_key(user_id)
+        keys = extensions.redis_client.smembers(index_key)
+        extensions.redis_client.delete(index_key, *keys)
+    except Exception as e:
+        logger.error(f"Session cache invalidation failed: {e}")
+
+
+def record_session_activity(session_id: int) -> None:
+    """Mark a session as active now; written to the database in batches"""
+    now = datetime.utcnow()
+    if _app is None or not _ensure_worker():
+        _write_activity({session_id: now})
+        db.session.commit()
+        return
+    with _pending_lock:
+        _pending_activity[session_id] = now
+
+
+def _write_activity(activity: Dict[int, datetime]) -> None:
+    db.session.execute(
+        update(UserSession)
+        .where(UserSession.id.in_(list(activity)))
+        .values(last_activity=case(activity, value=UserSession.id))
+        .execution_options(synchronize_session=False)
+    )
+
+
+def flush_session_activity() -> None:
+    """Write all pending last_activity timestamps in one UPDATE"""
+    global _pending_activity
+    with _pending_lock:
+        activity, _pending_activity = _pending_activity, {}
+    if not activity or _app is None:
+        return
+
+    with _app.app_context():
+        try:
+            _write_activity(activity)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Session activity flush of {len(activity)} sessions failed: {e}")
+
+
+def _run():
+    while True:
+        time.sleep(ACTIVITY_FLUSH_INTERVAL)
+        flush_session_activity()
+
+
+def _ensure_worker() -> bool:
+    """Start this process's flusher thread if it isn't running; False if it can't be started"""
+    global _worker
+    if _worker is not None and _worker.is_alive():
+        return True
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            try:
+                worker = threading.Thread(target=_run, name='session-activity-writer', daemon=True)
+                worker.start()
+            except RuntimeError as e:
+                logger.error(f"Session activity flusher failed to start: {e}")
+                return False
+            _worker = worker
+    return True
+
+
+def _reset_after_fork() -> None:
+    """Give a forked child empty state; its flusher starts on the first recorded activity"""
+    global _pending_activity, _pending_lock, _worker, _worker_lock
+    _pending_activity = {}  # The parent still flushes what it had buffered
+    _pending_lock = threading.Lock()
+    _worker = None
+    _worker_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def init_session_activity(app):
+    """Enable the activity flusher (no-op when BACKGROUND_TASKS_ASYNC is disabled)"""
+    global _app
+    if not app.config.get('BACKGROUND_TASKS_ASYNC', True):
+        return
+
+    if _app is None:
+        atexit.register(flush_session_activity)
+    _app = app
+    _ensure_worker()
@@ -1,7 +1,23 @@
 import os
+import jwt
+from functools import lru_cache
+from jwt import PyJWKClient
+from jwt.exceptions import PyJWKClientError, PyJWKError
 from supabase import create_client, Client
 from typing import Optional, Dict, Any
 
+# How long the Supabase JWKS document is cached before being re-fetched
+JWKS_CACHE_TTL = 3600
+
+# Tokens signed with these are verified against the JWKS; anything else
+# (legacy HS256 projects) goes straight to Supabase without a JWKS lookup
+JWKS_ALGORITHMS = ('RS256', 'ES256')
+
+@lru_cache(maxsize=None)
+def _get_jwks_client(jwks_url: str) -> PyJWKClient:
+    """One JWKS client per URL per process, so its key set and key cache are shared"""
+    return PyJWKClient(jwks_url, cache_keys=True, cache_jwk_set=True, lifespan=JWKS_CACHE_TTL)
+
 class SupabaseAuth:
     """Supabase Authentication Service"""
     
@@ -22,9 +38,46 @@ class SupabaseAuth:
         except Exception as e:
             print(f"Failed to create Supabase client: {e}")
             raise
+        
+        # Signing keys are fetched once and cached, so most tokens verify locally
+        self.jwks_client = _get_jwks_client(f"{self.url.rstrip('/')}/auth/v1/.well-known/jwks.json")
+    
+    def _verify_token_locally(self, access_token: str) -> Dict[str, Any]:
+        """Verify token signature against the cached JWKS (no network call on cache hit)"""
+        signing_key = self.jwks_client.get_signing_key_from_jwt(access_token)
+        claims = jwt.decode(
+            access_token,
+            signing_key.key,
+            algorithms=list(JWKS_ALGORITHMS),
+            audience='authenticated'
+        )
+        return {
+            'id': claims.get('sub'),
+            'email': claims.get('email'),
+            'phone': claims.get('phone'),
+            'role': claims.get('role'),
+            'user_metadata': claims.get('user_metadata') or {},
+            'app_metadata': claims.get('app_metadata') or {}
+        }
     
     def verify_token(self, access_token: str) -> Optional[Dict[str, Any]]:
         """Verify Supabase access token and get user info"""
+        try:
+            alg = jwt.get_unverified_header(access_token).get('alg')
+        except jwt.InvalidTokenError as e:
+            print(f"Token verification failed: {e}")
+            return None
+        
+        if alg in JWKS_ALGORITHMS:
+            try:
+                return self._verify_token_locally(access_token)
+            except (PyJWKClientError, PyJWKError) as e:
+                # No matching signing key even after a refetch - ask Supabase instead
+                print(f"Local token verification unavailable, falling back to Supabase: {e}")
+            except jwt.InvalidTokenError as e:
+                print(f"Token verification failed: {e}")
+                return None
+        
         try:
             user = self.client.auth.get_user(access_token)
             return user.user.dict() if user.user else None
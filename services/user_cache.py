@@ -0,0 +1,136 @@
+"""
+Read-through cache for user profiles used by the auth endpoints.
+
+Lookups go through a small per-worker LRU first, then Redis, then the
+database. The local tier uses a short TTL since other workers cannot
+invalidate it.
+
+Plan names are cached separately for the quota checks on write endpoints;
+a listener on User drops the entry whenever the plan column changes.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+import orjson
+from sqlalchemy import event
+from sqlalchemy.orm.attributes import get_history
+from config import Config
+from extensions import db, cache_get, cache_set, cache_delete
+from models.user import User
+
+USER_CACHE_TTL = 300  # Redis TTL (seconds)
+LOCAL_CACHE_TTL = 5  # Per-worker TTL (seconds)
+LOCAL_CACHE_SIZE = 1024
+PLAN_CACHE_TTL = 3600  # seconds
+
+_local_cache = OrderedDict()
+_local_lock = threading.Lock()
+
+
+def _cache_key(user_id: int) -> str:
+    return f"auth_user:{user_id}"
+
+
+def _plan_key(user_id: int) -> str:
+    return f"plan:{user_id}"
+
+
+def _local_get(user_id: int) -> Optional[Dict[str, Any]]:
+    with _local_lock:
+        entry = _local_cache.get(user_id)
+        if entry is None:
+            return None
+        expires_at, data = entry
+        if expires_at < time.monotonic():
+            del _local_cache[user_id]
+            return None
+        _local_cache.move_to_end(user_id)
+        return data
+
+
+def _local_set(user_id: int, data: Dict[str, Any]) -> None:
+    with _local_lock:
+        _local_cache[user_id] = (time.monotonic() + LOCAL_CACHE_TTL, data)
+        _local_cache.move_to_end(user_id)
+        while len(_local_cache) > LOCAL_CACHE_SIZE:
+            _local_cache.popitem(last=False)
+
+
+def load_user_cached(user_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Get a user's profile without hitting the database on repeat calls.
+
+    Returns:
+        Dict with 'profile' (User.to_dict()), 'minimal' (User.to_dict_minimal())
+        and 'is_active', or None if the user does not exist
+    """
+    data = _local_get(user_id)
+    if data is not None:
+        return data
+
+    data = cache_get(_cache_key(user_id))
+    if data is None:
+        user = db.session.get(User, user_id)
+        if not user:
+            return None
+        data = {
+            'profile': user.to_dict(),
+            'minimal': user.to_dict_minimal(),
+            'is_active': user.is_active
+        }
+        cache_set(_cache_key(user_id), data, expire=USER_CACHE_TTL)
+
+    _local_set(user_id, data)
+    return data
+
+
+def load_user_profile_json(user_id: int) -> Optional[bytes]:
+    """
+    Get User.to_dict() already encoded as JSON.
+
+    The bytes are kept on the per-worker cache entry, so repeat calls within
+    LOCAL_CACHE_TTL skip serialization entirely.
+    """
+    data = load_user_cached(user_id)
+    if data is None:
+        return None
+
+    profile_json = data.get('profile_json')
+    if profile_json is None:
+        profile_json = data['profile_json'] = orjson.dumps(data['profile'])
+    return profile_json
+
+
+def invalidate_user_cache(user_id: int) -> None:
+    """Drop a user's cached profile after any change to the user row"""
+    with _local_lock:
+        _local_cache.pop(user_id, None)
+    cache_delete(_cache_key(user_id))
+
+
+def get_plan_limits(user_id: int) -> Optional[Tuple[Optional[str], Dict[str, Any]]]:
+    """
+    Get a user's plan name and its Config.PLANS entry.
+
+    Returns:
+        (plan, plan_config), or None if the user does not exist
+    """
+    plan = cache_get(_plan_key(user_id))
+    if plan is None:
+        row = db.session.query(User.plan).filter_by(id=user_id).first()
+        if not row:
+            return None
+        plan = row.plan
+        cache_set(_plan_key(user_id), plan, expire=PLAN_CACHE_TTL)
+    return plan, Config.PLANS.get(plan, Config.PLANS['starter'])
+
+
+def invalidate_plan_cache(user_id: int) -> None:
+    cache_delete(_plan_key(user_id))
+
+
+@event.listens_for(User, 'after_update')
+def _invalidate_plan_on_change(mapper, connection, target):
+    if get_history(target, 'plan').has_changes():
+        invalidate_plan_cache(target.id)
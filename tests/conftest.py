@@ -2,7 +2,9 @@
 Pytest configuration and fixtures
 """
 import pytest
+from datetime import datetime, timedelta
 from app import create_app
+import extensions
 from extensions import db
 from config import Config
 
@@ -14,6 +16,9 @@ class TestConfig(Config):
     SQLALCHEMY_ENGINE_OPTIONS = {}  # Override pool settings for SQLite
     JWT_SECRET_KEY = 'test-secret-key-for-testing-only'
     REDIS_HOST = 'localhost'
+    RATELIMIT_ENABLED = False
+    AUDIT_LOG_ASYNC = False
+    BACKGROUND_TASKS_ASYNC = False
     WTF_CSRF_ENABLED = False
     DEBUG = False
 
@@ -37,23 +42,24 @@ def client(app):
 
 @pytest.fixture(scope='function')
 def db_session(app):
-    """Create a new database session for a test"""
-    with app.app_context():
-        connection = db.engine.connect()
-        transaction = connection.begin()
-        
-        # Bind session to connection
-        session = db.create_scoped_session(
-            options={'bind': connection, 'binds': {}}
-        )
-        db.session = session
-        
-        yield session
-        
-        # Rollback and cleanup
-        transaction.rollback()
-        connection.close()
-        session.remove()
+    """Database session for a test; every table is emptied afterwards"""
+    yield db.session
+    
+    # Cleanup
+    db.session.rollback()
+    for table in reversed(db.metadata.sorted_tables):
+        db.session.execute(table.delete())
+    db.session.commit()
+    db.session.remove()
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+    """In-memory Redis installed as extensions.redis_client (skipped without fakeredis)"""
+    fakeredis = pytest.importorskip('fakeredis')
+    client = fakeredis.FakeRedis(decode_responses=True)
+    monkeypatch.setattr(extensions, 'redis_client', client)
+    return client
 
 
 @pytest.fixture
@@ -81,7 +87,8 @@ def auth_headers(client):
     session = UserSession(
         user_id=user.id,
         device_info='pytest',
-        ip_address='127.0.0.1'
+        ip_address='127.0.0.1',
+        expires_at=datetime.utcnow() + timedelta(days=30)
     )
     db.session.add(session)
     db.session.commit()
@@ -4,6 +4,7 @@ Test authentication endpoints
 import pytest
 import json
 from models.user import User
+from utils.validators import validate_password
 
 
 class TestAuth:
@@ -100,6 +101,44 @@ class TestAuth:
         data = json.loads(response.data)
         assert 'invalid' in data['error'].lower()
     
+    def test_refresh_with_multiple_sessions(self, client, db_session):
+        """Test refresh tokens from earlier logins stay valid after a newer login"""
+        client.post('/api/auth/signup', json={
+            'email': 'refresh@example.com',
+            'password': 'SecurePass123!',
+            'name': 'Refresh User'
+        })
+        
+        # Log in from two devices
+        tokens = []
+        for _ in range(2):
+            response = client.post('/api/auth/login', json={
+                'email': 'refresh@example.com',
+                'password': 'SecurePass123!'
+            })
+            tokens.append(json.loads(response.data)['refresh_token'])
+        
+        for refresh_token in tokens:
+            response = client.post('/api/auth/refresh', headers={
+                'Authorization': f'Bearer {refresh_token}'
+            })
+            assert response.status_code == 200
+            assert 'access_token' in json.loads(response.data)
+    
+    def test_refresh_rejects_access_token(self, client, db_session):
+        """Test an access token can't be used to refresh"""
+        response = client.post('/api/auth/signup', json={
+            'email': 'refreshaccess@example.com',
+            'password': 'SecurePass123!',
+            'name': 'Refresh User'
+        })
+        access_token = json.loads(response.data)['access_token']
+        
+        response = client.post('/api/auth/refresh', headers={
+            'Authorization': f'Bearer {access_token}'
+        })
+        assert response.status_code == 422
+    
     def test_login_missing_fields(self, client):
         """Test login with missing fields"""
         response = client.post('/api/auth/login', json={
@@ -126,7 +165,7 @@ class TestPasswordValidation:
     def test_password_validation(self, client, password, should_pass):
         """Test various password patterns"""
         response = client.post('/api/auth/signup', json={
-            'email': f'test_{password}@example.com',
+            'email': f'test_{password.encode().hex()}@example.com',
             'password': password,
             'name': 'Test User'
         })
@@ -135,3 +174,19 @@ class TestPasswordValidation:
             assert response.status_code in [201, 409]  # 409 if email exists
         else:
             assert response.status_code == 400
+    
+    @pytest.mark.parametrize('password,expected', [
+        ('SecurePass123!', True),
+        ('Aa1!aaaa', True),
+        ('Aa1!aaa', False),  # Too short
+        ('securepass123!', False),  # No uppercase
+        ('SECUREPASS123!', False),  # No lowercase
+        ('SecurePass!!!', False),  # No digit
+        ('SecurePass123', False),  # No special character
+        ('Secure Pass123', False),  # Space is not a special character
+        ('SecurePass123^', False),  # Only @$!%*?&# count as special
+        ('', False),
+    ])
+    def test_validate_password(self, password, expected):
+        """Test validate_password directly"""
+        assert validate_password(password) is expected
@@ -53,6 +53,21 @@ class TestUserModel:
         assert user_dict['plan'] == 'pro'
         assert 'password_hash' not in user_dict
     
+    def test_user_to_dict_minimal(self, db_session):
+        """Test minimal user serialization"""
+        user = User(
+            email='minimal@example.com',
+            name='Minimal Test',
+            plan='pro'
+        )
+        user.set_password('Test123!')
+        db_session.add(user)
+        db_session.commit()
+        
+        user_dict = user.to_dict_minimal()
+        assert set(user_dict) == {'id', 'email', 'name', 'plan'}
+        assert user_dict['email'] == 'minimal@example.com'
+    
     def test_account_lockout(self, db_session):
         """Test account lockout mechanism"""
         user = User(email='lockout@example.com')
@@ -134,7 +149,8 @@ class TestUserSession:
         session = UserSession(
             user_id=user.id,
             device_info='Test Device',
-            ip_address='127.0.0.1'
+            ip_address='127.0.0.1',
+            expires_at=datetime.utcnow() + timedelta(days=30)
         )
         db_session.add(session)
         db_session.commit()
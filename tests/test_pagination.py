@@ -0,0 +1,179 @@
+"""
+Test pagination utilities
+"""
+import pytest
+from decimal import Decimal
+from models.user import User
+from models.job import Job
+from models.resume import Resume
+from sqlalchemy import Float
+from sqlalchemy.dialects import mysql
+from sqlalchemy.schema import CreateTable
+from utils.pagination import paginate_with_cursor, encode_cursor, decode_cursor
+
+
+@pytest.fixture
+def resumes(db_session):
+    """Seven resumes for one job, with ties on ai_score across page boundaries"""
+    user = User(email='paginate@example.com')
+    user.set_password('Test123!')
+    db_session.add(user)
+    db_session.commit()
+    
+    job = Job(user_id=user.id, title='Paged Job', status='active')
+    db_session.add(job)
+    db_session.commit()
+    
+    # With per_page=3 the 80s straddle pages 1-2; 72.3 has no exact single-precision FLOAT
+    for score in (90, 80, 80, 80, 72.3, 72.3):
+        db_session.add(Resume(job_id=job.id, filename=f'{score}.pdf', ai_score=score))
+    db_session.add(Resume(job_id=job.id, filename='unscored.pdf'))  # Scored by the column default
+    db_session.commit()
+    return job
+
+
+def _query(job):
+    return Resume.query.filter_by(job_id=job.id)
+
+
+COLUMNS = (Resume.ai_score, Resume.id)
+
+
+class TestPaginateWithCursor:
+    """Test keyset pagination with page-based fallback"""
+    
+    def test_first_page_by_page_number(self, resumes):
+        """Test page mode returns totals and a cursor to the next page"""
+        result = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=3)
+        
+        assert [r.ai_score for r in result['items']] == [90, 80, 80]
+        assert result['pagination']['total'] == 7
+        assert result['pagination']['has_next']
+        assert result['pagination']['next_cursor'] is not None
+    
+    def test_cursor_walks_all_rows_once(self, resumes):
+        """Test following next_cursor visits every row once, ties included"""
+        result = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=3)
+        seen = [r.id for r in result['items']]
+        
+        while result['pagination']['next_cursor']:
+            result = paginate_with_cursor(
+                _query(resumes), COLUMNS, cursor=result['pagination']['next_cursor'], per_page=3
+            )
+            seen.extend(r.id for r in result['items'])
+        
+        all_ids = [r.id for r in _query(resumes).order_by(Resume.ai_score.desc(), Resume.id.desc())]
+        assert seen == all_ids
+    
+    def test_ties_across_page_boundary(self, resumes):
+        """Test rows sharing the last score of a page are returned on the next page"""
+        seen = []
+        cursor = None
+        for _ in range(4):
+            result = paginate_with_cursor(_query(resumes), COLUMNS, cursor=cursor, per_page=2)
+            seen.extend(r.ai_score for r in result['items'])
+            cursor = result['pagination']['next_cursor']
+            if not cursor:
+                break
+        
+        assert seen == [90, 80, 80, 80, 72.3, 72.3, 0]
+    
+    def test_cursor_and_offset_return_same_rows(self, resumes):
+        """Test both paths include the row without an explicit score"""
+        by_offset = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=10)
+        first = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=1)
+        by_cursor = paginate_with_cursor(
+            _query(resumes), COLUMNS, cursor=first['pagination']['next_cursor'], per_page=10
+        )
+        
+        assert [r.id for r in by_offset['items']] == [first['items'][0].id] + [r.id for r in by_cursor['items']]
+        assert by_offset['items'][-1].ai_score == 0
+    
+    def test_cursor_matches_page_two(self, resumes):
+        """Test the cursor from page 1 yields the same rows as page 2"""
+        page_one = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=3)
+        page_two = paginate_with_cursor(_query(resumes), COLUMNS, page=2, per_page=3)
+        by_cursor = paginate_with_cursor(
+            _query(resumes), COLUMNS, cursor=page_one['pagination']['next_cursor'], per_page=3
+        )
+        
+        assert [r.id for r in by_cursor['items']] == [r.id for r in page_two['items']]
+        assert 'total' not in by_cursor['pagination']
+    
+    def test_last_page_has_no_cursor(self, resumes):
+        """Test the final page reports no next page"""
+        result = paginate_with_cursor(_query(resumes), COLUMNS, page=3, per_page=3)
+        
+        assert len(result['items']) == 1
+        assert not result['pagination']['has_next']
+        assert result['pagination']['next_cursor'] is None
+    
+    def test_invalid_cursor(self, resumes):
+        """Test a malformed cursor is rejected"""
+        assert paginate_with_cursor(_query(resumes), COLUMNS, cursor='not-a-cursor') is None
+        assert paginate_with_cursor(_query(resumes), COLUMNS, cursor=encode_cursor([1])) is None
+    
+    def test_per_page_capped(self, resumes):
+        """Test per_page is limited to max_per_page"""
+        result = paginate_with_cursor(_query(resumes), COLUMNS, page=1, per_page=50, max_per_page=5)
+        assert len(result['items']) == 5
+
+
+class TestCursorEncoding:
+    """Test cursor round trips"""
+    
+    def test_round_trip(self):
+        """Test decode_cursor restores encoded values with column types"""
+        cursor = encode_cursor([72.5, 9])
+        assert decode_cursor(cursor, COLUMNS) == [72.5, 9]
+
+
+class TestScoreColumn:
+    """Test ai_score is safe to use in keyset cursors"""
+    
+    def test_exact_and_not_null(self):
+        """Test ai_score is not stored as an approximate FLOAT and can't be NULL"""
+        assert not isinstance(Resume.ai_score.type, Float)
+        assert not Resume.ai_score.nullable
+    
+    def test_mysql_column_type(self):
+        """Test the MySQL DDL declares an exact DECIMAL score"""
+        ddl = str(CreateTable(Resume.__table__).compile(dialect=mysql.dialect()))
+        assert 'ai_score NUMERIC(5, 2) NOT NULL' in ddl
+    
+    def test_mysql_score_read_back_as_float(self):
+        """Test MySQL DECIMAL scores are returned as floats for JSON and cursors"""
+        process = Resume.ai_score.type.result_processor(mysql.dialect(), None)
+        assert process(Decimal('72.30')) == 72.3
+        assert Resume.ai_score.type.python_type is float
+
+
+class TestAllCandidatesCursor:
+    """Test cursor paging of GET /api/candidates/all"""
+    
+    def test_cursor_walk_returns_every_candidate(self, client, db_session, auth_headers):
+        """Test tied and unscored candidates all come back, without an invalid cursor"""
+        user = User.query.filter_by(email='test@example.com').one()
+        job = Job(user_id=user.id, title='Cursor Job', status='active')
+        db_session.add(job)
+        db_session.commit()
+        for score in (72.3, 72.3, 72.3, 50):
+            db_session.add(Resume(job_id=job.id, filename=f'{score}.pdf', ai_score=score))
+        db_session.add(Resume(job_id=job.id, filename='unscored.pdf'))
+        db_session.commit()
+        
+        seen = []
+        url = '/api/candidates/all?per_page=2'
+        for _ in range(5):
+            response = client.get(url, headers=auth_headers)
+            assert response.status_code == 200
+            data = response.get_json()
+            seen.extend(c['id'] for c in data['candidates'])
+            cursor = data['pagination']['next_cursor']
+            if not cursor:
+                break
+            url = f'/api/candidates/all?per_page=2&cursor={cursor}'
+        
+        expected = [r.id for r in _query(job).order_by(Resume.ai_score.desc(), Resume.id.desc())]
+        assert seen == expected
+        assert len(seen) == 5
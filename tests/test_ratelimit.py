@@ -0,0 +1,140 @@
+"""
+Test rate limiting
+"""
+import pytest
+from flask import Flask, jsonify
+import extensions
+from utils import ratelimit
+from utils.ratelimit import LocalRateLimiter, RedisRateLimiter, rate_limit
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.monotonic/time.time in utils.ratelimit"""
+    now = [1000.0]
+    monkeypatch.setattr(ratelimit.time, 'monotonic', lambda: now[0])
+    monkeypatch.setattr(ratelimit.time, 'time', lambda: now[0])
+    return now
+
+
+class TestLocalRateLimiter:
+    """Test the in-process sliding window limiter"""
+    
+    def test_allows_up_to_limit(self, clock):
+        """Test requests beyond the limit are rejected within a window"""
+        limiter = LocalRateLimiter()
+        results = [limiter.hit('k', 3, 60)[0] for _ in range(4)]
+        assert results == [True, True, True, False]
+    
+    def test_remaining_counts_down(self, clock):
+        """Test remaining reflects requests left in the window"""
+        limiter = LocalRateLimiter()
+        assert limiter.hit('k', 3, 60)[1] == 2
+        assert limiter.hit('k', 3, 60)[1] == 1
+        assert limiter.hit('k', 3, 60)[1] == 0
+    
+    def test_rejected_requests_not_counted(self, clock):
+        """Test rejected requests don't extend the lockout"""
+        limiter = LocalRateLimiter()
+        for _ in range(10):
+            limiter.hit('k', 2, 60)
+        # Previous window held 2 hits; at the end of the next window it no longer overlaps
+        clock[0] += 119
+        assert limiter.hit('k', 2, 60)[0]
+    
+    def test_previous_window_weighted(self, clock):
+        """Test the previous window's hits still count while it overlaps the sliding window"""
+        limiter = LocalRateLimiter()
+        clock[0] = 60 * 100 + 59  # Last second of a window
+        for _ in range(4):
+            assert limiter.hit('k', 4, 60)[0]
+        
+        # Start of the next window: all of the previous 4 hits still overlap
+        clock[0] = 60 * 101
+        assert not limiter.hit('k', 4, 60)[0]
+        
+        # Halfway through, half of them (2) still count
+        clock[0] = 60 * 101 + 30
+        assert limiter.hit('k', 4, 60)[0]
+        assert limiter.hit('k', 4, 60)[0]
+        assert not limiter.hit('k', 4, 60)[0]
+    
+    def test_keys_are_independent(self, clock):
+        """Test each key has its own counter"""
+        limiter = LocalRateLimiter()
+        assert limiter.hit('a', 1, 60)[0]
+        assert not limiter.hit('a', 1, 60)[0]
+        assert limiter.hit('b', 1, 60)[0]
+    
+    def test_max_keys_evicts_oldest(self, clock):
+        """Test the key map is capped"""
+        limiter = LocalRateLimiter(max_keys=2)
+        for key in ('a', 'b', 'c'):
+            limiter.hit(key, 1, 60)
+        assert list(limiter._windows) == ['b', 'c']
+
+
+class TestRedisRateLimiter:
+    """Test the Redis sliding window limiter"""
+    
+    def test_allows_up_to_limit(self, clock, fake_redis):
+        """Test requests beyond the limit are rejected within a window"""
+        limiter = RedisRateLimiter()
+        results = [limiter.hit('k', 3, 60) for _ in range(4)]
+        assert [allowed for allowed, _, _ in results] == [True, True, True, False]
+        assert [remaining for _, remaining, _ in results] == [2, 1, 0, 0]
+    
+    def test_previous_window_weighted(self, clock, fake_redis):
+        """Test the previous window's hits still count while it overlaps the sliding window"""
+        limiter = RedisRateLimiter()
+        clock[0] = 60 * 100 + 59
+        for _ in range(4):
+            assert limiter.hit('k', 4, 60)[0]
+        
+        clock[0] = 60 * 101 + 30
+        assert limiter.hit('k', 4, 60)[0]
+        assert limiter.hit('k', 4, 60)[0]
+        assert not limiter.hit('k', 4, 60)[0]
+    
+    def test_rejected_requests_not_counted(self, clock, fake_redis):
+        """Test rejected requests leave the counter untouched"""
+        limiter = RedisRateLimiter()
+        for _ in range(10):
+            limiter.hit('k', 2, 60)
+        assert fake_redis.get(f"rl:k:{int(clock[0] // 60)}") == '2'
+
+
+class TestRateLimitDecorator:
+    """Test the rate_limit decorator"""
+    
+    def _make_app(self, enabled):
+        app = Flask(__name__)
+        app.config['RATELIMIT_ENABLED'] = enabled
+        
+        @app.route('/limited')
+        @rate_limit(limit=2, window=60)
+        def limited():
+            return jsonify({'ok': True})
+        
+        return app
+    
+    def test_returns_429_over_limit(self, clock, monkeypatch):
+        """Test the third request in a window is rejected"""
+        monkeypatch.setattr(extensions, 'redis_client', None)
+        monkeypatch.setattr(ratelimit, 'local_limiter', LocalRateLimiter())
+        client = self._make_app(True).test_client()
+        
+        assert client.get('/limited').status_code == 200
+        assert client.get('/limited').status_code == 200
+        response = client.get('/limited')
+        assert response.status_code == 429
+        assert response.headers['X-RateLimit-Remaining'] == '0'
+        assert 'Retry-After' in response.headers
+    
+    def test_disabled_by_config(self, clock, monkeypatch):
+        """Test no limit is applied when RATELIMIT_ENABLED is off"""
+        monkeypatch.setattr(extensions, 'redis_client', None)
+        monkeypatch.setattr(ratelimit, 'local_limiter', LocalRateLimiter())
+        client = self._make_app(False).test_client()
+        
+        assert all(client.get('/limited').status_code == 200 for _ in range(5))
@@ -0,0 +1,214 @@
+"""
+Test caching and background services
+"""
+import queue
+import pytest
+from datetime import datetime, timedelta
+from flask import request
+from extensions import db
+from models.user import User, UserSession
+from models.audit_log import AuditLog
+from services import audit_queue, session_cache, user_cache
+
+
+@pytest.fixture
+def user(db_session):
+    user = User(email='service@example.com', name='Service User', company='Service Co', plan='starter')
+    user.set_password('Test123!')
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
+@pytest.fixture
+def user_session(db_session, user):
+    session = UserSession(
+        user_id=user.id,
+        device_info='pytest',
+        ip_address='127.0.0.1',
+        expires_at=datetime.utcnow() + timedelta(days=30)
+    )
+    db_session.add(session)
+    db_session.commit()
+    return session
+
+
+class TestAuditQueue:
+    """Test the background audit log writer"""
+    
+    @pytest.fixture
+    def running_queue(self, app, monkeypatch):
+        """Audit queue accepting events, without starting the writer thread"""
+        monkeypatch.setattr(audit_queue, '_app', app)
+        monkeypatch.setattr(audit_queue, '_ensure_worker', lambda: True)
+        monkeypatch.setattr(audit_queue, 'audit_queue', queue.Queue(maxsize=10))
+        return audit_queue.audit_queue
+    
+    def _event(self, user_id, event_type='login'):
+        return {
+            'user_id': user_id,
+            'event_type': event_type,
+            'ip_address': '127.0.0.1',
+            'user_agent': 'pytest',
+            'status': 'success',
+            'details': None,
+            'created_at': datetime.utcnow()
+        }
+    
+    def test_enqueue_refused_when_not_started(self, user, monkeypatch):
+        """Test events are refused (written inline by the caller) without a writer"""
+        monkeypatch.setattr(audit_queue, '_app', None)
+        assert not audit_queue.enqueue(self._event(user.id))
+    
+    def test_log_event_writes_inline_when_not_started(self, app, user, monkeypatch):
+        """Test AuditLog.log_event falls back to a direct insert"""
+        monkeypatch.setattr(audit_queue, '_app', None)
+        with app.test_request_context(headers={'User-Agent': 'pytest'}):
+            AuditLog.log_event(user.id, 'login', 'success', request, {'k': 'v'})
+        
+        log = AuditLog.query.filter_by(user_id=user.id).one()
+        assert log.details == '{"k":"v"}'
+    
+    def test_flush_writes_queued_events(self, running_queue, user):
+        """Test queued events are written in one batch"""
+        for event_type in ('login', 'logout', 'login'):
+            assert audit_queue.enqueue(self._event(user.id, event_type))
+        assert AuditLog.query.count() == 0
+        
+        audit_queue.flush()
+        
+        assert running_queue.empty()
+        assert [log.event_type for log in AuditLog.query.order_by(AuditLog.id)] == ['login', 'logout', 'login']
+    
+    def test_enqueue_refused_when_full(self, running_queue, user):
+        """Test a full queue refuses events instead of blocking"""
+        for _ in range(10):
+            assert audit_queue.enqueue(self._event(user.id))
+        assert not audit_queue.enqueue(self._event(user.id))
+    
+    def test_reset_after_fork(self, running_queue, user):
+        """Test a forked child starts with an empty queue and no writer"""
+        audit_queue.enqueue(self._event(user.id))
+        audit_queue._reset_after_fork()
+        
+        assert audit_queue.audit_queue.empty()
+        assert audit_queue._worker is None
+
+
+class TestSessionCache:
+    """Test session validation cache and batched activity writes"""
+    
+    def test_cache_round_trip(self, fake_redis, user_session):
+        """Test a cached session is returned and valid"""
+        session_cache.cache_session(user_session.session_token, user_session)
+        
+        data = session_cache.get_cached_session(user_session.session_token)
+        assert data['id'] == user_session.id
+        assert session_cache.is_cached_session_valid(data)
+    
+    def test_expired_session_invalid(self, fake_redis, user_session):
+        """Test an expired cached session fails validation"""
+        user_session.expires_at = datetime.utcnow() - timedelta(minutes=1)
+        data = session_cache.cache_session(user_session.session_token, user_session)
+        assert not session_cache.is_cached_session_valid(data)
+    
+    def test_invalidate_user_sessions(self, fake_redis, user, user_session):
+        """Test logout drops every cached session of the user"""
+        session_cache.cache_session(user_session.session_token, user_session)
+        session_cache.invalidate_user_sessions(user.id)
+        assert session_cache.get_cached_session(user_session.session_token) is None
+    
+    def test_activity_written_inline_without_flusher(self, user_session, monkeypatch):
+        """Test last_activity is written directly when no flusher runs"""
+        monkeypatch.setattr(session_cache, '_app', None)
+        user_session.last_activity = datetime.utcnow() - timedelta(hours=1)
+        db.session.commit()
+        
+        session_cache.record_session_activity(user_session.id)
+        
+        db.session.expire_all()
+        assert db.session.get(UserSession, user_session.id).last_activity > datetime.utcnow() - timedelta(minutes=1)
+    
+    def test_activity_batched_until_flush(self, app, user, user_session, monkeypatch):
+        """Test recorded activity is held in memory and written by one flush"""
+        monkeypatch.setattr(session_cache, '_app', app)
+        monkeypatch.setattr(session_cache, '_ensure_worker', lambda: True)
+        monkeypatch.setattr(session_cache, '_pending_activity', {})
+        
+        other = UserSession(
+            user_id=user.id,
+            device_info='other',
+            ip_address='127.0.0.1',
+            expires_at=datetime.utcnow() + timedelta(days=30)
+        )
+        db.session.add(other)
+        stale = datetime.utcnow() - timedelta(hours=1)
+        user_session.last_activity = other.last_activity = stale
+        db.session.commit()
+        
+        session_cache.record_session_activity(user_session.id)
+        session_cache.record_session_activity(other.id)
+        assert set(session_cache._pending_activity) == {user_session.id, other.id}
+        
+        session_cache.flush_session_activity()
+        
+        assert session_cache._pending_activity == {}
+        db.session.expire_all()
+        for session_id in (user_session.id, other.id):
+            assert db.session.get(UserSession, session_id).last_activity > stale
+
+
+class TestUserCache:
+    """Test the user profile and plan caches"""
+    
+    @pytest.fixture(autouse=True)
+    def empty_local_cache(self):
+        user_cache._local_cache.clear()
+        yield
+        user_cache._local_cache.clear()
+    
+    def test_load_user_cached(self, fake_redis, user):
+        """Test the profile is loaded and cached"""
+        data = user_cache.load_user_cached(user.id)
+        
+        assert data['profile']['email'] == 'service@example.com'
+        assert data['minimal']['email'] == 'service@example.com'
+        assert data['is_active']
+        assert fake_redis.exists(f"auth_user:{user.id}")
+    
+    def test_repeat_load_skips_database(self, fake_redis, user):
+        """Test a cached profile is served after the row changes underneath it"""
+        user_cache.load_user_cached(user.id)
+        db.session.execute(User.__table__.update().where(User.id == user.id).values(name='Changed'))
+        db.session.commit()
+        
+        assert user_cache.load_user_cached(user.id)['profile']['name'] == 'Service User'
+    
+    def test_invalidate_user_cache(self, fake_redis, user):
+        """Test invalidation drops both cache tiers"""
+        user_cache.load_user_cached(user.id)
+        user.name = 'Renamed'
+        db.session.commit()
+        user_cache.invalidate_user_cache(user.id)
+        
+        assert user_cache.load_user_cached(user.id)['profile']['name'] == 'Renamed'
+    
+    def test_missing_user(self, fake_redis, db_session):
+        """Test an unknown id returns None"""
+        assert user_cache.load_user_cached(999999) is None
+    
+    def test_profile_json(self, fake_redis, user):
+        """Test the encoded profile is reused from the local cache"""
+        first = user_cache.load_user_profile_json(user.id)
+        assert first is user_cache.load_user_profile_json(user.id)
+    
+    def test_plan_cache_dropped_on_plan_change(self, fake_redis, user):
+        """Test changing the plan column invalidates the cached plan"""
+        assert user_cache.get_plan_limits(user.id)[0] == 'starter'
+        
+        user.plan = 'pro'
+        db.session.commit()
+        
+        plan, plan_config = user_cache.get_plan_limits(user.id)
+        assert plan == 'pro'
+        assert plan_config == user_cache.Config.PLANS['pro']
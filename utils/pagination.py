@@ -2,8 +2,25 @@
 Pagination utility for API endpoints
 """
 from flask import request, jsonify
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy import func, literal, tuple_
 from sqlalchemy.orm import Query
+import base64
+import json
+
+
+def count_rows(query: Query) -> int:
+    """
+    COUNT(*) over a query's rows
+    
+    Unlike Query.count(), the counted subquery selects a constant instead of
+    every mapped column and drops ORDER BY, so the database can answer it
+    from an index.
+    """
+    return query.session.query(func.count()).select_from(
+        query.order_by(None).with_entities(literal(1)).subquery()
+    ).scalar()
 
 
 def paginate(query: Query, page: int = None, per_page: int = None, max_per_page: int = 100):
@@ -33,9 +50,8 @@ def paginate(query: Query, page: int = None, per_page: int = None, max_per_page:
     items = query.limit(per_page).offset((page - 1) * per_page).all()
     
     # Get total count (expensive operation, cached if possible)
-    # Use a fresh query to avoid column issues with complex queries
     try:
-        total = query.count()
+        total = count_rows(query)
     except Exception:
         # If count fails, estimate from items
         total = len(items) if page == 1 else (page - 1) * per_page + len(items)
@@ -60,6 +76,101 @@ def paginate(query: Query, page: int = None, per_page: int = None, max_per_page:
     }
 
 
+def encode_cursor(values: Sequence[Any]) -> str:
+    """Encode the sort key of the last row on a page as an opaque cursor"""
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+
+def decode_cursor(cursor: str, columns: Sequence[Any]) -> Optional[List[Any]]:
+    """
+    Decode a cursor produced by encode_cursor for the given sort columns
+    
+    Returns:
+        List of values, or None if the cursor is malformed
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(values) != len(columns):
+            return None
+        return [
+            datetime.fromisoformat(v) if column.type.python_type is datetime else column.type.python_type(v)
+            for column, v in zip(columns, values)
+        ]
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def keyset_paginate(query: Query, columns: Sequence[Any], cursor: Optional[str] = None,
+                    per_page: int = 20, max_per_page: int = 100):
+    """
+    Paginate a query by seeking past the previous page's last sort key
+    
+    Every page costs the same regardless of depth (no OFFSET, no COUNT).
+    Rows are ordered by `columns` descending; the last column must be unique
+    (normally the primary key) so the order is total.
+    
+    Args:
+        query: SQLAlchemy query object (without ORDER BY)
+        columns: Sort columns, e.g. (Resume.ai_score, Resume.id)
+        cursor: next_cursor from the previous page, or None for the first page
+        per_page: Items per page
+        max_per_page: Maximum items per page allowed (default: 100)
+    
+    Returns:
+        Dict with items and pagination metadata, or None if the cursor is invalid
+    """
+    per_page = max(min(per_page, max_per_page), 1)
+    
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        if values is None:
+            return None
+        query = query.filter(tuple_(*columns) < tuple_(*values))
+    
+    # Fetch one extra row to know whether another page exists
+    items = query.order_by(*[column.desc() for column in columns]).limit(per_page + 1).all()
+    has_next = len(items) > per_page
+    items = items[:per_page]
+    
+    return {
+        'items': items,
+        'pagination': {
+            'per_page': per_page,
+            'has_next': has_next,
+            'next_cursor': row_cursor(items[-1], columns) if has_next else None
+        }
+    }
+
+
+def row_cursor(item: Any, columns: Sequence[Any]) -> str:
+    """Cursor pointing just past `item` for the given sort columns"""
+    return encode_cursor([getattr(item, column.key) for column in columns])
+
+
+def paginate_with_cursor(query: Query, columns: Sequence[Any], cursor: Optional[str] = None,
+                         page: int = 1, per_page: int = 20, max_per_page: int = 100):
+    """
+    keyset_paginate when a cursor is given, otherwise page/offset pagination
+    
+    Page-based results also carry next_cursor, so clients can switch to
+    cursors after the first page and stop paying for OFFSET and COUNT.
+    
+    Returns:
+        Dict with items and pagination metadata, or None if the cursor is invalid
+    """
+    if cursor:
+        return keyset_paginate(query, columns, cursor, per_page=per_page, max_per_page=max_per_page)
+    
+    query = query.order_by(*[column.desc() for column in columns])
+    paginated = paginate(query, page=page, per_page=per_page, max_per_page=max_per_page)
+    items = paginated['items']
+    paginated['pagination']['next_cursor'] = (
+        row_cursor(items[-1], columns) if items and paginated['pagination']['has_next'] else None
+    )
+    return paginated
+
+
 def paginate_response(items: List[Any], serializer=None):
     """
     Convert paginated items to JSON response
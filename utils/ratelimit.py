@@ -0,0 +1,158 @@
+"""
+Rate limiting for API endpoints
+
+Counters are kept in Redis so limits hold across gunicorn workers; the
+in-process limiter is used when Redis is not available.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import request, jsonify, current_app
+import extensions
+
+logger = logging.getLogger(__name__)
+
+# Sliding window approximated from two fixed windows: the previous window's count is
+# weighted by how much of it still overlaps the sliding window. Rejected requests are
+# not counted. KEYS = current, previous window; ARGV = limit, window (ms), elapsed (ms)
+_SLIDING_WINDOW_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local elapsed = tonumber(ARGV[3])
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local previous = tonumber(redis.call('GET', KEYS[2]) or '0')
+local weighted = previous * (window - elapsed) / window + current
+if weighted >= limit then return {0, 0} end
+current = redis.call('INCR', KEYS[1])
+if current == 1 then redis.call('PEXPIRE', KEYS[1], window * 2) end
+return {1, math.floor(limit - weighted - 1)}
+"""
+
+
+def _window_position(window: int, now: float):
+    """Index of the fixed window containing now, and seconds elapsed in it"""
+    index = int(now // window)
+    return index, now - index * window
+
+
+class LocalRateLimiter:
+    """
+    Sliding-window rate limiter kept in process memory.
+
+    Counters live in an LRU-capped dict keyed by (endpoint, client IP), so
+    checking a limit never leaves the process. Limits are enforced per worker.
+    """
+
+    def __init__(self, max_keys: int = 10000):
+        self.max_keys = max_keys
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+
+    def hit(self, key: str, limit: int, window: int):
+        """
+        Record a request for key.
+
+        Returns:
+            Tuple of (allowed, remaining, seconds until the current window ends)
+        """
+        index, elapsed = _window_position(window, time.monotonic())
+        with self._lock:
+            entry = self._windows.get(key)  # [window index, current count, previous count]
+            if entry is None or entry[0] < index - 1:
+                entry = [index, 0, 0]
+                self._windows[key] = entry
+            else:
+                if entry[0] == index - 1:
+                    entry[:] = [index, 0, entry[1]]
+                self._windows.move_to_end(key)
+
+            weighted = entry[2] * (window - elapsed) / window + entry[1]
+            allowed = weighted < limit
+            if allowed:
+                entry[1] += 1
+
+            while len(self._windows) > self.max_keys:
+                self._windows.popitem(last=False)
+
+        remaining = int(limit - weighted - 1) if allowed else 0
+        return allowed, remaining, int(window - elapsed)
+
+
+class RedisRateLimiter:
+    """
+    Sliding-window rate limiter shared by all workers through Redis.
+
+    The Lua script is registered once and run with EVALSHA, so each check
+    is a single round-trip.
+    """
+
+    def __init__(self):
+        self._client = None
+        self._script = None
+
+    def _get_script(self, client):
+        if self._script is None or self._client is not client:
+            self._client = client
+            self._script = client.register_script(_SLIDING_WINDOW_SCRIPT)
+        return self._script
+
+    def hit(self, key: str, limit: int, window: int):
+        """
+        Record a request for key.
+
+        Returns:
+            Tuple of (allowed, remaining, seconds until the current window ends)
+        """
+        script = self._get_script(extensions.redis_client)
+        index, elapsed = _window_position(window, time.time())
+        allowed, remaining = script(
+            keys=[f"rl:{key}:{index}", f"rl:{key}:{index - 1}"],
+            args=[limit, window * 1000, int(elapsed * 1000)]
+        )
+        return bool(allowed), int(remaining), int(window - elapsed)
+
+
+local_limiter = LocalRateLimiter()
+redis_limiter = RedisRateLimiter()
+
+
+def _hit(key: str, limit: int, window: int):
+    """Check the shared Redis counter, falling back to the per-worker one"""
+    if extensions.redis_client:
+        try:
+            return redis_limiter.hit(key, limit, window)
+        except Exception as e:
+            logger.error(f"Redis rate limit check failed: {e}")
+    return local_limiter.hit(key, limit, window)
+
+
+def rate_limit(limit=None, window=None):
+    """
+    Limit an endpoint to `limit` requests per `window` seconds per client IP
+    """
+    def decorator(f):
+        if not limit or not window:
+            return f
+
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if not current_app.config.get('RATELIMIT_ENABLED', False):
+                return f(*args, **kwargs)
+
+            key = f"{request.endpoint}:{request.remote_addr}"
+            allowed, remaining, reset = _hit(key, limit, window)
+
+            if not allowed:
+                response = jsonify({'error': 'Too many requests. Please try again later.'})
+                response.status_code = 429
+                response.headers['X-RateLimit-Remaining'] = '0'
+                response.headers['X-RateLimit-Reset'] = str(reset)
+                response.headers['Retry-After'] = str(reset)
+                return response
+
+            return f(*args, **kwargs)
+
+        return decorated_function
+    return decorator
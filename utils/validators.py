@@ -1,9 +1,15 @@
 import re
 
+_EMAIL_RE = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+# Precompiled searches for the required password character classes
+_HAS_UPPER = re.compile(r'[A-Z]').search
+_HAS_LOWER = re.compile(r'[a-z]').search
+_HAS_DIGIT = re.compile(r'\d').search
+_HAS_SPECIAL = re.compile(r'[@$!%*?&#]').search
+
 def validate_email(email: str) -> bool:
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return bool(re.match(pattern, email))
+    return _EMAIL_RE.match(email) is not None
 
 def validate_password(password: str) -> bool:
     """
@@ -16,17 +22,8 @@ def validate_password(password: str) -> bool:
     """
     if len(password) < 8:
         return False
-    
-    if not re.search(r'[A-Z]', password):
-        return False
-    
-    if not re.search(r'[a-z]', password):
-        return False
-    
-    if not re.search(r'\d', password):
-        return False
-    
-    if not re.search(r'[@$!%*?&#]', password):
-        return False
-    
-    return True
+
+    return bool(
+        _HAS_UPPER(password) and _HAS_LOWER(password)
+        and _HAS_DIGIT(password) and _HAS_SPECIAL(password)
+    )